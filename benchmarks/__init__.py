@@ -0,0 +1,10 @@
+"""
+Benchmarks for AI Flashcard Generator.
+
+These scripts seed a throwaway SQLite database with synthetic decks and
+measure how the models and routes behave at a realistic library size.
+They never touch flashcards.db or call the Anthropic API.
+
+Run them from the project root, for example:
+    python -m benchmarks.suite --decks 10000 --cards 100
+"""
@@ -0,0 +1,268 @@
+"""
+Local stand-in for the Anthropic Messages API, for load tests.
+
+Answers POST /v1/messages with a valid message whose text is a FlashcardSet
+JSON document, so FlashcardGenerator works unchanged when its client is
+pointed here (Config.ANTHROPIC_BASE_URL). Response times follow a
+configurable distribution, and a share of requests can be rejected with
+429 (rate limited) or 529 (overloaded) errors carrying retry-after headers.
+
+Run it on its own to point a separately started app at it:
+    python -m benchmarks.fake_anthropic --port 8089 --latency lognormal:2:0.5
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 python3 src/app.py
+
+For students: Load testing against the real API would cost money and hit
+real rate limits. A fake server lets us replay slow responses and errors on
+purpose and see how the app's retry logic behaves under pressure.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cards per generated deck, matching the prompt in FlashcardGenerator
+CARDS_PER_DECK = 10
+
+_TOPIC = re.compile(r'^Topic: (.+)$', re.MULTILINE)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution.
+
+    Args:
+        spec (str): One of
+            'fixed:SECONDS'
+            'uniform:LOW:HIGH'
+            'lognormal:MEDIAN:SIGMA' (long right tail, like real LLM calls)
+
+    Returns:
+        callable: random.Random -> seconds
+
+    Raises:
+        ValueError: If the spec can't be parsed
+    """
+    kind, _, rest = spec.partition(':')
+    try:
+        values = [float(value) for value in rest.split(':')] if rest else []
+    except ValueError:
+        raise ValueError(f'Invalid latency spec: {spec}') from None
+
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2 and values[0] > 0:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f'Invalid latency spec: {spec}')
+
+
+def _flashcard_set(topic):
+    return {
+        'topic': topic,
+        'flashcards': [
+            {
+                'question': f'Explain concept {i + 1} of {topic}?',
+                'answer': f'Concept {i + 1} of {topic} works because of a detailed reason that '
+                          'a student should be able to explain in their own words.'
+            }
+            for i in range(CARDS_PER_DECK)
+        ]
+    }
+
+
+class FakeAnthropicServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server emulating the Messages API.
+
+    Attributes:
+        url (str): Base URL to use as ANTHROPIC_BASE_URL
+        stats (dict): Response counts by kind (ok, rate_limited, overloaded, ...)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0.5', rate_429=0.0, rate_529=0.0,
+                 retry_after=1.0, max_concurrency=0, seed=None):
+        """
+        Args:
+            host (str): Interface to listen on
+            port (int): Port (0 picks a free one)
+            latency (str): Latency distribution (see parse_latency)
+            rate_429 (float): Share of requests answered with 429
+            rate_529 (float): Share of requests answered with 529
+            retry_after (float): Seconds sent in retry-after headers
+            max_concurrency (int): Requests beyond this many in flight get a
+                429, like a real per-key concurrency limit (0 = unlimited)
+            seed (int, optional): Random seed for reproducible runs
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_529 = rate_529
+        self.retry_after = retry_after
+        self.max_concurrency = max_concurrency
+        self.rng = random.Random(seed)
+        self.stats = {'ok': 0, 'rate_limited': 0, 'overloaded': 0, 'concurrency_limited': 0, 'bad_request': 0}
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-anthropic', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def decide(self):
+        """
+        Pick the outcome and latency for one request.
+
+        Returns:
+            tuple: (outcome, seconds)
+        """
+        with self.lock:
+            roll = self.rng.random()
+            latency = self.latency(self.rng)
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                outcome = 'concurrency_limited'
+            elif roll < self.rate_429:
+                outcome = 'rate_limited'
+            elif roll < self.rate_429 + self.rate_529:
+                outcome = 'overloaded'
+            else:
+                outcome = 'ok'
+                self.in_flight += 1
+            self.stats[outcome] += 1
+        return outcome, latency
+
+    def finish(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep load test output readable
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('request-id', f'req_{uuid.uuid4().hex[:24]}')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, error_type, message):
+        retry_after = self.server.retry_after
+        self._send_json(status, {'type': 'error', 'error': {'type': error_type, 'message': message}}, {
+            'retry-after': f'{retry_after:g}',
+            'retry-after-ms': str(int(retry_after * 1000))
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            request = None
+
+        if self.path.split('?')[0] != '/v1/messages' or not isinstance(request, dict):
+            with self.server.lock:
+                self.server.stats['bad_request'] += 1
+            self._send_json(400, {'type': 'error', 'error': {
+                'type': 'invalid_request_error', 'message': f'Unsupported request to {self.path}'
+            }})
+            return
+
+        outcome, latency = self.server.decide()
+        if outcome in ('rate_limited', 'concurrency_limited'):
+            self._send_error(429, 'rate_limit_error', 'Fake rate limit')
+            return
+        if outcome == 'overloaded':
+            self._send_error(529, 'overloaded_error', 'Fake overload')
+            return
+
+        try:
+            time.sleep(latency)
+            prompt = ''.join(
+                block if isinstance(block, str) else block.get('text', '')
+                for message in request.get('messages', [])
+                for block in ([message['content']] if isinstance(message['content'], str) else message['content'])
+            )
+            match = _TOPIC.search(prompt)
+            text = json.dumps(_flashcard_set(match.group(1).strip() if match else 'Load test'))
+            self._send_json(200, {
+                'id': f'msg_{uuid.uuid4().hex[:24]}',
+                'type': 'message',
+                'role': 'assistant',
+                'model': request.get('model', 'fake-model'),
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4}
+            })
+        finally:
+            self.server.finish()
+
+
+def add_arguments(parser):
+    """Add the fake server options to an argparse parser."""
+    parser.add_argument('--latency', default='lognormal:1.5:0.5',
+                        help='fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (default lognormal:1.5:0.5)')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='share of requests rejected with 429')
+    parser.add_argument('--rate-529', type=float, default=0.0, help='share of requests rejected with 529')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='retry-after seconds on errors (default 1)')
+    parser.add_argument('--max-concurrency', type=int, default=0,
+                        help='reject requests beyond this many in flight with 429 (default unlimited)')
+
+
+def server_from_arguments(args, port=0):
+    """Build a FakeAnthropicServer from parsed add_arguments() options."""
+    return FakeAnthropicServer(
+        port=port, latency=args.latency, rate_429=args.rate_429, rate_529=args.rate_529,
+        retry_after=args.retry_after, max_concurrency=args.max_concurrency
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake Anthropic Messages API for load tests.')
+    parser.add_argument('--port', type=int, default=8089)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = server_from_arguments(args, port=args.port)
+    print(f'Fake Anthropic API listening on {server.url} (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Import validation benchmark: the old per-card loop against pydantic.
+
+Builds the card list of an imported deck (10,000 cards by default) and
+times two ways of validating it:
+- loop: the hand-written checks Deck.import_from_dict() used to run,
+  which stop at the first bad card
+- pydantic: validate_imported_cards() (src/models/schemas.py), one call
+  into pydantic's compiled validator that reports every bad card
+
+Each variant runs on a valid file and on one where a share of the cards
+(--bad, 1% by default) is broken in different ways. For the broken file
+it also reports how many problems a single upload tells the user about.
+
+Usage (from the project root):
+    python -m benchmarks.import_validation
+    python -m benchmarks.import_validation --cards 50000 --bad 0.05 --output validation.json
+
+For students: Finding one error per upload means a file with 100 broken
+cards takes 100 uploads to fix, so the number of problems reported per run
+matters as much as the milliseconds.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from src.models.deck import MAX_IMPORT_ERRORS
+from src.models.schemas import validate_imported_cards
+
+
+def legacy_validate(cards):
+    """The validation loop Deck.import_from_dict() ran before (stops at the first error)."""
+    for i, card in enumerate(cards):
+        if not isinstance(card, dict):
+            raise ValueError(f"Card {i + 1} must be an object with 'question' and 'answer'")
+        if 'question' not in card:
+            raise ValueError(f"Card {i + 1} is missing 'question' field")
+        if 'answer' not in card:
+            raise ValueError(f"Card {i + 1} is missing 'answer' field")
+        if not isinstance(card['question'], str) or not card['question'].strip():
+            raise ValueError(f"Card {i + 1} 'question' must be a non-empty string")
+        if not isinstance(card['answer'], str) or not card['answer'].strip():
+            raise ValueError(f"Card {i + 1} 'answer' must be a non-empty string")
+    return [(card['question'].strip(), card['answer'].strip()) for card in cards]
+
+
+def make_cards(count, bad_share, rng):
+    """Cards as parsed from an export file, with a share of them broken."""
+    cards = [
+        {'question': f'  Question {i} about topic {i % 17}?  ', 'answer': f'Answer {i}, with an explanation.'}
+        for i in range(count)
+    ]
+    breakages = (
+        lambda card: card.pop('answer'),
+        lambda card: card.update(question='   '),
+        lambda card: card.update(answer=42),
+    )
+    for index in rng.sample(range(count), int(count * bad_share)):
+        rng.choice(breakages)(cards[index])
+    return cards
+
+
+def _run(validate, cards):
+    """Validate once; returns the number of problems reported (0 if valid)."""
+    try:
+        validate(cards)
+        return 0
+    except ValueError as e:
+        return str(e).count('Card ')
+
+
+def run_benchmark(count, bad_share, repeats, seed):
+    """
+    Time both validators on a valid and a broken file.
+
+    Returns:
+        dict: cards, bad_cards and, for 'loop' and 'pydantic', median ms
+            on the valid and broken files and problems reported per upload
+    """
+    rng = random.Random(seed)
+    valid = make_cards(count, 0, rng)
+    broken = make_cards(count, bad_share, rng)
+
+    variants = {
+        'loop': legacy_validate,
+        'pydantic': lambda cards: validate_imported_cards(cards, MAX_IMPORT_ERRORS),
+    }
+    report = {'cards': count, 'bad_cards': int(count * bad_share)}
+    for name, validate in variants.items():
+        row = {}
+        for label, cards in (('valid', valid), ('broken', broken)):
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                reported = _run(validate, cards)
+                timings.append(time.perf_counter() - start)
+            row[f'{label}_ms'] = round(statistics.median(timings) * 1000, 2)
+            if label == 'broken':
+                row['problems_reported'] = reported
+        report[name] = row
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the old import validation loop with pydantic.')
+    parser.add_argument('--cards', type=int, default=10_000, help='cards in the imported deck (default 10000)')
+    parser.add_argument('--bad', type=float, default=0.01, help='share of broken cards (default 0.01)')
+    parser.add_argument('--repeats', type=int, default=7, help='timed runs per variant (default 7)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.cards, args.bad, args.repeats, args.seed)
+
+    print(f"{report['cards']} cards, {report['bad_cards']} broken")
+    print(f"{'variant':<9} {'valid ms':>9} {'broken ms':>10} {'problems/upload':>16}")
+    for name in ('loop', 'pydantic'):
+        row = report[name]
+        print(f"{name:<9} {row['valid_ms']:>9.2f} {row['broken_ms']:>10.2f} {row['problems_reported']:>16}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Load test: concurrent users generating and studying decks.
+
+Starts the fake Anthropic server (fake_anthropic.py) and, unless --target
+is given, the app itself on a temporary database in a threaded server.
+Each simulated user then repeats the full flow:
+
+    POST /generate -> GET /preview -> GET /study -> POST /study/grade (each card)
+
+and the tool reports throughput, latency percentiles per step, error rates
+and how many API calls the fake server saw per generated deck (retries show
+up as more than one).
+
+Usage (from the project root):
+    python -m benchmarks.load_test --users 20 --flows 5
+    python -m benchmarks.load_test --users 20 --rate-429 0.1 --retry-after 2
+    python -m benchmarks.load_test --users 300 --flows 1 --asgi
+    python -m benchmarks.load_test --target http://127.0.0.1:5000 --fake-port 8089
+
+With --target the app must already be running with
+ANTHROPIC_BASE_URL=http://127.0.0.1:<fake-port>.
+
+For students: Averages hide the slow requests users complain about, so the
+report shows p50/p90/p99 latencies ("p99 = 99% of requests were faster").
+"""
+
+import argparse
+import http.cookiejar
+import json
+import logging
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from benchmarks.fake_anthropic import add_arguments, server_from_arguments
+
+# Study notes sent with every generate request
+NOTES = (
+    'Photosynthesis converts light energy into chemical energy. Chlorophyll in the '
+    'chloroplasts absorbs light; the light reactions produce ATP and NADPH, and the '
+    'Calvin cycle uses them to fix carbon dioxide into sugars.'
+)
+
+_PREVIEW_PATH = re.compile(r'/preview/(\d+)')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Return redirects to the caller instead of following them."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class User:
+    """One simulated user with its own cookie jar (and so its own session)."""
+
+    def __init__(self, base_url, number, run_id, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.number = number
+        self.run_id = run_id
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+        self.samples = []
+
+    def request(self, step, method, path, form=None, json_body=None):
+        """
+        Send one request and record its latency.
+
+        Returns:
+            tuple: (status, headers, body bytes); status 0 on connection errors
+        """
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, response_headers, body = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, response_headers, body = e.code, e.headers, e.read()
+        except (urllib.error.URLError, OSError):
+            status, response_headers, body = 0, {}, b''
+        self.samples.append((step, time.perf_counter() - start, status))
+        return status, response_headers, body
+
+    def flow(self, iteration, rng):
+        """
+        Run generate -> preview -> study -> grade once.
+
+        Returns:
+            bool: True if every step succeeded
+        """
+        topic = f'Load test {self.run_id} user {self.number} #{iteration}'
+        status, headers, _ = self.request('generate', 'POST', '/generate', form={'notes': NOTES, 'topic': topic})
+        match = _PREVIEW_PATH.search(headers.get('Location', '') if status == 302 else '')
+        if not match:
+            return False
+        deck_id = int(match.group(1))
+
+        ok = self.request('preview', 'GET', f'/preview/{deck_id}')[0] == 200
+        ok &= self.request('study', 'GET', f'/study/{deck_id}')[0] == 200
+
+        status, _, body = self.request('cards', 'GET', f'/api/v1/decks/{deck_id}/cards?fields=id')
+        if status != 200:
+            return False
+        for card in json.loads(body)['cards']:
+            status = self.request('grade', 'POST', f'/study/{deck_id}/grade',
+                                  json_body={'card_id': card['id'], 'success': rng.random() < 0.7})[0]
+            ok &= status == 200
+        return ok
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(users, elapsed, flows_ok, flows_failed, fake_stats):
+    """
+    Build the load test report.
+
+    Returns:
+        dict: Overall throughput and per-step latency/error statistics
+    """
+    by_step = {}
+    for user in users:
+        for step, latency, status in user.samples:
+            by_step.setdefault(step, []).append((latency, status))
+
+    steps = {}
+    total_requests = 0
+    for step, samples in by_step.items():
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, status in samples if status == 0 or status >= 500)
+        rejected = sum(1 for _, status in samples if 400 <= status < 500)
+        total_requests += len(samples)
+        steps[step] = {
+            'requests': len(samples),
+            'errors': errors,
+            'client_errors': rejected,
+            'error_rate': round(errors / len(samples), 4),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+            'p90_ms': round(_percentile(latencies, 0.90) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1)
+        }
+
+    generated = steps.get('generate', {}).get('requests', 0)
+    api_calls = sum(fake_stats.values()) - fake_stats.get('bad_request', 0)
+    return {
+        'users': len(users),
+        'seconds': round(elapsed, 2),
+        'flows_completed': flows_ok,
+        'flows_failed': flows_failed,
+        'flows_per_second': round(flows_ok / elapsed, 3) if elapsed else 0.0,
+        'requests_per_second': round(total_requests / elapsed, 2) if elapsed else 0.0,
+        'steps': steps,
+        'fake_api': {**fake_stats, 'calls_per_generate': round(api_calls / generated, 2) if generated else 0.0}
+    }
+
+
+def run_load(base_url, users, flows, timeout, think_time, seed):
+    """
+    Drive concurrent users against a running app.
+
+    Returns:
+        tuple: (users, elapsed seconds, flows succeeded, flows failed)
+    """
+    run_id = format(int(time.time() * 1000) % 10 ** 8, 'x')
+    simulated = [User(base_url, number, run_id, timeout) for number in range(users)]
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(users)
+
+    def worker(user):
+        rng = random.Random(seed + user.number)
+        start_gate.wait()
+        for iteration in range(flows):
+            ok = user.flow(iteration, rng)
+            with lock:
+                results['ok' if ok else 'failed'] += 1
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+    threads = [threading.Thread(target=worker, args=(user,)) for user in simulated]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return simulated, time.perf_counter() - start, results['ok'], results['failed']
+
+
+def _start_app(database_path, fake_url):
+    """Start the app on a temporary database in a threaded background server."""
+    from werkzeug.serving import make_server
+    from src.config import Config
+
+    Config.DATABASE_PATH = str(database_path)
+    Config.ANTHROPIC_BASE_URL = fake_url
+    Config.ANTHROPIC_API_KEY = Config.ANTHROPIC_API_KEY or 'load-test'
+    # The app's JSON log would drown out the report; keep it next to the database
+    Config.LOG_FILE = Config.LOG_FILE or str(Path(database_path).parent / 'app.log')
+    # Keep background database maintenance out of the measurement
+    Config.MAINTENANCE_INTERVAL = 0
+
+    # Created only after the database path is set: create_app() initializes that database
+    from src.app import create_app
+    app = create_app()
+
+    # Per-request access log lines would drown out the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def _start_asgi_app(database_path, fake_url):
+    """Start the ASGI app (async /generate) under uvicorn in a background thread."""
+    import socket
+    import uvicorn
+    from src.config import Config
+
+    Config.DATABASE_PATH = str(database_path)
+    Config.ANTHROPIC_BASE_URL = fake_url
+    Config.ANTHROPIC_API_KEY = Config.ANTHROPIC_API_KEY or 'load-test'
+    # The app's JSON log would drown out the report; keep it next to the database
+    Config.LOG_FILE = Config.LOG_FILE or str(Path(database_path).parent / 'app.log')
+    # Keep background database maintenance out of the measurement
+    Config.MAINTENANCE_INTERVAL = 0
+
+    from src.asgi import create_asgi_app
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_asgi_app(), host='127.0.0.1', port=port, log_level='warning', backlog=4096
+    ))
+    threading.Thread(target=server.run, name='asgi-server', daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f'http://127.0.0.1:{port}'
+
+
+def _print_report(report):
+    print(f"\n{report['users']} users, {report['seconds']} s: "
+          f"{report['flows_completed']} flows completed, {report['flows_failed']} failed "
+          f"({report['flows_per_second']} flows/s, {report['requests_per_second']} requests/s)")
+    print(f"{'step':<10} {'requests':>8} {'errors':>7} {'4xx':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step, stats in report['steps'].items():
+        print(f"{step:<10} {stats['requests']:>8} {stats['errors']:>7} {stats['client_errors']:>5} "
+              f"{stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    print(f"Fake API: {json.dumps(report['fake_api'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the app against a fake Anthropic API.')
+    parser.add_argument('--users', type=int, default=10, help='concurrent users (default 10)')
+    parser.add_argument('--flows', type=int, default=3, help='generate/study flows per user (default 3)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between flows in seconds')
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target', help='URL of an already running app (default: start one here)')
+    parser.add_argument('--asgi', action='store_true',
+                        help='start the ASGI app (async /generate) under uvicorn instead of the WSGI app')
+    parser.add_argument('--fake-port', type=int, default=0, help='port for the fake API (default: any free port)')
+    parser.add_argument('--output', type=Path, help='also write the report as JSON')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    fake = server_from_arguments(args, port=args.fake_port).start()
+    print(f'Fake Anthropic API on {fake.url}', file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix='flashcards-load-') as tmp:
+        app_server = None
+        base_url = args.target
+        if base_url is None:
+            start = _start_asgi_app if args.asgi else _start_app
+            app_server, base_url = start(Path(tmp) / 'load.db', fake.url)
+        print(f'Running {args.users} users x {args.flows} flows against {base_url}...', file=sys.stderr)
+
+        try:
+            users, elapsed, ok, failed = run_load(
+                base_url, args.users, args.flows, args.timeout, args.think_time, args.seed
+            )
+        finally:
+            if args.asgi and app_server is not None:
+                app_server.should_exit = True
+            elif app_server is not None:
+                app_server.shutdown()
+            fake.stop()
+
+    report = summarize(users, elapsed, ok, failed, dict(fake.stats))
+    _print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
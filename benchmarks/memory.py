@@ -0,0 +1,167 @@
+"""
+Memory benchmark: bytes per card for a deck loaded into Python objects.
+
+Seeds a temporary database with one large deck (100,000 cards by default)
+and loads it two ways:
+- dict: `dict(row)` for every row, what the models used to return
+- record: the __slots__ CardRecord objects the models return now
+  (see src/models/records.py)
+
+For each it reports, per card:
+- overhead: memory for the row containers alone. Both are built from the
+  same fetched rows, so the column values (strings, numbers) are shared
+  and only the dict or record objects are counted.
+- total: memory still held after Flashcard.get_by_deck() (or the old
+  fetchall + dict path) returns, column values included
+- load time: median of a few full loads
+
+Usage (from the project root):
+    python -m benchmarks.memory
+    python -m benchmarks.memory --cards 20000 --output memory.json
+
+For students: tracemalloc counts every allocation Python makes, so the
+difference between two snapshots is exactly what a piece of code kept.
+"""
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.seed import _card_rows
+
+
+def _allocated(build):
+    """
+    Measure the memory kept alive by the object build() returns.
+
+    Returns:
+        tuple: (bytes allocated and still held, the built object)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def _median_seconds(run, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_benchmark(database_path, cards, repeats, seed):
+    """
+    Seed one deck and compare dict and record loading.
+
+    Returns:
+        dict: cards plus overhead/total bytes per card and load ms for
+            'dict' and 'record'
+    """
+    from src.config import Config
+
+    Config.DATABASE_PATH = str(database_path)
+    # Every load must hit the database, not the model cache
+    Config.MODEL_CACHE_MAX_ENTRIES = 0
+
+    from src.models.database import get_db, init_db
+    from src.models.flashcard import Flashcard
+    from src.models.read_cache import model_cache
+    from src.models.records import CardRecord
+
+    model_cache.max_entries = 0
+    init_db()
+    conn = get_db()
+    with conn:
+        conn.execute("INSERT INTO decks (id, name, created_at) VALUES (1, 'Memory benchmark', ?)", (time.time(),))
+        conn.executemany(
+            '''INSERT INTO flashcards
+               (deck_id, question, answer, created_at, studied_count, success_count, last_studied, streak)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            _card_rows(1, cards, time.time(), random.Random(seed))
+        )
+
+    def fetch_rows():
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM flashcards WHERE deck_id = 1 ORDER BY id')
+        return cursor.fetchall()
+
+    def legacy_load():
+        # What get_by_deck() did before: dicts from the rows, copied for the caller
+        cards = [dict(row) for row in fetch_rows()]
+        return [dict(card) for card in cards]
+
+    def record_load():
+        return Flashcard.get_by_deck(1)
+
+    # Containers only: build both from one set of rows so values are shared
+    rows = fetch_rows()
+    dict_overhead, dicts = _allocated(lambda: [dict(row) for row in rows])
+    record_overhead, records = _allocated(lambda: CardRecord.from_rows(rows))
+    assert len(dicts) == len(records) == cards
+    assert all(record == as_dict for record, as_dict in zip(records[:100], dicts[:100]))
+    del rows, dicts, records
+
+    dict_total, loaded = _allocated(legacy_load)
+    del loaded
+    record_total, loaded = _allocated(record_load)
+    del loaded
+
+    report = {'cards': cards}
+    for name, overhead, total, load in (
+        ('dict', dict_overhead, dict_total, legacy_load),
+        ('record', record_overhead, record_total, record_load),
+    ):
+        report[name] = {
+            'overhead_bytes_per_card': round(overhead / cards, 1),
+            'total_bytes_per_card': round(total / cards, 1),
+            'load_ms': round(_median_seconds(load, repeats) * 1000, 1)
+        }
+    conn.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare memory per card for dict rows and slotted records.')
+    parser.add_argument('--cards', type=int, default=100_000, help='cards in the deck (default 100000)')
+    parser.add_argument('--repeats', type=int, default=5, help='timed loads per variant (default 5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='flashcards-memory-') as tmp:
+        from src.config import Config
+        # The app's JSON log would drown out the report; keep it next to the database
+        Config.LOG_FILE = Config.LOG_FILE or str(Path(tmp) / 'app.log')
+        report = run_benchmark(Path(tmp) / 'memory.db', args.cards, args.repeats, args.seed)
+
+    print(f"{report['cards']} cards")
+    print(f"{'variant':<8} {'overhead B/card':>16} {'total B/card':>13} {'load ms':>9}")
+    for name in ('dict', 'record'):
+        row = report[name]
+        print(f"{name:<8} {row['overhead_bytes_per_card']:>16.1f} "
+              f"{row['total_bytes_per_card']:>13.1f} {row['load_ms']:>9.1f}")
+    saved = report['dict']['overhead_bytes_per_card'] - report['record']['overhead_bytes_per_card']
+    print(f"\nRecords save {saved:.1f} bytes per card "
+          f"({saved * report['cards'] / 2 ** 20:.1f} MiB for this deck)")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthetic data for benchmarks.
+
+Builds a library of decks whose sizes follow a skewed (Pareto) distribution:
+most decks are small and a few are very large, which is what a real library
+looks like and what exposes queries that scan a whole deck.
+
+For students: Inserting a million rows one INSERT at a time with a commit
+after each would take minutes. Here every row goes through executemany()
+inside a single transaction, and the version triggers are dropped while
+seeding (init_db() recreates them afterwards).
+"""
+
+import random
+import sqlite3
+import time
+
+from src.models.database import init_db, rebuild_deck_heads
+from src.models.flashcard import DUE_AT_SQL
+
+# Seconds in a day, for spreading study history over the past weeks
+DAY = 86400
+
+# Fraction of cards that have been studied at least once
+STUDIED_FRACTION = 0.6
+
+_WORDS = (
+    'cell membrane protein energy transfer reaction enzyme gradient signal '
+    'function structure theory value system process model layer network '
+    'variable equation force mass charge field wave particle bond acid base'
+).split()
+
+
+def deck_sizes(decks, mean_cards, skew, rng):
+    """
+    Draw a card count for every deck.
+
+    Args:
+        decks (int): Number of decks
+        mean_cards (int): Average cards per deck
+        skew (float): Pareto shape; smaller is more skewed, 0 means uniform
+        rng (random.Random): Random source
+
+    Returns:
+        list[int]: Card count per deck (at least 1 each), summing to
+            roughly decks * mean_cards
+    """
+    if skew <= 0:
+        return [mean_cards] * decks
+
+    weights = [rng.paretovariate(skew) for _ in range(decks)]
+    scale = decks * mean_cards / sum(weights)
+    return [max(1, round(weight * scale)) for weight in weights]
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def _card_rows(deck_id, count, now, rng):
+    """Yield flashcard rows with a plausible mix of study history."""
+    for _ in range(count):
+        created_at = now - rng.uniform(30, 90) * DAY
+        if rng.random() < STUDIED_FRACTION:
+            studied = rng.randint(1, 20)
+            success = rng.randint(0, studied)
+            streak = rng.randint(0, min(success, 8))
+            last_studied = now - rng.uniform(0, 30) * DAY
+        else:
+            studied = success = streak = 0
+            last_studied = None
+        yield (
+            deck_id,
+            _sentence(rng, 12) + '?',
+            _sentence(rng, 30) + '.',
+            created_at, studied, success, last_studied, streak
+        )
+
+
+def seed_database(path, decks=10000, cards_per_deck=100, skew=1.2, seed=0):
+    """
+    Create and fill a benchmark database.
+
+    Args:
+        path (str): SQLite file to create (must not contain data)
+        decks (int): Number of decks
+        cards_per_deck (int): Average cards per deck
+        skew (float): Deck size skew (see deck_sizes)
+        seed (int): Random seed so runs are comparable
+
+    Returns:
+        dict: Summary with decks, cards, largest/median deck ids and seconds taken
+    """
+    from src.config import Config
+
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    now = time.time()
+
+    Config.DATABASE_PATH = str(path)
+    init_db()
+
+    conn = sqlite3.connect(path)
+    triggers = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+    for name in triggers:
+        conn.execute(f'DROP TRIGGER {name}')
+
+    sizes = deck_sizes(decks, cards_per_deck, skew, rng)
+    with conn:
+        conn.executemany(
+            'INSERT INTO decks (id, name, created_at, version, updated_at) VALUES (?, ?, ?, 0, ?)',
+            ((deck_id, f'Benchmark deck {deck_id}', now - 90 * DAY, now)
+             for deck_id in range(1, decks + 1))
+        )
+        for deck_id, count in enumerate(sizes, start=1):
+            conn.executemany(
+                '''INSERT INTO flashcards
+                   (deck_id, question, answer, created_at, studied_count, success_count, last_studied, streak)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                _card_rows(deck_id, count, now, rng)
+            )
+        # Rows inserted directly skip Flashcard.update_stats(), which keeps due_at current
+        conn.execute(f'UPDATE flashcards SET due_at = {DUE_AT_SQL} WHERE last_studied IS NOT NULL')
+        # ... and the triggers that track each deck's next due card
+        rebuild_deck_heads(conn)
+    conn.execute('ANALYZE')
+    conn.close()
+
+    # Recreate the triggers dropped above
+    init_db()
+
+    by_size = sorted(range(decks), key=sizes.__getitem__)
+    return {
+        'decks': decks,
+        'cards': sum(sizes),
+        'largest_deck_id': by_size[-1] + 1,
+        'largest_deck_cards': sizes[by_size[-1]],
+        'median_deck_id': by_size[len(by_size) // 2] + 1,
+        'median_deck_cards': sizes[by_size[len(by_size) // 2]],
+        'seconds': round(time.perf_counter() - start, 2)
+    }
@@ -0,0 +1,178 @@
+"""
+Startup benchmark: how long a fresh worker takes to serve its first request.
+
+Each run starts a new Python process that imports the app, builds it with
+create_app() on a temporary database and serves one request through the
+test client. The tool reports the median of:
+- process: wall time of the whole child process (interpreter included)
+- import: `from src.app import create_app`
+- create_app: building the app (migrations, blueprints)
+- first_request: the first request (template compile, first queries)
+
+It also runs the import once under `python -X importtime` and lists the
+packages with the largest cumulative import time, so a heavy dependency
+creeping back into the startup path is easy to spot.
+
+Usage (from the project root):
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --path /stats --budget-ms 800
+
+For students: "Cold" runs start with an empty template bytecode cache and
+"warm" runs reuse it, which shows what the cache saves a new worker.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules we expect to stay out of the startup path (imported on first use)
+LAZY_MODULES = ('anthropic', 'httpx', 'pydantic', 'numpy')
+
+# Runs inside the child process and prints its timings as JSON
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from src.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+lazy_loaded = sorted(name for name in sys.argv[2].split(",") if name in sys.modules)
+response = app.test_client().get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "lazy_loaded": lazy_loaded,
+}))
+'''
+
+
+def _child_env(database_path, jinja_dir):
+    env = dict(os.environ)
+    env['DATABASE_PATH'] = str(database_path)
+    env['JINJA_CACHE_DIR'] = str(jinja_dir)
+    env['PYTHONPATH'] = str(PROJECT_ROOT) + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def time_startup(path, database_path, jinja_dir):
+    """
+    Start one child process and time it up to its first response.
+
+    Returns:
+        dict: process_ms, import_ms, create_app_ms, first_request_ms, status
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', _CHILD, path, ','.join(LAZY_MODULES)],
+        cwd=PROJECT_ROOT, env=_child_env(database_path, jinja_dir),
+        capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def import_profile(database_path, jinja_dir, top=10):
+    """
+    Import the app under -X importtime.
+
+    Returns:
+        dict: total_ms (sum of all self times) and the top-level packages
+            with the largest cumulative import time
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from src.app import create_app'],
+        cwd=PROJECT_ROOT, env=_child_env(database_path, jinja_dir),
+        capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    packages = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented module>"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        # A package's own line includes everything it imported (flask, jinja2, ...)
+        module = module.strip()
+        if '.' not in module and module != 'src':
+            packages.append((int(cumulative_us), module))
+
+    packages.sort(reverse=True)
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'top_modules': [{'module': name, 'cumulative_ms': round(us / 1000, 1)} for us, name in packages[:top]]
+    }
+
+
+def _median(runs, key):
+    return round(statistics.median(run[key] for run in runs), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure worker cold start and time to first request.')
+    parser.add_argument('--runs', type=int, default=5, help='processes to start per mode (default 5)')
+    parser.add_argument('--path', default='/decks', help='URL of the first request (default /decks)')
+    parser.add_argument('--budget-ms', type=float, help='fail if the warm median process time exceeds this')
+    parser.add_argument('--output', type=Path, help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = {'path': args.path}
+    with tempfile.TemporaryDirectory(prefix='flashcards-startup-') as tmp:
+        database_path = Path(tmp) / 'startup.db'
+        jinja_dir = Path(tmp) / 'jinja'
+        jinja_dir.mkdir()
+
+        # Create the schema once so every run measures a normal restart
+        time_startup(args.path, database_path, jinja_dir)
+
+        for mode in ('cold', 'warm'):
+            runs = []
+            for _ in range(args.runs):
+                if mode == 'cold':
+                    for cached in jinja_dir.iterdir():
+                        cached.unlink()
+                runs.append(time_startup(args.path, database_path, jinja_dir))
+            report[mode] = {
+                key: _median(runs, key)
+                for key in ('process_ms', 'import_ms', 'create_app_ms', 'first_request_ms')
+            }
+            report[mode]['status'] = runs[-1]['status']
+            report['lazy_modules_loaded'] = runs[-1]['lazy_loaded']
+
+        report['imports'] = import_profile(database_path, jinja_dir)
+
+    print(f"{'mode':<6} {'process ms':>11} {'import ms':>10} {'create_app':>11} {'first req':>10}")
+    for mode in ('cold', 'warm'):
+        row = report[mode]
+        print(f"{mode:<6} {row['process_ms']:>11.1f} {row['import_ms']:>10.1f} "
+              f"{row['create_app_ms']:>11.1f} {row['first_request_ms']:>10.1f}")
+    print(f"\nImport total (-X importtime): {report['imports']['total_ms']} ms")
+    for entry in report['imports']['top_modules']:
+        print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+    if report['lazy_modules_loaded']:
+        print(f"\nWarning: loaded before the first request: {', '.join(report['lazy_modules_loaded'])}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.budget_ms is not None and report['warm']['process_ms'] > args.budget_ms:
+        print(f"\nStartup {report['warm']['process_ms']} ms exceeds the {args.budget_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""
+Benchmark suite for the models and routes.
+
+Seeds a temporary database (see seed.py), then times every Deck and
+Flashcard method and every route through the Flask test client. For each
+case it records the median, p95 and mean time and the number of SQL
+statements executed, and writes the results as JSON.
+
+When a saved baseline exists, the run fails (exit code 1) if a case got
+slower than the baseline by more than --threshold, or if it now runs more
+SQL statements than before.
+
+Usage (from the project root):
+    python -m benchmarks.suite --decks 10000 --cards 100
+    python -m benchmarks.suite --save-baseline     # accept current numbers
+    python -m benchmarks.suite --filter route:     # only the routes
+    python -m benchmarks.suite --engine memory     # database copied into RAM
+
+For students: Timing a single call is noisy, so each case runs several
+times after a few warm-up calls and we compare medians. The query count is
+exact, so it catches an accidental N+1 query even when timings are noisy.
+/generate is not covered because it calls the Anthropic API.
+"""
+
+import argparse
+import io
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from benchmarks.seed import seed_database
+from src.models.database import get_db, on_statement
+
+# Where results and the baseline are kept by default
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+# A benchmark case: run(*setup()) is timed, setup() is not
+Case = namedtuple('Case', ['name', 'run', 'setup'], defaults=[None])
+
+# Statement counter, active only while a case is being timed; only the
+# timing thread's statements count (not the app's background threads)
+_query_count = [0, False]
+_timing_thread = threading.get_ident()
+
+
+@on_statement
+def _count_query(sql, parameters, elapsed):
+    if _query_count[1] and threading.get_ident() == _timing_thread:
+        _query_count[0] += 1
+
+
+def measure(case, iterations, warmup):
+    """
+    Time one case.
+
+    Args:
+        case (Case): Case to run
+        iterations (int): Timed runs
+        warmup (int): Untimed runs first (fill caches, page in the database)
+
+    Returns:
+        dict: median_ms, p95_ms, mean_ms, iterations and queries per call
+    """
+    durations = []
+    queries = []
+    for i in range(warmup + iterations):
+        args = case.setup() if case.setup else ()
+        _query_count[0], _query_count[1] = 0, True
+        start = time.perf_counter()
+        case.run(*args)
+        elapsed = time.perf_counter() - start
+        _query_count[1] = False
+        if i >= warmup:
+            durations.append(elapsed)
+            queries.append(_query_count[0])
+
+    durations.sort()
+    p95 = durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+    return {
+        'median_ms': round(statistics.median(durations) * 1000, 4),
+        'p95_ms': round(p95 * 1000, 4),
+        'mean_ms': round(statistics.fmean(durations) * 1000, 4),
+        'iterations': iterations,
+        'queries': max(queries)
+    }
+
+
+def _unique(prefix):
+    return f'{prefix} {time.perf_counter_ns()}'
+
+
+def _new_deck(cards):
+    """Create a deck with the given number of cards (setup helper, not timed)."""
+    from src.models.deck import Deck
+
+    deck = Deck.create(_unique('Scratch deck'))
+    conn = get_db()
+    now = time.time()
+    conn.executemany(
+        'INSERT INTO flashcards (deck_id, question, answer, created_at) VALUES (?, ?, ?, ?)',
+        [(deck['id'], f'Question {i}?', f'Answer {i}.', now) for i in range(cards)]
+    )
+    conn.commit()
+    conn.close()
+    return deck['id']
+
+
+def _generated_deck():
+    """A fresh 200-card deck and its card ids (setup for bulk edits, not timed)."""
+    deck_id = _new_deck(200)
+    conn = get_db()
+    rows = conn.execute('SELECT id FROM flashcards WHERE deck_id = ? ORDER BY id', (deck_id,)).fetchall()
+    conn.close()
+    return deck_id, [row['id'] for row in rows]
+
+
+def _first_card_id(deck_id):
+    conn = get_db()
+    row = conn.execute('SELECT MIN(id) AS id FROM flashcards WHERE deck_id = ?', (deck_id,)).fetchone()
+    conn.close()
+    return row['id']
+
+
+def _clear_page_caches():
+    """Forget cached pages and analytics so the next request renders from scratch."""
+    from src.services import analytics
+    from src.services.fragment_cache import fragment_cache
+
+    fragment_cache.clear()
+    with analytics._cache_lock:
+        analytics._cached_reports.clear()
+
+
+def model_cases(scale):
+    """Cases for every public Deck and Flashcard method."""
+    from src.models.deck import Deck
+    from src.models.flashcard import Flashcard
+    from src.models.read_cache import model_cache
+
+    large, median = scale['largest_deck_id'], scale['median_deck_id']
+    large_card = _first_card_id(large)
+    export = Deck.export_to_dict(median)
+
+    def one_card():
+        deck_id = _new_deck(0)
+        return (Flashcard.create(deck_id, 'Question?', 'Answer.')['id'],)
+
+    def uncached(deck_id):
+        # Drop the deck from the read cache so the run measures the database
+        def setup():
+            model_cache.invalidate_deck(deck_id)
+            return ()
+        return setup
+
+    return [
+        Case('Deck.create', Deck.create, lambda: (_unique('Created deck'),)),
+        Case('Deck.get_by_id', lambda: Deck.get_by_id(median)),
+        Case('Deck.get_by_id[uncached]', lambda: Deck.get_by_id(median), uncached(median)),
+        Case('Deck.get_version', lambda: Deck.get_version(median)),
+        Case('Deck.get_library_version', Deck.get_library_version),
+        Case('Deck.get_all', Deck.get_all),
+        Case('Deck.get_names', lambda: Deck.get_names([large, median])),
+        Case('Deck.get_all_with_stats', Deck.get_all_with_stats),
+        Case('Deck.get_overall_stats', Deck.get_overall_stats),
+        Case('Deck.export_to_dict[median]', lambda: Deck.export_to_dict(median)),
+        Case('Deck.export_to_dict[largest]', lambda: Deck.export_to_dict(large)),
+        Case('Deck.import_from_dict', Deck.import_from_dict,
+             lambda: ({**export, 'name': _unique('Imported deck')},)),
+        Case('Deck.delete', Deck.delete, lambda: (_new_deck(scale['median_deck_cards']),)),
+
+        Case('Flashcard.create', lambda: Flashcard.create(median, 'Question?', 'Answer.')),
+        Case('Flashcard.get_by_id', lambda: Flashcard.get_by_id(large_card)),
+        Case('Flashcard.get_by_deck[median]', lambda: Flashcard.get_by_deck(median)),
+        Case('Flashcard.get_by_deck[largest]', lambda: Flashcard.get_by_deck(large)),
+        Case('Flashcard.get_by_deck[largest, uncached]', lambda: Flashcard.get_by_deck(large), uncached(large)),
+        Case('Flashcard.get_page[largest]', lambda: Flashcard.get_page(large, after_id=large_card, limit=50)),
+        Case('Flashcard.get_due[median]', lambda: Flashcard.get_due(median)),
+        Case('Flashcard.get_due[largest]', lambda: Flashcard.get_due(large)),
+        Case('Flashcard.get_study_queue[largest]', lambda: Flashcard.get_study_queue(large, 50)),
+        Case('Flashcard.get_review_queue', lambda: Flashcard.get_review_queue(50, 10)),
+        Case('Flashcard.update_stats', lambda: Flashcard.update_stats(large_card, True)),
+        Case('Flashcard.update', lambda: Flashcard.update(large_card, question='Edited question?')),
+        Case('Flashcard.delete', Flashcard.delete, one_card),
+        Case('Flashcard.get_deck_stats[largest]', lambda: Flashcard.get_deck_stats(large)),
+        Case('Flashcard.bulk_change[200]', lambda deck_id, cards: Flashcard.bulk_change(
+            deck_id, edits=[{'id': card_id, 'question': 'Edited?', 'version': 0} for card_id in cards[:100]],
+            deletes=[{'id': card_id, 'version': 0} for card_id in cards[100:]]
+        ), _generated_deck),
+    ]
+
+
+def route_cases(app, scale):
+    """Cases for every route except /generate."""
+    from src.config import Config
+
+    client = app.test_client()
+    large, median = scale['largest_deck_id'], scale['median_deck_id']
+    large_card = _first_card_id(large)
+
+    def call(method, url, expect=200, **kwargs):
+        def run(headers=None):
+            response = client.open(url, method=method, headers=headers, **kwargs)
+            if response.status_code != expect:
+                raise RuntimeError(f'{method} {url} returned {response.status_code}, expected {expect}')
+            return response
+        return run
+
+    def current_etag(url):
+        # Earlier cases write to the library, so fetch the ETag right before each run
+        return lambda: ({'If-None-Match': client.get(url).headers['ETag']},)
+
+    def studying(deck_id):
+        with client.session_transaction() as session:
+            session['studying_deck_id'] = deck_id
+        return ()
+
+    def summary_ready():
+        client.post(f'/study/{median}/summary', json={
+            'results': [{'card_id': large_card, 'success': True}],
+            'total_attempts': 1, 'cards_mastered': 1
+        })
+        return ()
+
+    def cold(*_):
+        _clear_page_caches()
+        return ()
+
+    def export_file():
+        data = json.dumps({'name': _unique('Uploaded deck'),
+                           'cards': [{'question': 'Q?', 'answer': 'A.'}] * 20}).encode()
+        return (dict(data={'deck_file': (io.BytesIO(data), 'deck.json')},
+                     content_type='multipart/form-data'),)
+
+    def upload(kwargs):
+        response = client.post('/import', **kwargs)
+        if response.status_code != 302:
+            raise RuntimeError(f'POST /import returned {response.status_code}')
+
+    def scratch_card():
+        return (_first_card_id(_new_deck(1)),)
+
+    return [
+        Case('route:GET /', call('GET', '/')),
+        Case('route:GET /decks[cold]', call('GET', '/decks'), cold),
+        Case('route:GET /decks[cached]', call('GET', '/decks')),
+        Case('route:GET /decks[304]', call('GET', '/decks', 304), current_etag('/decks')),
+        Case('route:GET /preview[largest,cold]', call('GET', f'/preview/{large}'), cold),
+        Case('route:GET /preview[largest,cached]', call('GET', f'/preview/{large}')),
+        Case('route:GET /preview[304]', call('GET', f'/preview/{large}', 304),
+             current_etag(f'/preview/{large}')),
+        Case('route:GET /study[largest]', call('GET', f'/study/{large}')),
+        Case('route:GET /study/all', call('GET', '/study/all')),
+        Case('route:POST /study/grade', call('POST', f'/study/{large}/grade',
+                                             json={'card_id': large_card, 'success': True}),
+             lambda: studying(large)),
+        Case('route:POST /study/summary', call('POST', f'/study/{median}/summary', json={
+            'results': [{'card_id': large_card, 'success': True}], 'total_attempts': 1, 'cards_mastered': 1
+        })),
+        Case('route:GET /study/summary', call('GET', f'/study/{median}/summary'), summary_ready),
+        Case('route:POST /card/edit', call('POST', f'/card/{large_card}/edit',
+                                           json={'question': 'Edited?', 'answer': 'Edited.'})),
+        Case('route:POST /deck/cards/bulk', lambda deck_id, cards: call(
+            'POST', f'/deck/{deck_id}/cards/bulk',
+            json={'edits': [{'id': card_id, 'question': 'Edited?', 'version': 0} for card_id in cards[:100]],
+                  'deletes': [{'id': card_id, 'version': 0} for card_id in cards[100:]]})(),
+             _generated_deck),
+        Case('route:POST /card/delete', lambda card_id: call('POST', f'/card/{card_id}/delete')(),
+             scratch_card),
+        Case('route:POST /deck/delete', lambda deck_id: call('POST', f'/deck/{deck_id}/delete', 302)(),
+             lambda: (_new_deck(scale['median_deck_cards']),)),
+        Case('route:GET /deck/export[largest]', call('GET', f'/deck/{large}/export')),
+        Case('route:POST /import', upload, export_file),
+        Case('route:GET /stats[cold]', call('GET', '/stats'), cold),
+        Case('route:GET /stats[cached]', call('GET', '/stats')),
+        Case('route:GET /stats[304]', call('GET', '/stats', 304), current_etag('/stats')),
+        Case('route:GET /metrics', call('GET', '/metrics')),
+        Case('route:GET /api/v1/decks', call('GET', '/api/v1/decks')),
+        Case('route:GET /api/v1/cards[largest]', call('GET', f'/api/v1/decks/{large}/cards?limit=100')),
+        Case('route:POST /api/v1/sessions[largest]', call('POST', f'/api/v1/decks/{large}/sessions')),
+        Case('route:POST /api/v1/grade', call('POST', f'/api/v1/decks/{large}/grade',
+                                              json={'card_id': large_card, 'success': False}),
+             lambda: studying(large)),
+        Case('route:GET /admin/queries', call('GET', '/admin/queries'),
+             lambda: ({'X-Admin-Token': Config.ADMIN_TOKEN},)),
+    ]
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Find cases that regressed against a baseline.
+
+    Args:
+        results (dict): Case name -> measurement from this run
+        baseline (dict): Case name -> measurement from the baseline
+        threshold (float): Allowed slowdown ratio of the median (1.25 = 25%)
+        min_delta_ms (float): Ignore slowdowns smaller than this (timer noise)
+
+    Returns:
+        list[str]: One message per regression (empty if none)
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {current['queries']} queries")
+        delta = current['median_ms'] - before['median_ms']
+        if delta > min_delta_ms and current['median_ms'] > before['median_ms'] * threshold:
+            regressions.append(
+                f"{name}: median {before['median_ms']:.3f} ms -> {current['median_ms']:.3f} ms "
+                f"({current['median_ms'] / before['median_ms']:.2f}x)"
+            )
+    return regressions
+
+
+def _print_table(results, baseline):
+    print(f"{'case':<44} {'median ms':>10} {'p95 ms':>10} {'queries':>8} {'vs base':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        ratio = f"{result['median_ms'] / before['median_ms']:.2f}x" if before and before['median_ms'] else ''
+        print(f"{name:<44} {result['median_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['queries']:>8} {ratio:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--decks', type=int, default=10000, help='number of decks (default 10000)')
+    parser.add_argument('--cards', type=int, default=100, help='average cards per deck (default 100)')
+    parser.add_argument('--skew', type=float, default=1.2,
+                        help='Pareto shape of deck sizes; smaller is more skewed, 0 is uniform (default 1.2)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default 0)')
+    parser.add_argument('--iterations', type=int, default=20, help='timed runs per case (default 20)')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed runs per case (default 3)')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--engine', choices=('sqlite', 'memory'), default='sqlite',
+                        help='storage engine; memory runs on an in-memory copy of the seeded file (default sqlite)')
+    parser.add_argument('--output', type=Path, default=RESULTS_DIR / 'latest.json')
+    parser.add_argument('--baseline', type=Path, default=RESULTS_DIR / 'baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='fail when a median is this many times the baseline (default 1.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='ignore slowdowns smaller than this many ms (default 0.05)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='flashcards-bench-') as tmp:
+        print(f'Seeding {args.decks} decks x ~{args.cards} cards (skew {args.skew})...', file=sys.stderr)
+        scale = seed_database(Path(tmp) / 'bench.db', args.decks, args.cards, args.skew, args.seed)
+        print(f"Seeded {scale['cards']} cards in {scale['seconds']} s "
+              f"(largest deck {scale['largest_deck_cards']} cards)", file=sys.stderr)
+
+        # Request log lines would drown out the report; keep them with the database
+        from src.config import Config
+        Config.LOG_FILE = Config.LOG_FILE or str(Path(tmp) / 'app.log')
+        # Background maintenance would run between cases and skew timings
+        Config.MAINTENANCE_INTERVAL = 0
+        # The admin endpoints are off without a token
+        Config.ADMIN_TOKEN = Config.ADMIN_TOKEN or 'benchmark'
+
+        Config.STORAGE_ENGINE = args.engine
+        if args.engine == 'memory':
+            from src.models.engines import get_engine
+            get_engine().load(Config.DATABASE_PATH)
+
+        # Created only after the database path is set: create_app() initializes that database
+        from src.app import create_app
+        app = create_app()
+
+        cases = model_cases(scale) + route_cases(app, scale)
+        results = {}
+        for case in cases:
+            if args.filter in case.name:
+                results[case.name] = measure(case, args.iterations, args.warmup)
+
+    meta = {
+        'decks': args.decks, 'cards_per_deck': args.cards, 'skew': args.skew, 'seed': args.seed,
+        'engine': args.engine,
+        'total_cards': scale['cards'], 'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version, 'timestamp': time.time()
+    }
+    report = {'meta': meta, 'results': results}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        saved = json.loads(args.baseline.read_text())
+        scale_keys = ('decks', 'cards_per_deck', 'skew', 'seed')
+        same_engine = saved['meta'].get('engine', 'sqlite') == meta['engine']
+        if same_engine and all(saved['meta'].get(key) == meta[key] for key in scale_keys):
+            baseline = saved['results']
+        else:
+            print('Baseline was recorded at a different scale or engine; not comparing.', file=sys.stderr)
+
+    _print_table(results, baseline)
+    print(f'\nResults written to {args.output}')
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print('\nRegressions against the baseline:')
+        for message in regressions:
+            print(f'  {message}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
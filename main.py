@@ -0,0 +1,97 @@
+"""
+Production server for AI Flashcard Generator.
+
+Runs the app under Gunicorn, a pre-forking WSGI server: one master process
+starts several worker processes (one per CPU core by default), each
+handling requests on a few threads.
+
+    python main.py                         # settings from .env / Config
+    python main.py --workers 8 --threads 4 --bind 0.0.0.0:8000
+
+Startup order:
+1. The master runs database migrations (init_db) exactly once.
+2. The master imports and builds the app (preload), including the lazily
+   imported Anthropic SDK and compiled templates, so workers share its
+   memory pages instead of each importing and compiling everything again.
+3. Workers are forked. Database connections are opened per request
+   (get_db), so none are inherited; the Anthropic client is recreated in
+   each worker on first use (see flashcard_generator.get_client).
+
+Reloading without dropping requests (send signals to the master process):
+- kill -HUP <master pid>    restart workers gracefully with the same code
+- kill -USR2 <master pid>   start a new master with the new code (it runs
+                            migrations again), then kill -QUIT the old one
+
+For students: Use `python3 src/app.py` while developing (auto-reload,
+debugger). This server has no debugger and is meant for real traffic.
+Gunicorn runs on Linux and macOS only.
+"""
+
+import argparse
+
+from gunicorn.app.base import BaseApplication
+
+from src.config import Config
+from src.models.database import init_db
+
+
+class FlashcardServer(BaseApplication):
+    """Gunicorn application that serves create_app() with our settings."""
+
+    def __init__(self, options):
+        """
+        Args:
+            options (dict): Gunicorn settings (bind, workers, threads, ...)
+        """
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from src.app import create_app, precompile_templates
+
+        # Migrations already ran in main() before the server started
+        app = create_app(run_migrations=False)
+
+        # The app imports the Anthropic SDK lazily to keep single-process
+        # cold starts fast. Here the master loads it (and compiles every
+        # template) once, and forked workers inherit both for free.
+        import src.services.flashcard_generator  # noqa: F401
+        precompile_templates(app)
+        return app
+
+
+def post_worker_init(worker):
+    """Log each worker as it becomes ready (runs inside the new worker)."""
+    worker.log.info('Worker %s ready (%s threads)', worker.pid, worker.cfg.threads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run AI Flashcard Generator with Gunicorn.')
+    parser.add_argument('--bind', default=Config.WEB_BIND, help=f'address to listen on (default {Config.WEB_BIND})')
+    parser.add_argument('--workers', type=int, default=Config.WEB_WORKERS,
+                        help=f'worker processes (default {Config.WEB_WORKERS})')
+    parser.add_argument('--threads', type=int, default=Config.WEB_THREADS,
+                        help=f'threads per worker (default {Config.WEB_THREADS})')
+    args = parser.parse_args(argv)
+
+    # Run migrations once, in the master, before any worker exists
+    init_db()
+
+    FlashcardServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': Config.WEB_TIMEOUT,
+        'graceful_timeout': Config.WEB_GRACEFUL_TIMEOUT,
+        'post_worker_init': post_worker_init,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
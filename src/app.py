@@ -1,5 +1,5 @@
 """
-Flask application entry point for AI Flashcard Generator.
+Flask application factory for AI Flashcard Generator.
 
 This module creates and configures the Flask application.
 
@@ -8,36 +8,138 @@ When you run this file, Flask will:
 1. Load configuration (API keys, database settings)
 2. Initialize the database (create tables if they don't exist)
 3. Start a web server on http://localhost:5000
+
+Instead of creating the app when this module is imported, create_app()
+builds it on request (the "application factory" pattern). That lets the
+production server (main.py) run database migrations once in its master
+process and then build the app without touching the schema again.
 """
 
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
 from src.config import Config
-from src.models.database import init_db
+from src.metrics import init_metrics
+from src.logs import init_logging
+from src.maintenance import init_maintenance
+from src.tenancy import init_tenancy
+from src.cli import register_commands
+from src.models.engines import get_engine
+from src.models.records import Record
 from src.routes.main import main
+from src.routes.api import api
+from src.routes.admin import admin
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes model records (tojson, jsonify) like dicts."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+def create_app(run_migrations=True):
+    """
+    Create and configure the Flask application.
+
+    Args:
+        run_migrations (bool): Create/upgrade the database schema first.
+            The production server passes False because its master process
+            has already done this once before starting the workers.
+
+    Returns:
+        Flask: Configured application
+    """
+    # Create Flask application instance
+    # template_folder: Where Flask looks for HTML templates
+    # static_folder: Where Flask serves CSS, JS, and images from
+    app = Flask(__name__, template_folder='templates', static_folder='static')
+
+    # Load configuration from Config class
+    # This reads environment variables (API keys, etc.) from .env file
+    app.config.from_object(Config)
+
+    # Models return compact record objects instead of dicts; teach |tojson
+    # and jsonify() to serialize them
+    app.json = RecordJSONProvider(app)
+
+    # Cache compiled templates on disk so new worker processes skip compiling them
+    # For students: Jinja turns each template into Python code the first time
+    # it's used; the bytecode cache saves that work across restarts
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(Config.JINJA_CACHE_DIR or None)
+
+    # Initialize database
+    # This creates the decks and flashcards tables if they don't exist yet
+    # It's safe to run multiple times - won't delete existing data
+    # For students: The storage engine (STORAGE_ENGINE in .env) decides whether
+    # that's the SQLite file or a database held in memory
+    if run_migrations:
+        get_engine().migrate()
+
+    # Optional SQL profiler: times every statement and logs slow ones with their query plan
+    # For students: Enable it with QUERY_PROFILING=1 in .env while investigating slowness
+    if Config.QUERY_PROFILING:
+        from src.models.query_profiler import enable_profiling
+        enable_profiling()
+
+    # Background database maintenance while this process is idle
+    # For students: Registered first so its request counting sees every request,
+    # even ones another hook turns away
+    init_maintenance(app)
+
+    # Per-tenant databases: requests with a tenant header use their own file
+    # For students: Does nothing unless SHARD_DIR is set in .env
+    init_tenancy(app)
+
+    # Record per-route latency and database usage, served on /metrics
+    # For students: This adds before/after request hooks around every route
+    init_metrics(app)
+
+    # JSON request log with request ids, written by a background thread
+    # For students: Must come after init_metrics (see init_logging's docstring)
+    init_logging(app)
+
+    # Register blueprints (route modules)
+    # For students: Blueprints organize routes into separate modules
+    # The main blueprint handles homepage and flashcard generation routes
+    app.register_blueprint(main)
+
+    # The JSON API blueprint serves mobile and single-page clients under /api/v1
+    app.register_blueprint(api)
+
+    # Admin diagnostics (protected by ADMIN_TOKEN) and `flask ...` CLI commands
+    app.register_blueprint(admin)
+    register_commands(app)
+
+    return app
+
 
-# Create Flask application instance
-# template_folder: Where Flask looks for HTML templates (we'll create these in Phase 3)
-# static_folder: Where Flask serves CSS, JS, and images from
-app = Flask(__name__, template_folder='templates', static_folder='static')
+def precompile_templates(app):
+    """
+    Compile every template now instead of on first use.
 
-# Load configuration from Config class
-# This reads environment variables (API keys, etc.) from .env file
-app.config.from_object(Config)
+    Fills the bytecode cache for future processes and the app's in-memory
+    template cache, which forked workers inherit from the master.
 
-# Initialize database on startup
-# This creates the decks and flashcards tables if they don't exist yet
-# It's safe to run multiple times - won't delete existing data
-init_db()
+    Args:
+        app (Flask): Application whose templates to compile
 
-# Register blueprints (route modules)
-# For students: Blueprints organize routes into separate modules
-# The main blueprint handles homepage and flashcard generation routes
-app.register_blueprint(main)
+    Returns:
+        int: Number of templates compiled
+    """
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
 
 
 # Run the Flask development server
 # This only executes when you run this file directly (python src/app.py)
+# For production, use main.py, which runs several worker processes
 if __name__ == '__main__':
     # debug=True enables auto-reload when you change code and shows detailed error messages
     # WARNING: Never use debug=True in production!
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,190 @@
+"""
+ASGI entry point with an async path for LLM-bound routes.
+
+POST /generate is handled natively here with AsyncFlashcardGenerator: while
+a generation waits on the Anthropic API (or on a retry backoff), the event
+loop keeps serving other requests, so one process can hold hundreds of
+generations in flight. Every other route is passed to the regular Flask
+app, which a2wsgi runs on a thread pool.
+
+Run it with an ASGI server, for example:
+    uvicorn --factory src.asgi:create_asgi_app --workers 4 --port 8000
+
+For students: In the WSGI server (main.py) each request owns a thread
+until it finishes, so 8 threads means at most 8 generations at once, even
+though those threads spend almost all their time waiting on the network.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+
+from src.app import create_app
+from src.config import Config
+from src.logs import bind_request, log_event, logger, reset_request
+from src.metrics import REQUEST_LATENCY, REQUESTS
+from src.models.database import reset_tenant, set_tenant
+from src.models.shards import valid_tenant
+
+# Largest /generate form body accepted (study notes are plain text)
+MAX_FORM_BYTES = 1024 * 1024
+
+
+async def _read_body(receive, limit):
+    """Read the whole request body, or return None if it exceeds limit."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status, body=b'', content_type='text/html; charset=utf-8', headers=()):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode()),
+            (b'content-length', str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class AsyncApp:
+    """
+    ASGI application: async /generate, everything else through Flask.
+
+    Attributes:
+        flask_app (Flask): The regular application
+        wsgi: ASGI wrapper running flask_app on wsgi_threads threads
+        db_executor (ThreadPoolExecutor): Bounded pool for blocking
+            database work started from async code
+    """
+
+    def __init__(self, flask_app, wsgi_threads, db_threads):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=wsgi_threads)
+        self.db_executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='db')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/generate' and scope['method'] == 'POST':
+            start = time.perf_counter()
+            headers = dict(scope['headers'])
+
+            # Same tenant routing as src/tenancy.py does for the Flask routes
+            tenant = None
+            if Config.SHARD_DIR:
+                tenant = headers.get(Config.SHARD_TENANT_HEADER.lower().encode(), b'').decode('latin-1') or None
+                if tenant is not None and not valid_tenant(tenant):
+                    await _respond(send, 400, 'Invalid tenant id', 'text/plain; charset=utf-8')
+                    return
+            tenant_token = set_tenant(tenant)
+
+            request_id, token = bind_request(
+                'POST', '/generate', headers.get(b'x-request-id', b'').decode('latin-1'),
+                **({'tenant': tenant} if tenant else {})
+            )
+
+            async def send_with_request_id(message):
+                if message['type'] == 'http.response.start':
+                    message['headers'] = [*message['headers'], (b'x-request-id', request_id.encode())]
+                await send(message)
+
+            try:
+                status = await self.generate(receive, send_with_request_id)
+                elapsed = time.perf_counter() - start
+                # Same request log line as the Flask routes (see src/logs.py)
+                log_event(logger, 'request', force=status >= 500,
+                          status=status, duration_ms=round(elapsed * 1000, 2))
+            finally:
+                reset_request(token)
+                reset_tenant(tenant_token)
+            REQUEST_LATENCY.observe(elapsed, '/generate', 'POST')
+            REQUESTS.inc('/generate', 'POST', str(status))
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Import the Anthropic SDK now rather than inside the first
+                # /generate, where the slow import would stall the event loop
+                import src.services.flashcard_generator  # noqa: F401
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.db_executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _render(self, template, **context):
+        """Render a Flask template on the thread pool, off the event loop."""
+        def render():
+            with self.flask_app.test_request_context():
+                return render_template(template, **context)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_executor, render)
+
+    async def generate(self, receive, send):
+        """
+        Async version of main.generate(): same form fields and responses.
+
+        Returns:
+            int: HTTP status sent
+        """
+        # Already imported at startup (see _lifespan); this just binds the name
+        from src.services.flashcard_generator import AsyncFlashcardGenerator
+
+        body = await _read_body(receive, MAX_FORM_BYTES)
+        if body is None:
+            await _respond(send, 413, 'Request too large', 'text/plain; charset=utf-8')
+            return 413
+
+        form = parse_qs(body.decode('utf-8', errors='replace'))
+        notes = form.get('notes', [''])[0]
+        topic = form.get('topic', [''])[0]
+        if not notes or not topic:
+            await _respond(send, 400, 'Missing notes or topic', 'text/plain; charset=utf-8')
+            return 400
+
+        try:
+            result = await AsyncFlashcardGenerator().generate_and_save(notes, topic, self.db_executor)
+        except ValueError as e:
+            await _respond(send, 500, await self._render('error.html', error=str(e)))
+            return 500
+
+        location = f"/preview/{result['deck_id']}".encode()
+        await _respond(send, 302, headers=[(b'location', location)])
+        return 302
+
+
+def create_asgi_app(run_migrations=True):
+    """
+    Create the ASGI application (use with `uvicorn --factory`).
+
+    Args:
+        run_migrations (bool): Create/upgrade the database schema first
+
+    Returns:
+        AsyncApp: ASGI callable
+    """
+    return AsyncApp(
+        create_app(run_migrations=run_migrations), Config.ASYNC_WSGI_THREADS, Config.ASYNC_DB_THREADS
+    )
@@ -0,0 +1,104 @@
+"""
+Command-line tools registered on the Flask app.
+
+For students: Flask builds a `flask` command from these functions, e.g.
+
+    flask --app src.app query-report --top 10
+
+Each command runs inside the application context, so it can use the models
+just like a route does.
+"""
+
+import click
+
+
+def register_commands(app):
+    """
+    Attach the project's CLI commands to an app.
+
+    Args:
+        app (Flask): Application to extend
+    """
+
+    @app.cli.command('query-report')
+    @click.option('--top', default=20, show_default=True, help='Number of statements to show.')
+    @click.option('--order-by', type=click.Choice(['total', 'count', 'p99', 'max']),
+                  default='total', show_default=True, help='Sort column.')
+    @click.option('--plans/--no-plans', default=False, help='Show captured query plans.')
+    def query_report(top, order_by, plans):
+        """Show the slowest SQL statements recorded by the query profiler."""
+        from src.models.query_profiler import collect_report
+
+        rows = collect_report(top=top, order_by=order_by, include_live=False)
+        if not rows:
+            click.echo('No query statistics found. Run the app with QUERY_PROFILING=1 first.')
+            return
+
+        click.echo(f"{'count':>8} {'total ms':>11} {'p50 ms':>9} {'p99 ms':>9} {'slow':>6}  statement")
+        for row in rows:
+            click.echo(
+                f"{row['count']:>8} {row['total_ms']:>11.1f} {row['p50_ms']:>9.2f} "
+                f"{row['p99_ms']:>9.2f} {row['slow_count']:>6}  {row['statement']}"
+            )
+            if plans and row['plan']:
+                for step in row['plan']:
+                    click.echo(f"{'':>47}  -> {step}")
+
+    @app.cli.command('precompile-templates')
+    def precompile_templates_command():
+        """Compile all templates into the Jinja bytecode cache."""
+        from src.app import precompile_templates
+
+        count = precompile_templates(app)
+        click.echo(f'Compiled {count} templates.')
+
+    @app.cli.command('migrate-shards')
+    def migrate_shards():
+        """Create or upgrade the schema of every tenant database in SHARD_DIR."""
+        from src.models.database import init_db
+        from src.models.shards import shard_paths
+
+        # Shards are also migrated lazily on first use; this does it up front
+        # so the first request after a deploy doesn't pay for it
+        shards = shard_paths()
+        for tenant, path in shards:
+            init_db(path)
+            click.echo(f'Migrated {tenant}')
+        click.echo(f'{len(shards)} tenant databases up to date.')
+
+    @app.cli.command('db-maintenance')
+    @click.option('--report-only', is_flag=True, help='Only show database size and fragmentation.')
+    @click.option('--full-vacuum', is_flag=True,
+                  help='Rebuild each file first (locks it; needed once to enable incremental vacuum).')
+    def db_maintenance(report_only, full_vacuum):
+        """Purge deleted decks, checkpoint, vacuum and re-analyze every database."""
+        from src.maintenance import scheduler
+        from src.models.engines import get_engine
+        from src.models.maintenance import database_report, full_vacuum as rebuild
+
+        paths = get_engine().database_files()
+        if full_vacuum and not report_only:
+            for path in paths:
+                click.echo(f'Rebuilding {path}...')
+                rebuild(path)
+        if not report_only:
+            # Runs now, whatever the interval and however busy the app is
+            for path, result in scheduler.run_all().items():
+                skipped = f", skipped (busy): {', '.join(result['skipped'])}" if result['skipped'] else ''
+                purged = result.get('purged') or {'decks': 0, 'cards': 0}
+                click.echo(
+                    f"{path}: purged {purged['decks']} deleted decks ({purged['cards']} cards), "
+                    f"released {result.get('vacuumed_pages', 0)} pages, analyzed "
+                    f"{', '.join(result.get('analyzed') or []) or 'nothing'} in {result['seconds']} s{skipped}"
+                )
+
+        click.echo(f"{'file MB':>9} {'wal MB':>8} {'pages':>9} {'free':>8} {'frag %':>7} {'unused %':>9}  database")
+        for path in paths:
+            report = database_report(path, detailed=True)
+            fragmentation = '-' if report['fragmentation'] is None else f"{report['fragmentation'] * 100:.1f}"
+            unused = '-' if report['unused_ratio'] is None else f"{report['unused_ratio'] * 100:.1f}"
+            click.echo(
+                f"{report['file_bytes'] / 2 ** 20:>9.2f} {report['wal_bytes'] / 2 ** 20:>8.2f} "
+                f"{report['page_count']:>9} {report['freelist_pages']:>8} {fragmentation:>7} {unused:>9}  "
+                f"{path} (auto_vacuum={report['auto_vacuum']})"
+            )
@@ -35,6 +35,39 @@ class Config:
     # This will be needed when we implement the AI features
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY', '')
 
+    # ANTHROPIC_BASE_URL: Alternative address for the Anthropic API (optional)
+    # Leave empty to use the real API. Load tests point this at a local fake
+    # server (see benchmarks/fake_anthropic.py) so they don't spend API quota.
+    ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL', '')
+
+    # GENERATE_CARD_COUNT: Flashcards generated per deck (also sets the
+    # output token limit, see src/services/flashcard_generator.py)
+    GENERATE_CARD_COUNT = int(os.getenv('GENERATE_CARD_COUNT', '10'))
+
+    # GENERATE_NOTES_TOKEN_BUDGET: Most tokens of study notes sent per generation (0 = no limit)
+    # For students: Notes are cleaned up first (extra whitespace and repeated
+    # paragraphs removed), then cut at this budget (see src/services/notes.py)
+    GENERATE_NOTES_TOKEN_BUDGET = int(os.getenv('GENERATE_NOTES_TOKEN_BUDGET', '12000'))
+
+    # LLM_BREAKER_*: Circuit breaker around the Anthropic API (see src/services/circuit_breaker.py)
+    # For students: When at least MIN_CALLS calls in the last WINDOW_SECONDS
+    # failed at ERROR_RATE or more, generations fail at once for OPEN_SECONDS
+    # instead of each one waiting through its retries
+    LLM_BREAKER_WINDOW_SECONDS = float(os.getenv('LLM_BREAKER_WINDOW_SECONDS', '60'))
+    LLM_BREAKER_MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', '10'))
+    LLM_BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5'))
+    LLM_BREAKER_OPEN_SECONDS = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', '30'))
+
+    # GENERATE_LEASE_SECONDS: How long a worker may hold the lease on a generation
+    # For students: Identical /generate requests share one generation (see
+    # src/services/single_flight.py); if the worker running it dies, another
+    # one takes over once the lease runs out
+    GENERATE_LEASE_SECONDS = float(os.getenv('GENERATE_LEASE_SECONDS', '90'))
+
+    # GENERATE_REUSE_SECONDS: How long a finished generation's deck is handed
+    # to identical requests (long enough for waiting workers to pick it up)
+    GENERATE_REUSE_SECONDS = float(os.getenv('GENERATE_REUSE_SECONDS', '10'))
+
     # SECRET_KEY: Used by Flask for session security and CSRF protection
     # In production, you should set this to a fixed secret value in .env
     # For development, we generate a random one each time (not persistent)
@@ -49,3 +82,149 @@ class Config:
     # DATABASE_PATH: Location of the SQLite database file
     # Defaults to 'flashcards.db' in the project root
     DATABASE_PATH = os.getenv('DATABASE_PATH', str(project_root / 'flashcards.db'))
+
+    # STORAGE_ENGINE: Where the models keep their data (see src/models/engines.py)
+    # 'sqlite' uses the files above; 'memory' keeps every database in RAM and
+    # loses it on exit, for tests and benchmarks (single process only)
+    STORAGE_ENGINE = os.getenv('STORAGE_ENGINE', 'sqlite')
+
+    # SHARD_DIR: Give each tenant its own database file in this directory (optional)
+    # For students: Leave empty for a single shared database. When set, requests
+    # carrying the SHARD_TENANT_HEADER use SHARD_DIR/<tenant>.db, created on first use;
+    # requests without it keep using DATABASE_PATH.
+    SHARD_DIR = os.getenv('SHARD_DIR', '')
+
+    # SHARD_TENANT_HEADER: Request header naming the tenant
+    # Set it from your login proxy and strip it from client requests, otherwise
+    # anyone can read another tenant's decks by sending the header themselves
+    SHARD_TENANT_HEADER = os.getenv('SHARD_TENANT_HEADER', 'X-Tenant-ID')
+
+    # SHARD_MAX_OPEN_CONNECTIONS: Unused tenant connections kept open per process
+    # Each one holds up to 3 file descriptors; the least recently used are closed first
+    SHARD_MAX_OPEN_CONNECTIONS = int(os.getenv('SHARD_MAX_OPEN_CONNECTIONS', '64'))
+
+    # MODEL_CACHE_MAX_ENTRIES: Decks and card lists kept in memory per process
+    # Set to 0 to turn the read cache off (see src/models/read_cache.py)
+    MODEL_CACHE_MAX_ENTRIES = int(os.getenv('MODEL_CACHE_MAX_ENTRIES', '1024'))
+
+    # MODEL_CACHE_TTL: Seconds a cached deck or card list may be reused
+    MODEL_CACHE_TTL = float(os.getenv('MODEL_CACHE_TTL', '60'))
+
+    # MODEL_CACHE_POLL_SECONDS: How often to check for writes by other worker processes
+    # For students: Writes made by this process clear the cache immediately;
+    # other workers' writes are noticed within this many seconds
+    MODEL_CACHE_POLL_SECONDS = float(os.getenv('MODEL_CACHE_POLL_SECONDS', '1.0'))
+
+    # STUDY_SESSION_CARDS: Most cards in one study session, weakest cards first
+    # For students: Large decks are studied in short sessions of their weakest
+    # cards instead of all at once (see Flashcard.get_study_queue)
+    STUDY_SESSION_CARDS = int(os.getenv('STUDY_SESSION_CARDS', '50'))
+
+    # REVIEW_SESSION_CARDS: Most cards in a "review all due cards" session (/study/all)
+    REVIEW_SESSION_CARDS = int(os.getenv('REVIEW_SESSION_CARDS', '50'))
+
+    # REVIEW_MAX_PER_DECK: Most cards one deck may put in that session
+    # For students: Without a cap, one large neglected deck would fill every session
+    REVIEW_MAX_PER_DECK = int(os.getenv('REVIEW_MAX_PER_DECK', '10'))
+
+    # FRAGMENT_CACHE_MAX_BYTES: Memory budget for cached rendered pages
+    # Rendered preview/decks/stats pages are kept in an in-process LRU cache
+    # until their deck or the library changes (default: 32 MB per process)
+    FRAGMENT_CACHE_MAX_BYTES = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+    # FRAGMENT_CACHE_DIR: Optional directory for sharing rendered pages
+    # When set, rendered pages are also written here so every worker process
+    # on the same machine can reuse them. Leave empty to keep them in memory only.
+    FRAGMENT_CACHE_DIR = os.getenv('FRAGMENT_CACHE_DIR', '')
+
+    # JINJA_CACHE_DIR: Where compiled templates are cached between restarts
+    # New worker processes load templates from here instead of compiling them
+    # again. Leave empty to use a folder in the system temp directory.
+    JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR', '')
+
+    # QUERY_PROFILING: Time every SQL statement and log slow ones (opt-in)
+    # Set to 1 to enable; adds a small cost to every query, so it's off by default
+    QUERY_PROFILING = os.getenv('QUERY_PROFILING', '0').lower() in ('1', 'true', 'yes')
+
+    # SLOW_QUERY_MS: Statements slower than this are logged with their query plan
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '50'))
+
+    # QUERY_PROFILE_DIR: Where each worker process saves its query statistics
+    # The `flask query-report` command merges the files found here
+    QUERY_PROFILE_DIR = os.getenv('QUERY_PROFILE_DIR', str(project_root / 'query_profiles'))
+
+    # Logging: app logs are written as JSON lines by a background thread (src/logs.py)
+    # LOG_LEVEL: Minimum level for all app loggers (DEBUG, INFO, WARNING, ERROR)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+    # LOG_LEVELS: Per-module overrides, e.g. "src.routes.main=DEBUG,src.logs=WARNING"
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+
+    # LOG_SAMPLE_RATES: Fraction of high-volume events to keep, e.g. "request=0.1"
+    # For students: Failed requests (5xx) are always logged, whatever the rate
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'request=0.1,card_graded=0.1')
+
+    # LOG_FILE: Write logs to this file instead of stderr (optional)
+    LOG_FILE = os.getenv('LOG_FILE', '')
+
+    # LOG_QUEUE_SIZE: Records waiting to be written before new ones are dropped
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    # Database maintenance (src/maintenance.py): WAL checkpoints, incremental
+    # vacuum and fresh planner statistics, run in the background while idle
+    # MAINTENANCE_INTERVAL: Seconds between runs; 0 turns the background job off
+    # (run `flask db-maintenance` from cron instead)
+    MAINTENANCE_INTERVAL = float(os.getenv('MAINTENANCE_INTERVAL', '3600'))
+
+    # MAINTENANCE_QUIET_SECONDS: How long a worker must be idle before a run starts
+    MAINTENANCE_QUIET_SECONDS = float(os.getenv('MAINTENANCE_QUIET_SECONDS', '2'))
+
+    # MAINTENANCE_VACUUM_PAGES: Free pages released per step of incremental vacuum
+    # For students: Smaller steps hold the write lock for less time each
+    MAINTENANCE_VACUUM_PAGES = int(os.getenv('MAINTENANCE_VACUUM_PAGES', '256'))
+
+    # MAINTENANCE_BUSY_TIMEOUT_MS: How long a maintenance step waits for a lock
+    # before backing off (requests wait up to 10 seconds; maintenance gives way)
+    MAINTENANCE_BUSY_TIMEOUT_MS = int(os.getenv('MAINTENANCE_BUSY_TIMEOUT_MS', '50'))
+
+    # PURGE_BATCH_SIZE: Cards removed per transaction when purging a deleted deck
+    # For students: Deleting a deck only hides it; a background thread removes
+    # its cards a batch at a time so the write lock is never held for long
+    PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '500'))
+
+    # PURGE_PAUSE_MS: Pause between purge batches, leaving the lock to requests
+    PURGE_PAUSE_MS = int(os.getenv('PURGE_PAUSE_MS', '50'))
+
+    # ADMIN_TOKEN: Shared secret for the /admin endpoints
+    # Requests must send it in the X-Admin-Token header. When unset, the admin
+    # endpoints are switched off (404) - behind a reverse proxy every request
+    # comes from localhost, so the client address can't be trusted instead.
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+    # Production server settings (used by main.py)
+    # For students: Each worker is a separate process, so several CPU cores
+    # can handle requests at once; threads let one worker keep serving other
+    # requests while a request waits on the AI API.
+    # WEB_BIND: Address and port to listen on
+    WEB_BIND = os.getenv('WEB_BIND', '127.0.0.1:8000')
+
+    # WEB_WORKERS: Number of worker processes (default: one per CPU core)
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', str(os.cpu_count() or 1)))
+
+    # WEB_THREADS: Request threads per worker process
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+
+    # WEB_TIMEOUT: Seconds a silent worker may go before it is restarted
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '120'))
+
+    # WEB_GRACEFUL_TIMEOUT: Seconds workers get to finish requests on reload/shutdown
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+
+    # Async server settings (used by src/asgi.py under uvicorn)
+    # ASYNC_WSGI_THREADS: Threads running the regular (non-async) routes per process
+    ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '10'))
+
+    # ASYNC_DB_THREADS: Threads for database work started by async routes
+    # For students: SQLite calls block, so async code hands them to this
+    # small pool instead of stalling the event loop
+    ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', '4'))
@@ -0,0 +1,284 @@
+"""
+Structured logging that never blocks a request on log I/O.
+
+Every logger under `src.` hands its records to a QueueHandler, which only
+puts them on an in-memory queue. A background QueueListener thread turns
+them into JSON lines and writes them to stderr (or LOG_FILE). Each line
+carries the request it belongs to (request_id, method, route, deck_id,
+and tenant when per-tenant databases are enabled)
+plus the event's own fields, for example:
+
+    {"ts": "2026-01-05T10:00:00.123+00:00", "level": "INFO", "logger": "src.logs",
+     "event": "request", "request_id": "4f1c...", "method": "GET",
+     "route": "/study/<int:deck_id>", "deck_id": 7, "status": 200, "duration_ms": 3.2}
+
+Settings (see Config): LOG_LEVEL and per-module LOG_LEVELS, LOG_SAMPLE_RATES
+to keep only a fraction of high-volume events, LOG_FILE and LOG_QUEUE_SIZE.
+
+For students: Writing to stderr takes a lock, and a flush can wait on the
+disk or a slow log collector. With the queue, a request only pays for
+appending a record to a list; if the writer falls behind and the queue
+fills up, records are dropped (and counted) instead of slowing requests.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import g, request
+from src.config import Config
+from src.metrics import LOG_RECORDS_DROPPED, request_db_stats
+from src.models.database import current_tenant
+
+logger = logging.getLogger(__name__)
+
+# Request fields added to every record logged while handling a request
+_request_context = ContextVar('log_request_context', default=None)
+
+# Incoming X-Request-ID values we accept as-is (anything else gets a new id)
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Formats tracebacks before records are queued
+_exception_formatter = logging.Formatter()
+
+_queue_handler = None
+_listener = None
+_sample_rates = {}
+
+
+def parse_settings(text):
+    """
+    Parse "name=value,name=value" settings such as LOG_LEVELS.
+
+    Args:
+        text (str): Comma-separated name=value pairs (may be empty)
+
+    Returns:
+        dict: name -> value (both stripped strings)
+    """
+    settings = {}
+    for item in text.split(','):
+        name, sep, value = item.partition('=')
+        if sep and name.strip():
+            settings[name.strip()] = value.strip()
+    return settings
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'request_context', None) or {})
+        entry.update(getattr(record, 'fields', None) or {})
+        if getattr(record, 'sample_rate', None) is not None:
+            entry['sample_rate'] = record.sample_rate
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of waiting when the queue is full.
+
+    The record is prepared in the logging thread, so it captures that
+    thread's request context; formatting to JSON happens on the listener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        # Resolve the message and traceback now: args may be mutable objects
+        # and exc_info can't cross to another thread safely
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.request_context = _request_context.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _output_handler():
+    """Create the handler the listener thread writes through."""
+    if Config.LOG_FILE:
+        # WatchedFileHandler reopens the file after logrotate moves it
+        handler = logging.handlers.WatchedFileHandler(Config.LOG_FILE)
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _start_listener(handlers):
+    global _listener
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """Write out whatever is still queued (runs at interpreter exit)."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_after_fork():
+    """
+    Give a forked worker its own queue and listener thread.
+
+    For students: fork() copies memory but not threads, so a worker would
+    inherit the master's queue with nobody reading it, and every record
+    would sit there until the queue filled up.
+    """
+    if _listener is not None:
+        _start_listener(_listener.handlers)
+
+
+def configure_logging():
+    """
+    Route every `src.*` logger through the queue (once per process).
+
+    Safe to call repeatedly; only the first call sets anything up.
+    """
+    global _queue_handler, _sample_rates
+    if _queue_handler is not None:
+        return
+
+    _sample_rates = {name: float(rate) for name, rate in parse_settings(Config.LOG_SAMPLE_RATES).items()}
+
+    root = logging.getLogger('src')
+    root.setLevel(Config.LOG_LEVEL.upper())
+    for name, level in parse_settings(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _queue_handler = NonBlockingQueueHandler(None)
+    root.addHandler(_queue_handler)
+    # The JSON pipeline is the only output for app logs, even if something
+    # else adds handlers to the root logger
+    root.propagate = False
+
+    _start_listener([_output_handler()])
+    atexit.register(_stop_listener)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def log_event(log, event, level=logging.INFO, force=False, **fields):
+    """
+    Log a structured event, subject to its level and sample rate.
+
+    Args:
+        log (logging.Logger): Logger of the calling module
+        event (str): Event name, also the key in LOG_SAMPLE_RATES
+        level (int): Logging level
+        force (bool): Ignore sampling (e.g. for failed requests)
+        **fields: Values added to the JSON line
+
+    For students: The level check comes first so a disabled event costs
+    almost nothing, which matters on routes called for every card.
+    """
+    if not log.isEnabledFor(level):
+        return
+    rate = None if force else _sample_rates.get(event)
+    if rate is not None and rate >= 1.0:
+        rate = None
+    if rate is not None and random.random() >= rate:
+        return
+    # sample_rate lets whoever counts these lines scale them back up
+    log.log(level, event, extra={'fields': fields, 'sample_rate': rate})
+
+
+def bind_request(method, route, request_id=None, **fields):
+    """
+    Attach request fields to everything logged until reset_request().
+
+    Args:
+        method (str): HTTP method
+        route (str): URL rule (not the raw path, to keep values bounded)
+        request_id (str): Incoming X-Request-ID header, if any
+        **fields: Extra fields such as deck_id
+
+    Returns:
+        tuple: (request id used, token for reset_request)
+    """
+    if not request_id or not _REQUEST_ID.match(request_id):
+        request_id = uuid.uuid4().hex
+    context = {'request_id': request_id, 'method': method, 'route': route}
+    context.update(fields)
+    return request_id, _request_context.set(context)
+
+
+def reset_request(token):
+    """Stop attaching the fields set by bind_request()."""
+    _request_context.reset(token)
+
+
+def init_logging(app):
+    """
+    Configure logging and add request ids and a request log to an app.
+
+    Register this after init_metrics(): after_request hooks run in reverse
+    order, so ours still sees the request's database totals.
+
+    Args:
+        app (Flask): Application to instrument
+    """
+    configure_logging()
+
+    @app.before_request
+    def _bind_request_log():
+        rule = request.url_rule
+        fields = {}
+        tenant = current_tenant()
+        if tenant is not None:
+            fields['tenant'] = tenant
+        if request.view_args and 'deck_id' in request.view_args:
+            fields['deck_id'] = request.view_args['deck_id']
+        g.request_id, g.log_token = bind_request(
+            request.method, rule.rule if rule is not None else 'unmatched',
+            request.headers.get('X-Request-ID'), **fields
+        )
+        g.log_start = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        if 'log_token' not in g:
+            return response
+        response.headers['X-Request-ID'] = g.request_id
+
+        fields = {
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.log_start) * 1000, 2)
+        }
+        stats = request_db_stats()
+        if stats is not None:
+            fields['db_queries'] = stats[0]
+            fields['db_ms'] = round(stats[1] * 1000, 2)
+        log_event(logger, 'request', force=response.status_code >= 500, **fields)
+
+        reset_request(g.pop('log_token'))
+        return response
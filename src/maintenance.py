@@ -0,0 +1,264 @@
+"""
+Run database maintenance in the background when the app is quiet.
+
+init_maintenance() counts the requests a worker process is handling and
+starts a scheduler thread in each process on its first request. Every
+MAINTENANCE_INTERVAL seconds the thread waits for a quiet moment (no
+request in flight and none for MAINTENANCE_QUIET_SECONDS), then runs
+src/models/maintenance.run_maintenance() on the main database and every
+tenant shard. A run stops vacuuming as soon as requests come in again.
+
+With several worker processes, each database records when it was last
+maintained (library_meta.maintained_at), and only the worker that claims
+it runs the job.
+
+A second thread, the DeckPurger, removes the cards of deleted decks
+shortly after Deck.delete() hides them, in small batches (see
+purge_deleted_decks). When it starts it also picks up any purge that a
+crash or restart interrupted.
+
+For students: A daemon thread is a background thread that doesn't keep
+the process alive on exit. The thread is started on the first request
+rather than in create_app(), because the production server forks its
+workers after building the app and threads don't survive a fork.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import Config
+from src.logs import log_event
+from src.models.database import on_deck_deleted
+from src.models.engines import get_engine
+from src.models.maintenance import claim_run, purge_deleted_decks, run_maintenance
+
+logger = logging.getLogger(__name__)
+
+# Wait this long after a process starts before its first run, so a deploy
+# doesn't start vacuuming while workers warm up (capped at the interval)
+STARTUP_DELAY_SECONDS = 60
+
+
+class MaintenanceScheduler:
+    """Tracks request activity and runs maintenance between requests."""
+
+    def __init__(self, interval, quiet_seconds):
+        """
+        Args:
+            interval (float): Seconds between runs (0 disables the thread)
+            quiet_seconds (float): Idle time required before a run starts
+        """
+        self.interval = interval
+        self.quiet_seconds = quiet_seconds
+
+        self._in_flight = 0
+        self._last_request = time.monotonic()
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+        self.runs = 0
+        self.busy_skips = 0
+        self.last_result = None
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+            if self._started_pid != os.getpid() and self.interval > 0:
+                self._started_pid = os.getpid()
+                threading.Thread(target=self._loop, name='db-maintenance', daemon=True).start()
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._last_request = time.monotonic()
+
+    def is_quiet(self):
+        """
+        Returns:
+            bool: True if no request is running and none ran recently
+        """
+        with self._lock:
+            return self._in_flight == 0 and time.monotonic() - self._last_request >= self.quiet_seconds
+
+    def _loop(self):
+        next_run = time.monotonic() + min(STARTUP_DELAY_SECONDS, self.interval)
+        while True:
+            time.sleep(max(self.quiet_seconds, 1.0))
+            if time.monotonic() < next_run or not self.is_quiet():
+                continue
+            try:
+                self.run_all(claim=True)
+            except Exception:
+                logger.exception('Database maintenance failed')
+            next_run = time.monotonic() + self.interval
+
+    def run_all(self, claim=False):
+        """
+        Maintain the main database and every tenant shard (the storage
+        engine's database files).
+
+        Args:
+            claim (bool): Only maintain databases no other process has
+                maintained within the interval
+
+        Returns:
+            dict: Database path -> run_maintenance() result (databases
+                skipped because of the claim are left out)
+        """
+        results = {}
+        for path in get_engine().database_files():
+            if not self.is_quiet() and claim:
+                # Requests are back; pick up the rest at the next quiet moment
+                break
+            if claim and not claim_run(path, self.interval):
+                continue
+            result = run_maintenance(path, should_continue=self.is_quiet if claim else None)
+            results[path] = result
+
+            with self._lock:
+                self.runs += 1
+                self.busy_skips += len(result['skipped'])
+                if path == Config.DATABASE_PATH:
+                    self.last_result = result
+            log_event(
+                logger, 'db_maintenance', path=path, seconds=result['seconds'], purged=result.get('purged'),
+                vacuumed_pages=result.get('vacuumed_pages'), analyzed=result.get('analyzed'),
+                skipped=result['skipped'], **result['report']
+            )
+        return results
+
+    def stats(self):
+        """
+        Report maintenance activity and the main database's last known size.
+
+        Returns:
+            dict: runs, busy_skips, decks_purged, cards_purged, and
+                file_bytes, wal_bytes, page_count, freelist_pages from the
+                last run of the main database
+        """
+        with self._lock:
+            stats = {'runs': self.runs, 'busy_skips': self.busy_skips, **purger.stats()}
+            if self.last_result is not None:
+                report = self.last_result['report']
+                for field in ('file_bytes', 'wal_bytes', 'page_count', 'freelist_pages'):
+                    stats[field] = report[field]
+            return stats
+
+    def _after_fork(self):
+        # The parent's counts describe its own requests; the thread is
+        # started again by this process's first request
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+
+class DeckPurger:
+    """Background thread that purges deleted decks soon after deletion."""
+
+    # Seconds to wait before retrying a database that was too busy
+    RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self._pending = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+        self.decks_purged = 0
+        self.cards_purged = 0
+
+    def schedule(self, path):
+        """Purge a database's deleted decks as soon as possible."""
+        with self._lock:
+            self._pending.add(path)
+        self._wake.set()
+
+    def ensure_started(self):
+        """Start this process's purge thread (once per process)."""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            paths = get_engine().database_files()
+            if not paths:
+                # Nothing on disk (in-memory engine): deleted decks stay
+                # hidden and vanish with the process
+                return
+            # Resume purges that a crash or restart interrupted
+            self._pending.update(paths)
+        self._wake.set()
+        threading.Thread(target=self._loop, name='deck-purge', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(timeout=self.RETRY_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                paths, self._pending = self._pending, set()
+
+            for path in paths:
+                start = time.perf_counter()
+                try:
+                    purged = purge_deleted_decks(path)
+                except sqlite3.OperationalError as e:
+                    # Still locked after backing off: try again later
+                    logger.warning('Deck purge of %s postponed: %s', path, e)
+                    with self._lock:
+                        self._pending.add(path)
+                    continue
+                except Exception:
+                    logger.exception('Deck purge of %s failed', path)
+                    continue
+                if purged['decks'] or purged['cards']:
+                    with self._lock:
+                        self.decks_purged += purged['decks']
+                        self.cards_purged += purged['cards']
+                    log_event(logger, 'decks_purged', path=path,
+                              seconds=round(time.perf_counter() - start, 3), **purged)
+
+    def stats(self):
+        """
+        Returns:
+            dict: decks_purged and cards_purged by this process
+        """
+        with self._lock:
+            return {'decks_purged': self.decks_purged, 'cards_purged': self.cards_purged}
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = set()
+
+
+# Shared scheduler and purger for this process
+scheduler = MaintenanceScheduler(
+    interval=Config.MAINTENANCE_INTERVAL,
+    quiet_seconds=Config.MAINTENANCE_QUIET_SECONDS
+)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=scheduler._after_fork)
+
+purger = DeckPurger()
+on_deck_deleted(purger.schedule)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=purger._after_fork)
+
+
+def init_maintenance(app):
+    """
+    Track requests so maintenance only runs while this process is idle, and
+    start the background threads on the first request.
+
+    Args:
+        app (Flask): Application to extend
+    """
+    @app.before_request
+    def _maintenance_request_started():
+        scheduler.request_started()
+        purger.ensure_started()
+
+    @app.teardown_request
+    def _maintenance_request_finished(exc):
+        scheduler.request_finished()
@@ -0,0 +1,316 @@
+"""
+Metrics subsystem with a Prometheus text endpoint.
+
+This module records, per process:
+- per-route request latency histograms and request counts by status
+- SQL statements and database time per request (via the database layer's
+  statement observers)
+- LLM call latency and retries (recorded by FlashcardGenerator) and the
+  state of the Anthropic API circuit breaker
+- /generate requests that shared another request's generation
+- log records dropped by the logging queue (see src/logs.py)
+
+and serves them on /metrics in the Prometheus text exposition format.
+
+For students: A histogram doesn't store every measurement. It counts how many
+measurements fell at or below each bucket boundary, which is enough for
+Prometheus to estimate percentiles while keeping each observation to a few
+additions, cheap enough for the hot grading route.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, request
+from src.models.database import on_statement
+
+# Bucket boundaries in seconds for request and LLM latencies
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bucket boundaries in seconds for database time per request
+DB_TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Bucket boundaries for SQL statements per request
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# [statement count, database seconds] for the request being handled
+_request_db_stats = ContextVar('request_db_stats', default=None)
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, *labelvalues, value):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, optionally split by labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        # Find the bucket outside the lock; only the additions are serialized
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labelvalues, list(series)) for labelvalues, series in self._series.items()]
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, labelvalues, f'le="{le}"'), cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum', labels, series[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Register a callable that refreshes gauges right before a scrape.
+
+        For students: Some values (like cache sizes) live elsewhere, so
+        instead of updating them constantly we read them when asked.
+        """
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        for collector in self._collectors:
+            collector()
+
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request.',
+    ('route', 'method')
+))
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Requests handled, by response status.',
+    ('route', 'method', 'status')
+))
+QUERIES_PER_REQUEST = registry.register(Histogram(
+    'db_queries_per_request', 'SQL statements executed while handling a request.',
+    ('route',), buckets=QUERY_COUNT_BUCKETS
+))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    'db_time_per_request_seconds', 'Database time spent while handling a request.',
+    ('route',), buckets=DB_TIME_BUCKETS
+))
+LLM_LATENCY = registry.register(Histogram(
+    'llm_request_duration_seconds', 'Duration of each Anthropic API call attempt.',
+    ('outcome',)
+))
+LLM_RETRIES = registry.register(Counter(
+    'llm_retries_total', 'Anthropic API calls retried after an error.',
+    ('reason',)
+))
+GENERATIONS_COALESCED = registry.register(Counter(
+    'generations_coalesced_total', "Generate requests answered by an identical request's generation.",
+    ('scope',)
+))
+LLM_CIRCUIT = registry.register(Gauge(
+    'llm_circuit', 'Anthropic API circuit breaker (state: 0 closed, 1 half-open, 2 open; opens, rejected, '
+    'window_calls, window_error_rate).',
+    ('field',)
+))
+LOG_RECORDS_DROPPED = registry.register(Counter(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full.'
+))
+MODEL_CACHE = registry.register(Gauge(
+    'model_cache', 'Deck/card read cache counters (hits, misses, hit_ratio, evictions, invalidations, entries).',
+    ('field',)
+))
+SHARD_POOL = registry.register(Gauge(
+    'shard_pool', 'Tenant database connection pool counters (idle, shards, opened, reused, evicted).',
+    ('field',)
+))
+DB_MAINTENANCE = registry.register(Gauge(
+    'db_maintenance', 'Database maintenance runs, busy skips, purged decks/cards and main database size '
+    '(file_bytes, wal_bytes, page_count, freelist_pages) as of the last run.',
+    ('field',)
+))
+FRAGMENT_CACHE = registry.register(Gauge(
+    'fragment_cache', 'Rendered page cache counters (hits, misses, hit_ratio, entries, bytes, evictions).',
+    ('field',)
+))
+
+
+@on_statement
+def _count_statement(sql, parameters, elapsed):
+    """Add a statement to the current request's database totals."""
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def request_db_stats():
+    """
+    Database totals for the request being handled.
+
+    Returns:
+        tuple: (statements, seconds), or None outside a request
+    """
+    stats = _request_db_stats.get()
+    return (stats[0], stats[1]) if stats is not None else None
+
+
+@registry.add_collector
+def _collect_fragment_cache():
+    from src.services.fragment_cache import fragment_cache
+    for field, value in fragment_cache.stats().items():
+        FRAGMENT_CACHE.set(field, value=value)
+
+
+@registry.add_collector
+def _collect_model_cache():
+    from src.models.read_cache import model_cache
+    for field, value in model_cache.stats().items():
+        MODEL_CACHE.set(field, value=value)
+
+
+@registry.add_collector
+def _collect_shard_pool():
+    from src.models.shards import shard_pool
+    for field, value in shard_pool.stats().items():
+        SHARD_POOL.set(field, value=value)
+
+
+@registry.add_collector
+def _collect_llm_circuit():
+    from src.services.circuit_breaker import llm_breaker
+    for field, value in llm_breaker.stats().items():
+        LLM_CIRCUIT.set(field, value=value)
+
+
+@registry.add_collector
+def _collect_db_maintenance():
+    from src.maintenance import scheduler
+    for field, value in scheduler.stats().items():
+        DB_MAINTENANCE.set(field, value=value)
+
+
+def _route_label():
+    """Label requests by URL rule (not the raw path) to keep label counts bounded."""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def init_metrics(app):
+    """
+    Attach request instrumentation and the /metrics endpoint to an app.
+
+    Args:
+        app (Flask): Application to instrument
+    """
+    @app.before_request
+    def _start_request_metrics():
+        request.environ['metrics.start'] = time.perf_counter()
+        request.environ['metrics.db_token'] = _request_db_stats.set([0, 0.0])
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = request.environ.get('metrics.start')
+        if start is None:
+            return response
+
+        elapsed = time.perf_counter() - start
+        route = _route_label()
+        REQUEST_LATENCY.observe(elapsed, route, request.method)
+        REQUESTS.inc(route, request.method, str(response.status_code))
+
+        stats = _request_db_stats.get()
+        if stats is not None:
+            QUERIES_PER_REQUEST.observe(stats[0], route)
+            DB_TIME_PER_REQUEST.observe(stats[1], route)
+            _request_db_stats.reset(request.environ.pop('metrics.db_token'))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Expose all metrics in the Prometheus text format."""
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
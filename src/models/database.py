@@ -7,21 +7,267 @@ Uses sqlite3 standard library (no ORM) for simplicity.
 
 import sqlite3
 import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
+from src.config import Config
 
-def get_db():
+# Callbacks run after a model method commits a write (see notify_write)
+_write_listeners = []
+
+# Callbacks run after every SQL statement (see on_statement)
+_statement_observers = []
+
+# Callbacks run after a deck is soft-deleted (see on_deck_deleted)
+_delete_listeners = []
+
+# SQL condition for flashcard queries: skip cards of decks that were deleted
+# but not purged yet. The subquery doesn't depend on the row, so SQLite runs
+# it once, through the small index of deleted decks.
+NOT_IN_DELETED_DECK = 'deck_id NOT IN (SELECT id FROM decks WHERE deleted_at IS NOT NULL)'
+
+# Tenant whose database the current request (or task) uses; None = the
+# main database at Config.DATABASE_PATH (see src/models/shards.py)
+_current_tenant = ContextVar('current_tenant', default=None)
+
+
+def current_tenant():
+    """
+    Get the tenant the current request is using.
+
+    Returns:
+        str: Tenant id, or None when using the main database
+    """
+    return _current_tenant.get()
+
+
+def set_tenant(tenant):
+    """
+    Switch the current context to a tenant's database.
+
+    Args:
+        tenant (str or None): Tenant id (validated by the caller), or None
+            for the main database
+
+    Returns:
+        Token: Pass to reset_tenant() to switch back
+    """
+    return _current_tenant.set(tenant)
+
+
+def reset_tenant(token):
+    """Undo a set_tenant() call."""
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def use_tenant(tenant):
+    """
+    Run a block of code against a tenant's database.
+
+    For students: Scripts and background jobs use this where a request
+    would have picked the tenant from its headers:
+
+        with use_tenant('acme'):
+            decks = Deck.get_all()
+    """
+    token = set_tenant(tenant)
+    try:
+        yield
+    finally:
+        reset_tenant(token)
+
+
+def on_write(listener):
+    """
+    Register a callback that runs after every committed model write.
+
+    For students: In-memory caches use this to throw away stale copies as
+    soon as the Deck or Flashcard models change the data behind them.
+
+    Args:
+        listener (callable): Called as listener(deck_id); deck_id is None
+            when the write isn't tied to a single deck
+
+    Returns:
+        callable: The listener (so this can be used as a decorator)
+    """
+    _write_listeners.append(listener)
+    return listener
+
+
+def notify_write(deck_id=None):
+    """
+    Tell registered listeners that a deck's data changed.
+
+    Args:
+        deck_id (int, optional): Deck whose cards or metadata changed
+    """
+    for listener in _write_listeners:
+        listener(deck_id)
+
+
+def on_deck_deleted(listener):
+    """
+    Register a callback that runs after a deck is soft-deleted.
+
+    Args:
+        listener (callable): Called as listener(path) with the database
+            file the deck was deleted from
+
+    Returns:
+        callable: The listener (so this can be used as a decorator)
+    """
+    _delete_listeners.append(listener)
+    return listener
+
+
+def notify_deck_deleted(path):
+    """
+    Tell registered listeners that a database has a deck waiting to be purged.
+
+    Args:
+        path (str): Database file
     """
-    Get a connection to the SQLite database.
+    for listener in _delete_listeners:
+        listener(path)
+
+
+def on_statement(observer):
+    """
+    Register a callback that runs after every SQL statement.
+
+    For students: This is how the metrics and the slow-query profiler see
+    the queries the models run, without changing any model code.
+
+    Args:
+        observer (callable): Called as observer(sql, parameters, elapsed)
+            where elapsed is the wall time in seconds spent executing the
+            statement and fetching its rows
 
     Returns:
-        sqlite3.Connection: Connection to flashcards.db in project root
+        callable: The observer (so this can be used as a decorator)
+    """
+    _statement_observers.append(observer)
+    return observer
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement and reports it to the observers.
+
+    SQLite does a statement's work while rows are stepped, which happens
+    partly in execute() and partly in the fetch calls, so both are timed.
+    The statement is reported when the cursor runs its next statement or
+    is closed / garbage collected (the models close connections right away).
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._statement = None
+
+    def _report(self):
+        statement = self._statement
+        self._statement = None
+        # The observer list can already be gone when this runs from __del__
+        # during interpreter shutdown
+        if statement is not None and _statement_observers:
+            for observer in _statement_observers:
+                observer(*statement)
+
+    def _timed(self, method, sql, parameters):
+        self._report()
+        start = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        finally:
+            self._statement = [sql, parameters, time.perf_counter() - start]
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[2] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def close(self):
+        self._report()
+        super().close()
+
+    def __del__(self):
+        self._report()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (and commits) are reported to the observers."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        # Commits are where SQLite syncs to disk, often the slowest step of a write
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            elapsed = time.perf_counter() - start
+            for observer in _statement_observers:
+                observer('COMMIT', (), elapsed)
+
+
+def get_db_path():
     """
-    # Get project root (parent of src directory)
-    project_root = Path(__file__).parent.parent.parent
-    db_path = project_root / 'flashcards.db'
+    Get the path of the SQLite database file for the current tenant.
 
-    conn = sqlite3.connect(str(db_path), timeout=10.0)
+    Returns:
+        str: The tenant's shard file when a tenant is set, otherwise
+            Config.DATABASE_PATH (flashcards.db in project root by default)
+    """
+    tenant = _current_tenant.get()
+    if tenant is None:
+        return Config.DATABASE_PATH
+    return os.path.join(Config.SHARD_DIR, f'{tenant}.db')
+
+
+def connect(path, factory=None, **kwargs):
+    """
+    Open a configured connection to a database file.
+
+    Args:
+        path (str): Database file
+        factory (type): sqlite3.Connection subclass (default InstrumentedConnection)
+        **kwargs: Extra sqlite3.connect() arguments (timeout defaults to
+            10 seconds of waiting for another connection's lock)
+
+    Returns:
+        sqlite3.Connection: Connection with foreign keys on and dict-like rows
+    """
+    kwargs.setdefault('timeout', 10.0)
+    conn = sqlite3.connect(path, factory=factory or InstrumentedConnection, **kwargs)
     # Enable foreign key constraints
     conn.execute('PRAGMA foreign_keys = ON')
     # Return rows as dictionaries
@@ -29,19 +275,64 @@ def get_db():
     return conn
 
 
-def init_db():
+def get_db():
+    """
+    Get a connection to the current tenant's database.
+
+    The configured storage engine (see src/models/engines.py) decides where
+    it comes from: with the default SQLite engine, the file at get_db_path()
+    (tenant databases come from a pool of open connections, see
+    src/models/shards.py; closing the connection returns it to the pool).
+
+    Returns:
+        sqlite3.Connection: Connection to the current tenant's database
+    """
+    from .engines import get_engine
+    return get_engine().connect()
+
+
+def init_db(path=None):
     """
     Initialize the database by creating tables if they don't exist.
 
-    Creates two tables:
+    Creates four tables:
     - decks: Stores flashcard deck information (topic-based organization)
     - flashcards: Stores individual flashcards with Q&A and study statistics
+    - library_meta: Stores the library-wide version counter
+    - generation_leases: Generations in progress, shared by identical requests
+    - deck_heads: The next card to review in each live deck
 
     Foreign key constraints ensure flashcards belong to valid decks.
+    Triggers keep the deck and library version counters up to date.
+
+    Args:
+        path (str, optional): Database file to initialize (default:
+            get_db_path(), the current tenant's database)
+    """
+    conn = connect(path or get_db_path())
+    create_schema(conn)
+    conn.close()
+
+
+def create_schema(conn):
+    """
+    Create or upgrade the tables, indexes and triggers on an open connection.
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect() (file or in-memory)
     """
-    conn = get_db()
     cursor = conn.cursor()
 
+    # Let the maintenance job return free pages to the file system in small
+    # steps (see src/models/maintenance.py). This only takes effect for a new
+    # database; older files need one full VACUUM (flask db-maintenance --full-vacuum).
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+    # Write-ahead logging: readers no longer wait for a writer to finish,
+    # which matters once several worker processes share the database.
+    # For students: This setting is stored in the database file itself.
+    cursor.execute('PRAGMA journal_mode = WAL')
+
     # Create decks table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS decks (
@@ -67,5 +358,224 @@ def init_db():
         )
     ''')
 
+    # Index flashcards by deck so per-deck queries don't scan the whole table
+    # For students: Without this, every "cards in deck X" query reads every
+    # flashcard in the database. SQLite stores the rowid (id) in the index too,
+    # so it also serves "deck X ordered by id" for paginated API reads.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_flashcards_deck_id ON flashcards(deck_id)')
+
+    # Per-deck version counter and last modification time
+    # For students: Older databases were created without these columns, so
+    # we add them in place (ALTER TABLE keeps all existing rows)
+    _add_column_if_missing(cursor, 'decks', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column_if_missing(cursor, 'decks', 'updated_at', 'REAL')
+
+    # Soft delete: a deleted deck is hidden at once (deleted_at is set) and
+    # its cards are removed later in small batches (see purge_deleted_decks)
+    _add_column_if_missing(cursor, 'decks', 'deleted_at', 'REAL')
+    # Only deleted decks are indexed, so the purger finds them without a scan
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_decks_deleted_at ON decks(deleted_at) WHERE deleted_at IS NOT NULL'
+    )
+
+    # Next review time of each card, indexed per deck so study sessions read
+    # the weakest cards first without sorting the deck (see Flashcard.get_study_queue)
+    due_at_added = _add_column_if_missing(cursor, 'flashcards', 'due_at', 'REAL NOT NULL DEFAULT 0')
+    if due_at_added:
+        from .flashcard import DUE_AT_SQL
+        # Filled in with the update triggers off (recreated below), so a big
+        # library isn't slowed down by extra updates per card
+        cursor.execute('DROP TRIGGER IF EXISTS flashcards_version_after_update')
+        cursor.execute('DROP TRIGGER IF EXISTS flashcards_head_after_update')
+        cursor.execute(f'UPDATE flashcards SET due_at = {DUE_AT_SQL} WHERE last_studied IS NOT NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_flashcards_deck_due ON flashcards(deck_id, due_at)')
+    # Library-wide review sessions start from each deck's first card instead
+    # (below), so an earlier index over due_at alone only slowed down writes
+    cursor.execute('DROP INDEX IF EXISTS idx_flashcards_due')
+
+    # Each live deck's first card in due_at order, kept up to date by
+    # triggers and indexed so a library-wide review session finds the most
+    # overdue decks without looking at the others (see Flashcard.get_review_queue)
+    # For students: This is a table of its own rather than two more deck
+    # columns, so `SELECT * FROM decks` still matches DeckRecord exactly
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'deck_heads'")
+    heads_added = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deck_heads (
+            deck_id INTEGER PRIMARY KEY,
+            next_due_at REAL NOT NULL,
+            next_due_id INTEGER NOT NULL,
+            FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_deck_heads_due ON deck_heads(next_due_at, next_due_id)')
+    if due_at_added or heads_added:
+        rebuild_deck_heads(cursor)
+
+    # Per-card edit counter, checked by bulk edits so they never overwrite a
+    # change the client hasn't seen (see Flashcard.bulk_change)
+    _add_column_if_missing(cursor, 'flashcards', 'version', 'INTEGER NOT NULL DEFAULT 0')
+
+    # Single-row table holding the library-wide version counter
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS library_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL
+        )
+    ''')
+    cursor.execute(
+        f'INSERT OR IGNORE INTO library_meta (id, version, updated_at) VALUES (1, 0, {SQL_NOW})'
+    )
+    # When the maintenance job last ran on this database (claimed by one worker at a time)
+    _add_column_if_missing(cursor, 'library_meta', 'maintained_at', 'REAL')
+
+    # Generations in progress or just finished, keyed by their normalized
+    # input, so identical requests in different worker processes share one
+    # (see src/models/generation_lease.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generation_leases (
+            key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            deck_id INTEGER,
+            finished_at REAL
+        )
+    ''')
+
+    _create_version_triggers(cursor)
+
     conn.commit()
-    conn.close()
+
+
+# SQL expression for the current Unix timestamp (same unit as time.time())
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+
+def rebuild_deck_heads(cursor):
+    """
+    Fill the deck_heads table from scratch.
+
+    Needed after writes that bypass its triggers: the schema upgrade and the
+    benchmark seeder drop them while rewriting many cards at once.
+
+    Args:
+        cursor (sqlite3.Cursor or sqlite3.Connection): Open database
+    """
+    cursor.execute('DELETE FROM deck_heads')
+    cursor.execute('''
+        INSERT INTO deck_heads (deck_id, next_due_at, next_due_id)
+        SELECT f.deck_id, f.due_at, f.id
+        FROM decks d
+        JOIN flashcards f ON f.id = (
+            SELECT id FROM flashcards WHERE deck_id = d.id ORDER BY due_at ASC, id ASC LIMIT 1
+        )
+        WHERE d.deleted_at IS NULL
+    ''')
+
+
+def _add_column_if_missing(cursor, table, column, definition):
+    """
+    Add a column to an existing table unless it is already there.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on an open connection
+        table (str): Table name
+        column (str): Column name to add
+        definition (str): Column type and constraints
+
+    Returns:
+        bool: True if the column was added (existing rows may need filling in)
+    """
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row['name'] for row in cursor.fetchall()}
+    if column in existing:
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+
+def _create_version_triggers(cursor):
+    """
+    Create triggers that bump the deck and library version counters and
+    keep the deck_heads table current.
+
+    For students: Triggers run inside SQLite itself, so every write path
+    (including ones added later) bumps the versions in the same transaction
+    as the change. Routes compare these counters to decide whether a page
+    has changed since the browser last fetched it.
+
+    A trigger whose definition changed since the database was created is
+    dropped and created again.
+    """
+    bump_library = f'UPDATE library_meta SET version = version + 1, updated_at = {SQL_NOW} WHERE id = 1;'
+
+    def bump_deck(ref):
+        return f'UPDATE decks SET version = version + 1, updated_at = {SQL_NOW} WHERE id = {ref}.deck_id;'
+
+    in_live_deck = 'NOT EXISTS (SELECT 1 FROM decks WHERE id = {ref}.deck_id AND deleted_at IS NOT NULL)'
+
+    # A card becomes its deck's head if it sorts before the current one...
+    def offer_head(ref):
+        return (
+            'INSERT INTO deck_heads (deck_id, next_due_at, next_due_id) '
+            f'VALUES ({ref}.deck_id, {ref}.due_at, {ref}.id) '
+            'ON CONFLICT (deck_id) DO UPDATE SET next_due_at = excluded.next_due_at, next_due_id = excluded.next_due_id '
+            'WHERE (excluded.next_due_at, excluded.next_due_id) < (deck_heads.next_due_at, deck_heads.next_due_id);'
+        )
+
+    # ... and the head is only looked up again when the head card itself
+    # moves or goes away (one idx_flashcards_deck_due seek)
+    def replace_head(ref):
+        return (
+            f'DELETE FROM deck_heads WHERE deck_id = {ref}.deck_id AND next_due_id = {ref}.id;'
+            'INSERT OR IGNORE INTO deck_heads (deck_id, next_due_at, next_due_id) '
+            f'SELECT deck_id, due_at, id FROM flashcards WHERE deck_id = {ref}.deck_id '
+            'ORDER BY due_at ASC, id ASC LIMIT 1;'
+        )
+
+    triggers = {
+        'decks_version_after_insert': ('AFTER INSERT ON decks', bump_library),
+        'decks_version_after_delete': ('AFTER DELETE ON decks', bump_library),
+        'decks_version_after_rename': (
+            'AFTER UPDATE OF name ON decks',
+            f'UPDATE decks SET version = version + 1, updated_at = {SQL_NOW} WHERE id = NEW.id; {bump_library}'
+        ),
+        'flashcards_version_after_insert': ('AFTER INSERT ON flashcards', bump_deck('NEW') + bump_library),
+        'flashcards_version_after_update': ('AFTER UPDATE ON flashcards', bump_deck('NEW') + bump_library),
+        # Purging a deleted deck's cards changes nothing anyone can see, so it
+        # doesn't bump versions (and invalidate caches) once per card
+        'flashcards_version_after_delete': (
+            'AFTER DELETE ON flashcards WHEN ' + in_live_deck.format(ref='OLD'),
+            bump_deck('OLD') + bump_library
+        ),
+        # Deleted decks have no head; their cards are only ever purged
+        'flashcards_head_after_insert': (
+            'AFTER INSERT ON flashcards WHEN ' + in_live_deck.format(ref='NEW'),
+            offer_head('NEW')
+        ),
+        'flashcards_head_after_update': (
+            'AFTER UPDATE OF due_at, deck_id ON flashcards '
+            'WHEN (OLD.due_at IS NOT NEW.due_at OR OLD.deck_id IS NOT NEW.deck_id) AND '
+            + in_live_deck.format(ref='NEW'),
+            replace_head('OLD') + offer_head('NEW')
+        ),
+        'flashcards_head_after_delete': (
+            'AFTER DELETE ON flashcards WHEN ' + in_live_deck.format(ref='OLD'),
+            replace_head('OLD')
+        ),
+        'decks_head_after_soft_delete': (
+            'AFTER UPDATE OF deleted_at ON decks WHEN NEW.deleted_at IS NOT NULL',
+            'DELETE FROM deck_heads WHERE deck_id = NEW.id;'
+        ),
+    }
+
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    existing = {row['name']: row['sql'] for row in cursor.fetchall()}
+    for name, (event, body) in triggers.items():
+        statement = f'CREATE TRIGGER {name} {event} BEGIN {body} END'
+        if existing.get(name) == statement:
+            continue
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(statement)
@@ -6,7 +6,15 @@ Uses raw SQL with sqlite3 cursor (no ORM) for simplicity.
 """
 
 import time
-from .database import get_db
+from .database import NOT_IN_DELETED_DECK, get_db, get_db_path, notify_deck_deleted, notify_write
+from .read_cache import model_cache
+from .records import SUMMARY_DECK_COLUMNS, DeckRecord, DeckSummary
+
+# Deleted decks are renamed to '<prefix><id>:<old name>' so the name is free again
+DELETED_NAME_PREFIX = '~deleted:'
+
+# Most card problems listed when an imported deck is rejected
+MAX_IMPORT_ERRORS = 20
 
 
 class Deck:
@@ -17,6 +25,9 @@ class Deck:
         id: INTEGER PRIMARY KEY
         name: TEXT NOT NULL UNIQUE (topic name)
         created_at: REAL (Unix timestamp)
+        version: INTEGER (bumped on any card create/edit/delete/grade)
+        updated_at: REAL (Unix timestamp of the last version bump)
+        deleted_at: REAL (Unix timestamp of deletion; NULL for live decks)
     """
 
     @staticmethod
@@ -28,7 +39,7 @@ class Deck:
             name (str): Unique topic name for the deck
 
         Returns:
-            dict: Created deck with id, name, and created_at
+            DeckRecord: Created deck with id, name, and created_at
         """
         conn = get_db()
         cursor = conn.cursor()
@@ -36,12 +47,13 @@ class Deck:
         created_at = time.time()
 
         cursor.execute(
-            'INSERT INTO decks (name, created_at) VALUES (?, ?)',
-            (name, created_at)
+            'INSERT INTO decks (name, created_at, version, updated_at) VALUES (?, ?, 0, ?)',
+            (name, created_at, created_at)
         )
         conn.commit()
 
         deck_id = cursor.lastrowid
+        notify_write(deck_id)
 
         # Return the created deck
         deck = Deck.get_by_id(deck_id)
@@ -54,46 +66,139 @@ class Deck:
         """
         Get a deck by ID.
 
+        Served from the read-through cache (see read_cache.py) when possible.
+
+        Args:
+            deck_id (int): Deck ID
+
+        Returns:
+            DeckRecord: Deck data or None if not found
+        """
+        def load():
+            conn = get_db()
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT * FROM decks WHERE id = ? AND deleted_at IS NULL', (deck_id,))
+            row = cursor.fetchone()
+            conn.close()
+
+            if row:
+                return DeckRecord.from_row(row), row['version']
+            return None, None
+
+        deck = model_cache.get_or_load('deck', deck_id, load)
+        # Copy so callers can't change the cached entry
+        return deck.copy() if deck is not None else None
+
+    @staticmethod
+    def get_version(deck_id):
+        """
+        Get the version counter of a deck without touching the card tables.
+
+        For students: This is a primary-key lookup on a single row, so it is
+        much cheaper than loading the deck's flashcards. Routes use it to
+        answer "has this deck changed?" before doing any real work.
+
         Args:
             deck_id (int): Deck ID
 
         Returns:
-            dict: Deck data or None if not found
+            tuple: (version, updated_at) or None if the deck doesn't exist
         """
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM decks WHERE id = ?', (deck_id,))
+        cursor.execute(
+            'SELECT version, COALESCE(updated_at, created_at) AS updated_at FROM decks '
+            'WHERE id = ? AND deleted_at IS NULL',
+            (deck_id,)
+        )
         row = cursor.fetchone()
         conn.close()
 
         if row:
-            return dict(row)
+            return row['version'], row['updated_at']
         return None
 
+    @staticmethod
+    def get_library_version():
+        """
+        Get the library-wide version counter.
+
+        The library version is bumped whenever any deck or flashcard changes,
+        so it identifies the state of pages that list every deck.
+
+        Returns:
+            tuple: (version, updated_at)
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT version, updated_at FROM library_meta WHERE id = 1')
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            return row['version'], row['updated_at']
+        return 0, None
+
     @staticmethod
     def get_all():
         """
         Get all decks.
 
         Returns:
-            list[dict]: List of all decks
+            list[DeckRecord]: List of all decks
         """
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM decks ORDER BY created_at DESC')
+        cursor.execute('SELECT * FROM decks WHERE deleted_at IS NULL ORDER BY created_at DESC')
         rows = cursor.fetchall()
         conn.close()
 
-        return [dict(row) for row in rows]
+        return DeckRecord.from_rows(rows)
+
+    @staticmethod
+    def get_names(deck_ids):
+        """
+        Get the names of several decks in one query.
+
+        Args:
+            deck_ids (iterable): Deck IDs (at most a few hundred)
+
+        Returns:
+            dict: Deck id -> name for the decks that exist
+        """
+        deck_ids = list(set(deck_ids))
+        if not deck_ids:
+            return {}
+
+        conn = get_db()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            f"SELECT id, name FROM decks WHERE id IN ({', '.join('?' * len(deck_ids))}) AND deleted_at IS NULL",
+            deck_ids
+        )
+        names = {row['id']: row['name'] for row in cursor.fetchall()}
+        conn.close()
+
+        return names
 
     @staticmethod
     def delete(deck_id):
         """
         Delete a deck by ID.
 
-        Cascades to delete all flashcards in the deck due to ON DELETE CASCADE.
+        The deck disappears from every query right away, but its flashcards
+        are removed later by the background purger in small batches (see
+        purge_deleted_decks in src/models/maintenance.py).
+
+        For students: Deleting a 100,000-card deck in one statement would
+        hold the database's write lock for seconds, and every other request
+        that wants to write would have to wait. Marking the deck as deleted
+        is a single-row update.
 
         Args:
             deck_id (int): Deck ID to delete
@@ -104,12 +209,22 @@ class Deck:
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM decks WHERE id = ?', (deck_id,))
+        # Rename the deck so its name can be used again while the old row
+        # waits for the purger (names are UNIQUE)
+        cursor.execute(
+            f"UPDATE decks SET deleted_at = ?, name = '{DELETED_NAME_PREFIX}' || id || ':' || name "
+            'WHERE id = ? AND deleted_at IS NULL',
+            (time.time(), deck_id)
+        )
         conn.commit()
 
         deleted = cursor.rowcount > 0
         conn.close()
 
+        if deleted:
+            notify_write(deck_id)
+            notify_deck_deleted(get_db_path())
+
         return deleted
 
     @staticmethod
@@ -117,25 +232,46 @@ class Deck:
         """
         Get all decks with their statistics.
 
-        For students: This method combines deck data with flashcard statistics.
-        It calls Flashcard.get_deck_stats() for each deck to get aggregated stats.
+        For students: One query joins every deck with its flashcards and
+        aggregates them per deck (GROUP BY), instead of running a separate
+        statistics query for each deck. LEFT JOIN keeps decks with no cards.
 
         Returns:
-            list[dict]: List of decks, each with additional stats fields
+            list[DeckSummary]: Decks (newest first), each with the fields of
+                Flashcard.get_deck_stats()
         """
-        from .flashcard import Flashcard
-
-        decks = Deck.get_all()
-        decks_with_stats = []
+        conn = get_db()
+        cursor = conn.cursor()
 
-        for deck in decks:
-            stats = Flashcard.get_deck_stats(deck['id'])
-            decks_with_stats.append({
-                **deck,
-                **stats
-            })
+        deck_columns = ', '.join(f'd.{column}' for column in SUMMARY_DECK_COLUMNS)
+        cursor.execute(f'''
+            SELECT
+                {deck_columns},
+                COUNT(f.id) as total_cards,
+                COALESCE(SUM(f.studied_count), 0) as total_studied,
+                COALESCE(SUM(f.success_count), 0) as total_correct,
+                MAX(f.last_studied) as last_studied,
+                COALESCE(AVG(f.streak), 0) as avg_streak
+            FROM decks d
+            LEFT JOIN flashcards f ON f.deck_id = d.id
+            WHERE d.deleted_at IS NULL
+            GROUP BY d.id
+            ORDER BY d.created_at DESC
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
 
-        return decks_with_stats
+        decks = []
+        for row in rows:
+            total_studied = row['total_studied']
+            # Calculate success rate as percentage (avoid division by zero)
+            success_rate = (row['total_correct'] / total_studied * 100) if total_studied > 0 else 0
+            decks.append(DeckSummary(
+                *row[:len(SUMMARY_DECK_COLUMNS)],
+                row['total_cards'], total_studied, row['total_correct'],
+                round(success_rate, 1), row['last_studied'], round(row['avg_streak'], 1)
+            ))
+        return decks
 
     @staticmethod
     def get_overall_stats():
@@ -158,18 +294,19 @@ class Deck:
         conn = get_db()
         cursor = conn.cursor()
 
-        # Count total decks
-        cursor.execute('SELECT COUNT(*) as count FROM decks')
+        # Count total decks (deleted decks waiting to be purged don't count)
+        cursor.execute('SELECT COUNT(*) as count FROM decks WHERE deleted_at IS NULL')
         total_decks = cursor.fetchone()['count']
 
-        # Get aggregate flashcard stats
-        cursor.execute('''
+        # Get aggregate flashcard stats, skipping the cards of deleted decks
+        cursor.execute(f'''
             SELECT
                 COUNT(*) as total_cards,
                 COALESCE(SUM(studied_count), 0) as total_studied,
                 COALESCE(SUM(success_count), 0) as total_correct,
                 MAX(last_studied) as last_studied
             FROM flashcards
+            WHERE {NOT_IN_DELETED_DECK}
         ''')
 
         row = cursor.fetchone()
@@ -251,10 +388,11 @@ class Deck:
                   Each card must have 'question' and 'answer' (str)
 
         Returns:
-            dict: Created deck data
+            DeckRecord: Created deck data
 
         Raises:
-            ValueError: If validation fails with descriptive message
+            ValueError: If validation fails, listing up to MAX_IMPORT_ERRORS
+                problems with their card numbers
         """
         from .flashcard import Flashcard
 
@@ -270,28 +408,21 @@ class Deck:
         if not isinstance(data['cards'], list):
             raise ValueError("Field 'cards' must be a list")
 
-        # Validate each card has required fields
-        for i, card in enumerate(data['cards']):
-            if not isinstance(card, dict):
-                raise ValueError(f"Card {i + 1} must be an object with 'question' and 'answer'")
-            if 'question' not in card:
-                raise ValueError(f"Card {i + 1} is missing 'question' field")
-            if 'answer' not in card:
-                raise ValueError(f"Card {i + 1} is missing 'answer' field")
-            if not isinstance(card['question'], str) or not card['question'].strip():
-                raise ValueError(f"Card {i + 1} 'question' must be a non-empty string")
-            if not isinstance(card['answer'], str) or not card['answer'].strip():
-                raise ValueError(f"Card {i + 1} 'answer' must be a non-empty string")
+        # Validate every card in one pass, reporting all problems at once
+        # Imported here: pydantic is slow to import and only needed on upload
+        from .schemas import validate_imported_cards
+        cards = validate_imported_cards(data['cards'], MAX_IMPORT_ERRORS)
 
         # Create the deck
         deck = Deck.create(data['name'].strip())
 
         # Create flashcards for each card in the imported data
-        for card in data['cards']:
+        # (the validated cards are already stripped)
+        for card in cards:
             Flashcard.create(
                 deck_id=deck['id'],
-                question=card['question'].strip(),
-                answer=card['answer'].strip()
+                question=card.question,
+                answer=card.answer
             )
 
         return deck
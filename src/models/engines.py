@@ -0,0 +1,300 @@
+"""
+Storage engines: where get_db() gets its connections from.
+
+The Deck and Flashcard models run plain SQL on whatever connection get_db()
+returns, so the storage behind them can change without touching the models
+or the routes. Config.STORAGE_ENGINE picks one of the engines registered
+here:
+- 'sqlite' (default): SQLite files on disk - DATABASE_PATH, plus one file
+  per tenant under SHARD_DIR (see src/models/shards.py)
+- 'memory': SQLite databases held in RAM, for tests and benchmarks. A
+  template database is migrated once; the main database and each tenant's
+  start as a copy of it, made with SQLite's backup API in well under a
+  millisecond, and reset() puts them back to that empty state. Nothing
+  touches the disk, so a test suite can run thousands of cases per second.
+
+Another backend plugs in by subclassing StorageEngine and calling
+register_engine() before the first get_db().
+
+For students: SQLite can run a database entirely in memory (the special
+file name ':memory:'). Each such connection is its own private database,
+so the memory engine keeps one connection per database and lends it to one
+caller at a time instead of opening a new one per get_db().
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.config import Config
+from .database import (
+    connect, create_schema, current_tenant, get_db_path, init_db, notify_write, use_tenant
+)
+
+# Engine name -> StorageEngine subclass (see register_engine)
+_engines = {}
+
+# The engine get_db() uses in this process (created on first use)
+_active = None
+
+
+def register_engine(cls):
+    """
+    Make a storage engine selectable through Config.STORAGE_ENGINE.
+
+    Args:
+        cls (type): StorageEngine subclass with a unique `name`
+
+    Returns:
+        type: The class (so this can be used as a decorator)
+    """
+    _engines[cls.name] = cls
+    return cls
+
+
+def get_engine():
+    """
+    Get the storage engine used by get_db().
+
+    Returns:
+        StorageEngine: Engine named by Config.STORAGE_ENGINE
+
+    Raises:
+        ValueError: If no engine with that name is registered
+    """
+    if _active is None:
+        set_engine(Config.STORAGE_ENGINE)
+    return _active
+
+
+def set_engine(engine):
+    """
+    Switch the storage engine (tests and benchmarks).
+
+    Args:
+        engine (str or StorageEngine): Registered engine name, or an engine
+
+    Returns:
+        StorageEngine: The engine now in use
+
+    Raises:
+        ValueError: If no engine with that name is registered
+    """
+    global _active
+    if isinstance(engine, str):
+        if engine not in _engines:
+            raise ValueError(f"Unknown STORAGE_ENGINE {engine!r} (choose from {', '.join(sorted(_engines))})")
+        engine = _engines[engine]()
+    _active = engine
+    return engine
+
+
+class StorageEngine:
+    """Interface every storage engine implements."""
+
+    name = None
+
+    def connect(self):
+        """
+        Open a connection to the current tenant's database.
+
+        Callers close it when done; the engine decides what closing means.
+
+        Returns:
+            sqlite3.Connection: Connection with foreign keys on and dict-like rows
+        """
+        raise NotImplementedError
+
+    def migrate(self):
+        """Create or upgrade the current tenant's database."""
+        raise NotImplementedError
+
+    def database_files(self):
+        """
+        List the files background maintenance and the deck purger look after.
+
+        Returns:
+            list: Database file paths (empty when nothing is stored on disk)
+        """
+        return []
+
+    def explain(self, sql, parameters):
+        """
+        Run EXPLAIN QUERY PLAN for a statement on the current tenant's database.
+
+        Used by the query profiler, so it must not go through the statement
+        observers (the EXPLAIN would be profiled in turn).
+
+        Returns:
+            list: Plan rows (id, parent, notused, detail)
+
+        Raises:
+            sqlite3.Error: If the statement can't be explained
+        """
+        raise NotImplementedError
+
+
+@register_engine
+class SQLiteEngine(StorageEngine):
+    """SQLite files on disk: the main database and per-tenant shards."""
+
+    name = 'sqlite'
+
+    def connect(self):
+        if current_tenant() is None:
+            return connect(get_db_path())
+
+        from .shards import shard_pool
+        return shard_pool.connect(get_db_path())
+
+    def migrate(self):
+        init_db()
+
+    def database_files(self):
+        from .shards import shard_paths
+        return [Config.DATABASE_PATH] + [path for _, path in shard_paths()]
+
+    def explain(self, sql, parameters):
+        # Read-only, so a missing file fails instead of being created empty
+        uri = Path(get_db_path()).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=1.0)
+        try:
+            return conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        finally:
+            conn.close()
+
+
+class _MemoryDatabase:
+    """One in-memory database and the lock lending it to one thread at a time."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # Reentrant: a model method may call another one (Deck.create calls
+        # get_by_id) while it still holds the connection
+        self.lock = threading.RLock()
+        self.depth = 0
+
+    def acquire(self):
+        self.lock.acquire()
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0 and self.conn.in_transaction:
+            # Never hand the next caller someone else's half-done transaction
+            self.conn.rollback()
+        self.lock.release()
+
+
+class MemoryConnection:
+    """
+    One caller's handle on a shared in-memory database.
+
+    Behaves like the connection itself; close() (or the handle being
+    garbage collected, when an error skipped the close) lends the database
+    to the next caller.
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self._conn = database.conn
+        self._open = True
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self._database.release()
+
+    def __del__(self):
+        self.close()
+
+
+@register_engine
+class MemoryEngine(StorageEngine):
+    """In-memory SQLite databases cloned from a migrated template."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._template = None
+        # Tenant (None for the main database) -> _MemoryDatabase
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def _database(self):
+        """Get the current tenant's database, cloning the template on first use."""
+        tenant = current_tenant()
+        database = self._databases.get(tenant)
+        if database is not None:
+            return database
+        with self._lock:
+            if self._template is None:
+                self._template = connect(':memory:', check_same_thread=False)
+                create_schema(self._template)
+            if tenant not in self._databases:
+                conn = connect(':memory:', check_same_thread=False)
+                self._template.backup(conn)
+                self._databases[tenant] = _MemoryDatabase(conn)
+            return self._databases[tenant]
+
+    def connect(self):
+        database = self._database()
+        database.acquire()
+        return MemoryConnection(database)
+
+    def migrate(self):
+        self._database()
+
+    def explain(self, sql, parameters):
+        database = self._database()
+        # Reentrant: the profiler explains a slow statement while the thread
+        # that ran it may still hold the database
+        database.acquire()
+        try:
+            # A plain sqlite3.Cursor skips the instrumented connection's observers
+            return sqlite3.Cursor(database.conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        finally:
+            database.release()
+
+    def load(self, path):
+        """
+        Replace the current tenant's database with a copy of a database file.
+
+        For students: This lets a benchmark seed a file once with fast bulk
+        inserts and then run every case against a copy in memory.
+
+        Args:
+            path (str): SQLite file to copy
+        """
+        database = self._database()
+        source = sqlite3.connect(path)
+        database.acquire()
+        try:
+            source.backup(database.conn)
+        finally:
+            database.release()
+            source.close()
+        notify_write()
+
+    def reset(self):
+        """Empty every database (the main one and all tenants') in place."""
+        with self._lock:
+            databases = list(self._databases.items())
+        for tenant, database in databases:
+            database.acquire()
+            try:
+                self._template.backup(database.conn)
+            finally:
+                database.release()
+            # Cached decks and card lists are gone with the data
+            with use_tenant(tenant):
+                notify_write()
@@ -5,8 +5,61 @@ Each flashcard belongs to a deck and tracks study performance metrics.
 Uses raw SQL with sqlite3 cursor (no ORM) for simplicity.
 """
 
+import heapq
 import time
-from .database import get_db
+from .database import NOT_IN_DELETED_DECK, get_db, notify_write
+from .read_cache import model_cache
+from .records import CardRecord, DeckStats
+
+# Base review interval (seconds) for spaced repetition: a card is due again
+# one day after it was studied, doubling for each correct answer in a row
+REVIEW_INTERVAL = 86400
+
+# Cap on the doublings so intervals stop growing after ~3 years
+MAX_INTERVAL_DOUBLINGS = 10
+
+# SQL version of next_review() over a flashcards row (used to fill in due_at
+# for rows written before the column existed, or by bulk inserts)
+DUE_AT_SQL = (
+    f'CASE WHEN last_studied IS NULL THEN 0 ELSE last_studied + {REVIEW_INTERVAL} '
+    f'* (1 << MIN(streak, {MAX_INTERVAL_DOUBLINGS})) * 2.0 * (success_count + 1) / (studied_count + 2) END'
+)
+
+# Columns clients may request through sparse field selection
+CARD_FIELDS = (
+    'id', 'deck_id', 'question', 'answer', 'created_at',
+    'studied_count', 'success_count', 'last_studied', 'streak', 'due_at', 'version'
+)
+
+
+def next_review(last_studied, streak, studied_count, success_count):
+    """
+    Compute when a card should be reviewed next (its due_at column).
+
+    The base interval (REVIEW_INTERVAL doubled for each correct answer in a
+    row) is scaled by twice the card's success ratio, smoothed so a card
+    with few reviews starts near 50%: a card answered right half the time
+    keeps the base interval, a card usually missed comes back sooner and a
+    card usually known later.
+
+    For students: Sorting cards by this one number puts the weakest cards
+    first - the ones most overdue given how well they are known. Because it
+    is stored and indexed, the database can hand back the top few cards of
+    a huge deck without sorting all of them.
+
+    Args:
+        last_studied (float or None): Unix timestamp of the last review
+        streak (int): Correct answers in a row
+        studied_count (int): Times the card was reviewed
+        success_count (int): Times it was answered correctly
+
+    Returns:
+        float: Unix timestamp; 0 for never-studied cards (always due, first)
+    """
+    if last_studied is None:
+        return 0
+    interval = REVIEW_INTERVAL * (1 << min(streak, MAX_INTERVAL_DOUBLINGS))
+    return last_studied + interval * 2.0 * (success_count + 1) / (studied_count + 2)
 
 
 class Flashcard:
@@ -23,6 +76,8 @@ class Flashcard:
         success_count: INTEGER DEFAULT 0
         last_studied: REAL (Unix timestamp, nullable)
         streak: INTEGER DEFAULT 0
+        due_at: REAL (next review time, see next_review(); 0 = never studied)
+        version: INTEGER (bumped when the question or answer is edited)
     """
 
     @staticmethod
@@ -36,7 +91,7 @@ class Flashcard:
             answer (str): Answer text
 
         Returns:
-            dict: Created flashcard with all fields
+            CardRecord: Created flashcard with all fields
         """
         conn = get_db()
         cursor = conn.cursor()
@@ -50,6 +105,7 @@ class Flashcard:
             (deck_id, question, answer, created_at)
         )
         conn.commit()
+        notify_write(deck_id)
 
         flashcard_id = cursor.lastrowid
 
@@ -58,7 +114,7 @@ class Flashcard:
         row = cursor.fetchone()
         conn.close()
 
-        return dict(row) if row else None
+        return CardRecord.from_row(row)
 
     @staticmethod
     def get_by_id(flashcard_id):
@@ -69,84 +125,272 @@ class Flashcard:
             flashcard_id (int): Flashcard ID to retrieve
 
         Returns:
-            dict: Flashcard data or None if not found
+            CardRecord: Flashcard data or None if not found
         """
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM flashcards WHERE id = ?', (flashcard_id,))
+        cursor.execute(f'SELECT * FROM flashcards WHERE id = ? AND {NOT_IN_DELETED_DECK}', (flashcard_id,))
         row = cursor.fetchone()
         conn.close()
 
-        return dict(row) if row else None
+        return CardRecord.from_row(row)
 
     @staticmethod
     def get_by_deck(deck_id):
         """
         Get all flashcards for a specific deck.
 
+        Served from the read-through cache (see read_cache.py) when possible.
+
         Args:
             deck_id (int): Deck ID to get flashcards from
 
         Returns:
-            list[dict]: List of flashcards in the deck
+            list[CardRecord]: List of flashcards in the deck
         """
+        def load():
+            conn = get_db()
+            cursor = conn.cursor()
+
+            # Read the deck version first: if a write lands between the two
+            # queries, the cached version is the older one and the next
+            # revalidation drops the entry rather than keeping stale cards
+            cursor.execute('SELECT version FROM decks WHERE id = ? AND deleted_at IS NULL', (deck_id,))
+            deck = cursor.fetchone()
+            cursor.execute(
+                'SELECT * FROM flashcards WHERE deck_id = ? ORDER BY created_at ASC',
+                (deck_id,)
+            )
+            rows = cursor.fetchall()
+            conn.close()
+
+            # Cards of a deck that doesn't exist (any more) aren't cached
+            if deck is None:
+                return None, None
+            return CardRecord.from_rows(rows), deck['version']
+
+        cards = model_cache.get_or_load('cards', deck_id, load)
+        # Copy so callers can't change the cached entry
+        return [card.copy() for card in cards] if cards is not None else []
+
+    @staticmethod
+    def get_page(deck_id, after_id=0, limit=50, fields=CARD_FIELDS):
+        """
+        Get one page of a deck's flashcards using keyset pagination.
+
+        For students: Instead of OFFSET (which makes SQLite walk past every
+        skipped row), we remember the last id a client saw and continue after
+        it. Each page is then a short range read on the deck_id index.
+
+        Args:
+            deck_id (int): Deck ID to get flashcards from
+            after_id (int): Return cards with id greater than this
+            limit (int): Maximum number of cards to return
+            fields (tuple): Columns to return (subset of CARD_FIELDS)
+
+        Returns:
+            list[CardRecord]: Up to `limit` flashcards ordered by id, with
+                only the requested fields set
+        """
+        columns = [field for field in CARD_FIELDS if field in fields]
+        # Always select the id so the caller can build the next cursor
+        if 'id' not in columns:
+            columns.insert(0, 'id')
+
         conn = get_db()
         cursor = conn.cursor()
 
         cursor.execute(
-            'SELECT * FROM flashcards WHERE deck_id = ? ORDER BY created_at ASC',
-            (deck_id,)
+            f'''SELECT {', '.join(columns)} FROM flashcards
+                WHERE deck_id = ? AND id > ? AND {NOT_IN_DELETED_DECK}
+                ORDER BY id ASC
+                LIMIT ?''',
+            (deck_id, after_id, limit)
         )
         rows = cursor.fetchall()
         conn.close()
 
-        return [dict(row) for row in rows]
+        return CardRecord.from_rows(rows)
 
     @staticmethod
-    def update_stats(flashcard_id, success):
+    def get_due(deck_id, now=None, limit=None):
+        """
+        Get the flashcards in a deck that are due for review.
+
+        A card is due if it was never studied, or if its next review time
+        (due_at, see next_review()) has passed.
+
+        Args:
+            deck_id (int): Deck ID to get flashcards from
+            now (float, optional): Unix timestamp to evaluate against
+            limit (int, optional): Maximum number of cards to return
+
+        Returns:
+            list[CardRecord]: Due flashcards, never-studied and most overdue first
+        """
+        now = time.time() if now is None else now
+        return Flashcard._by_due_at(deck_id, now, -1 if limit is None else limit)
+
+    @staticmethod
+    def get_study_queue(deck_id, limit):
+        """
+        Get the weakest cards of a deck for a study session.
+
+        Cards come in due_at order: never-studied cards, then the most
+        overdue, then the ones coming due soonest. Unlike get_due(), cards
+        that are not due yet fill the session up to `limit`.
+
+        Args:
+            deck_id (int): Deck ID to get flashcards from
+            limit (int): Maximum number of cards to return
+
+        Returns:
+            list[CardRecord]: Up to `limit` flashcards, weakest first
+        """
+        return Flashcard._by_due_at(deck_id, None, limit)
+
+    @staticmethod
+    def get_review_queue(limit, per_deck, now=None):
+        """
+        Get the due flashcards of every deck for one review session.
+
+        Cards come most overdue first across the whole library, taking at
+        most `per_deck` cards from any one deck so a single big deck can't
+        fill the session.
+
+        For students: This is a k-way merge. The deck_heads table holds
+        every live deck's first card in due_at order (kept current by
+        triggers), and idx_deck_heads_due sorts the decks by it. Only decks
+        among the first `limit` of that index can contribute a card, so one
+        range read of `limit` entries seeds a heap of decks. A
+        deck's cards - at most `per_deck` of them - are only read once it
+        reaches the top of the heap. The work grows with the session size,
+        not with the number of decks or how many cards a deck has waiting,
+        so a library of 20,000 decks, or a freshly imported deck with
+        100,000 overdue cards, costs the same as a handful of small ones.
+
+        Args:
+            limit (int): Maximum number of cards to return
+            per_deck (int): Maximum cards from one deck
+            now (float, optional): Unix timestamp to evaluate against
+
+        Returns:
+            list[CardRecord]: Due flashcards, most overdue first
+        """
+        now = time.time() if now is None else now
+        queue = []
+
+        conn = get_db()
+        cursor = conn.cursor()
+        # The decks whose first card is the most overdue
+        cursor.execute(
+            '''SELECT next_due_at, next_due_id, deck_id FROM deck_heads
+               WHERE next_due_at <= ?
+               ORDER BY next_due_at ASC, next_due_id ASC
+               LIMIT ?''',
+            (now, limit)
+        )
+        # (due_at, card id, deck id, card); card is None until the deck's
+        # cards are read, which happens when its first card is next in line
+        heap = [(due_at, card_id, deck_id, None) for due_at, card_id, deck_id in cursor.fetchall()]
+        heapq.heapify(heap)
+
+        upcoming = {}
+        while heap and len(queue) < limit:
+            _, _, deck_id, card = heapq.heappop(heap)
+            if card is None:
+                cursor.execute(
+                    f'''SELECT * FROM flashcards
+                       WHERE deck_id = ? AND due_at <= ? AND {NOT_IN_DELETED_DECK}
+                       ORDER BY due_at ASC, id ASC
+                       LIMIT ?''',
+                    (deck_id, now, per_deck)
+                )
+                upcoming[deck_id] = iter(CardRecord.from_rows(cursor.fetchall()))
+                card = next(upcoming[deck_id], None)
+                if card is not None:
+                    # Back in line by the card actually read: the first one
+                    # may have been graded, or its deck deleted, since the first query
+                    heapq.heappush(heap, (card.due_at, card.id, deck_id, card))
+                continue
+            queue.append(card)
+
+            card = next(upcoming[deck_id], None)
+            if card is not None:
+                heapq.heappush(heap, (card.due_at, card.id, deck_id, card))
+        conn.close()
+
+        return queue
+
+    @staticmethod
+    def _by_due_at(deck_id, due_by, limit):
+        """Read the first `limit` cards of a deck in due_at order (optionally only those due by a time)."""
+        conn = get_db()
+        cursor = conn.cursor()
+
+        # For students: idx_flashcards_deck_due keeps each deck's cards sorted
+        # by due_at, so SQLite reads the first `limit` entries and stops - no
+        # sort, however large the deck is
+        cursor.execute(
+            f'''SELECT * FROM flashcards
+               WHERE deck_id = ? AND due_at <= ? AND {NOT_IN_DELETED_DECK}
+               ORDER BY due_at ASC, id ASC
+               LIMIT ?''',
+            (deck_id, float('inf') if due_by is None else due_by, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+
+        return CardRecord.from_rows(rows)
+
+    @staticmethod
+    def update_stats(flashcard_id, success, deck_id=None):
         """
         Update study statistics for a flashcard.
 
         Args:
             flashcard_id (int): Flashcard ID
             success (bool): Whether the answer was correct
+            deck_id (int, optional): Only update the card if it belongs to this deck
 
         Returns:
-            dict: Updated flashcard data or None if not found
+            CardRecord: Updated flashcard data or None if not found
         """
         conn = get_db()
         cursor = conn.cursor()
 
-        # Get current stats
-        cursor.execute('SELECT * FROM flashcards WHERE id = ?', (flashcard_id,))
+        # Get current stats (cards of deleted decks can't be graded)
+        cursor.execute(f'SELECT * FROM flashcards WHERE id = ? AND {NOT_IN_DELETED_DECK}', (flashcard_id,))
         row = cursor.fetchone()
 
-        if not row:
+        if not row or (deck_id is not None and row['deck_id'] != deck_id):
             conn.close()
             return None
 
-        current = dict(row)
+        current = row
         studied_count = current['studied_count'] + 1
         success_count = current['success_count'] + (1 if success else 0)
         last_studied = time.time()
         streak = current['streak'] + 1 if success else 0
+        due_at = next_review(last_studied, streak, studied_count, success_count)
 
         # Update the flashcard
         cursor.execute(
             '''UPDATE flashcards
-               SET studied_count = ?, success_count = ?, last_studied = ?, streak = ?
+               SET studied_count = ?, success_count = ?, last_studied = ?, streak = ?, due_at = ?
                WHERE id = ?''',
-            (studied_count, success_count, last_studied, streak, flashcard_id)
+            (studied_count, success_count, last_studied, streak, due_at, flashcard_id)
         )
         conn.commit()
+        notify_write(current['deck_id'])
 
         # Return updated flashcard
         cursor.execute('SELECT * FROM flashcards WHERE id = ?', (flashcard_id,))
         row = cursor.fetchone()
         conn.close()
 
-        return dict(row) if row else None
+        return CardRecord.from_row(row)
 
     @staticmethod
     def update(flashcard_id, question=None, answer=None):
@@ -159,7 +403,7 @@ class Flashcard:
             answer (str, optional): New answer text
 
         Returns:
-            dict: Updated flashcard data or None if not found
+            CardRecord: Updated flashcard data or None if not found
         """
         conn = get_db()
         cursor = conn.cursor()
@@ -180,18 +424,24 @@ class Flashcard:
             conn.close()
             return None
 
+        updates.append('version = version + 1')
         params.append(flashcard_id)
-        query = f"UPDATE flashcards SET {', '.join(updates)} WHERE id = ?"
+        query = f"UPDATE flashcards SET {', '.join(updates)} WHERE id = ? AND {NOT_IN_DELETED_DECK}"
 
         cursor.execute(query, params)
         conn.commit()
+        if cursor.rowcount == 0:
+            conn.close()
+            return None
 
         # Return updated flashcard
         cursor.execute('SELECT * FROM flashcards WHERE id = ?', (flashcard_id,))
         row = cursor.fetchone()
         conn.close()
 
-        return dict(row) if row else None
+        if row:
+            notify_write(row['deck_id'])
+        return CardRecord.from_row(row)
 
     @staticmethod
     def delete(flashcard_id):
@@ -207,14 +457,119 @@ class Flashcard:
         conn = get_db()
         cursor = conn.cursor()
 
+        # Look up the owning deck first so caches for that deck can be cleared
+        cursor.execute(f'SELECT deck_id FROM flashcards WHERE id = ? AND {NOT_IN_DELETED_DECK}', (flashcard_id,))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return False
+
         cursor.execute('DELETE FROM flashcards WHERE id = ?', (flashcard_id,))
         conn.commit()
 
         deleted = cursor.rowcount > 0
         conn.close()
 
+        if deleted:
+            notify_write(row['deck_id'])
         return deleted
 
+    @staticmethod
+    def bulk_change(deck_id, edits=(), deletes=()):
+        """
+        Edit and delete many cards of a deck in one transaction.
+
+        Every item may carry the card version the client last saw; if the
+        card was edited since (or is gone), nothing at all is saved, so the
+        client can reload and retry without a half-applied batch.
+
+        For students: This is "optimistic locking": instead of locking cards
+        while a user edits them, each write checks `version = ?` and counts
+        the rows it changed. Zero rows means someone else got there first.
+
+        Args:
+            deck_id (int): Deck the cards must belong to
+            edits (list[dict]): {'id', 'question' and/or 'answer', optional 'version'}
+            deletes (list[dict]): {'id', optional 'version'}
+
+        Returns:
+            tuple: (applied, results) where applied is True if the batch was
+                saved and results has one {'id', 'status'} per item, in
+                order (edits first). status is 'updated' (with the new
+                'version') or 'deleted'; when nothing was saved, the items
+                at fault are 'conflict' (with the card's current 'version')
+                or 'not_found' and the others 'skipped'.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+
+        # Take the write lock up front so the checks and writes see one state
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT 1 FROM decks WHERE id = ? AND deleted_at IS NULL', (deck_id,))
+        deck_exists = cursor.fetchone() is not None
+
+        results = []
+        failed = []
+        for kind, items in (('updated', edits), ('deleted', deletes)):
+            for item in items:
+                where = 'id = ? AND deck_id = ?'
+                params = [item['id'], deck_id]
+                if item.get('version') is not None:
+                    where += ' AND version = ?'
+                    params.append(item['version'])
+
+                if not deck_exists:
+                    changed = 0
+                elif kind == 'updated':
+                    columns = [column for column in ('question', 'answer') if item.get(column) is not None]
+                    cursor.execute(
+                        f"UPDATE flashcards SET {', '.join(f'{column} = ?' for column in columns)}, "
+                        f'version = version + 1 WHERE {where}',
+                        [item[column] for column in columns] + params
+                    )
+                    changed = cursor.rowcount
+                else:
+                    cursor.execute(f'DELETE FROM flashcards WHERE {where}', params)
+                    changed = cursor.rowcount
+
+                result = {'id': item['id'], 'status': kind}
+                if not changed:
+                    failed.append(result)
+                results.append(result)
+
+        # Current versions: the new ones of edited cards, or for failed
+        # items, whether the card exists at all
+        check = failed or [result for result in results if result['status'] == 'updated']
+        versions = {}
+        if check and deck_exists:
+            ids = [result['id'] for result in check]
+            cursor.execute(
+                f"SELECT id, version FROM flashcards WHERE deck_id = ? AND id IN ({', '.join('?' * len(ids))})",
+                [deck_id] + ids
+            )
+            versions = {row['id']: row['version'] for row in cursor.fetchall()}
+
+        if failed:
+            for result in results:
+                result['status'] = 'skipped'
+            for result in failed:
+                if result['id'] in versions:
+                    result['status'], result['version'] = 'conflict', versions[result['id']]
+                else:
+                    result['status'] = 'not_found'
+            conn.rollback()
+            conn.close()
+            return False, results
+
+        for result in check:
+            result['version'] = versions[result['id']]
+        conn.commit()
+        conn.close()
+
+        if results:
+            notify_write(deck_id)
+        return True, results
+
     @staticmethod
     def get_deck_stats(deck_id):
         """
@@ -227,7 +582,7 @@ class Flashcard:
             deck_id (int): Deck ID to get statistics for
 
         Returns:
-            dict: {
+            DeckStats: {
                 'total_cards': int,
                 'total_studied': int (sum of studied_count),
                 'total_correct': int (sum of success_count),
@@ -239,7 +594,7 @@ class Flashcard:
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT
                 COUNT(*) as total_cards,
                 COALESCE(SUM(studied_count), 0) as total_studied,
@@ -247,7 +602,7 @@ class Flashcard:
                 MAX(last_studied) as last_studied,
                 COALESCE(AVG(streak), 0) as avg_streak
             FROM flashcards
-            WHERE deck_id = ?
+            WHERE deck_id = ? AND {NOT_IN_DELETED_DECK}
         ''', (deck_id,))
 
         row = cursor.fetchone()
@@ -259,20 +614,9 @@ class Flashcard:
             # Calculate success rate as percentage (avoid division by zero)
             success_rate = (total_correct / total_studied * 100) if total_studied > 0 else 0
 
-            return {
-                'total_cards': row['total_cards'],
-                'total_studied': total_studied,
-                'total_correct': total_correct,
-                'success_rate': round(success_rate, 1),
-                'last_studied': row['last_studied'],
-                'avg_streak': round(row['avg_streak'], 1)
-            }
+            return DeckStats(
+                row['total_cards'], total_studied, total_correct,
+                round(success_rate, 1), row['last_studied'], round(row['avg_streak'], 1)
+            )
 
-        return {
-            'total_cards': 0,
-            'total_studied': 0,
-            'total_correct': 0,
-            'success_rate': 0,
-            'last_studied': None,
-            'avg_streak': 0
-        }
+        return DeckStats(0, 0, 0, 0, None, 0)
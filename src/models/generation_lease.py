@@ -0,0 +1,128 @@
+"""
+GenerationLease model: one row per generation in progress or just finished.
+
+When many students submit the same notes at once, each worker process
+first takes a lease on the generation's key (see
+src/services/single_flight.py). The worker holding the lease calls the API
+and records the deck it saved; workers that find the lease taken wait for
+that deck instead of generating their own copy.
+
+For students: A lease is a lock with an expiry date. If the worker holding
+it crashes, nobody has to clean up: once expires_at has passed, the next
+request simply takes the lease over.
+"""
+
+import time
+from .database import get_db
+
+
+class GenerationLease:
+    """Cross-process claims on identical generations, stored per database."""
+
+    @staticmethod
+    def acquire(key, owner, lease_seconds):
+        """
+        Take the lease on a generation, or find out who has it.
+
+        Args:
+            key (str): Generation key (hash of the normalized input)
+            owner (str): Name of the calling worker process
+            lease_seconds (float): How long the lease is held before another
+                worker may take it over
+
+        Returns:
+            tuple: (status, deck_id) where status is 'acquired' (the caller
+                generates and then calls finish() or release()), 'busy'
+                (another worker is generating; try again shortly) or 'done'
+                (deck_id is the deck that worker saved)
+        """
+        now = time.time()
+        conn = get_db()
+        cursor = conn.cursor()
+
+        # For students: Waiting workers call this several times a second, so
+        # the usual answers ('busy' or 'done') come from a plain read. The
+        # write lock is only taken when the lease looks free, and the row is
+        # read again under it in case another worker got there first.
+        status = GenerationLease._status(cursor, key, owner, now)
+        if status is None:
+            cursor.execute('BEGIN IMMEDIATE')
+            status = GenerationLease._status(cursor, key, owner, now)
+            if status is None:
+                # Free, expired, or its deck was deleted: take it over.
+                # Expired rows of other keys go at the same time so the
+                # table stays small.
+                cursor.execute('DELETE FROM generation_leases WHERE expires_at <= ?', (now,))
+                cursor.execute(
+                    'INSERT OR REPLACE INTO generation_leases (key, owner, expires_at, deck_id, finished_at) '
+                    'VALUES (?, ?, ?, NULL, NULL)',
+                    (key, owner, now + lease_seconds)
+                )
+                conn.commit()
+                conn.close()
+                return 'acquired', None
+            conn.rollback()
+        conn.close()
+        return status
+
+    @staticmethod
+    def _status(cursor, key, owner, now):
+        """
+        Read a lease's row.
+
+        Returns:
+            tuple: ('busy', None) or ('done', deck_id), or None if the
+                caller may take the lease
+        """
+        cursor.execute(
+            'SELECT l.owner, l.expires_at, l.deck_id, l.finished_at, d.id AS live_deck '
+            'FROM generation_leases l LEFT JOIN decks d ON d.id = l.deck_id AND d.deleted_at IS NULL '
+            'WHERE l.key = ?',
+            (key,)
+        )
+        row = cursor.fetchone()
+        if row is None or row['expires_at'] <= now:
+            return None
+        if row['finished_at'] is None and row['owner'] != owner:
+            return 'busy', None
+        if row['live_deck'] is not None:
+            return 'done', row['deck_id']
+        return None
+
+    @staticmethod
+    def finish(key, owner, deck_id, reuse_seconds):
+        """
+        Record the deck a generation saved, for the workers waiting on it.
+
+        Args:
+            key (str): Generation key
+            owner (str): Worker that acquired the lease
+            deck_id (int): Saved deck
+            reuse_seconds (float): How long the deck is handed to identical requests
+        """
+        now = time.time()
+        conn = get_db()
+        conn.execute(
+            'UPDATE generation_leases SET deck_id = ?, finished_at = ?, expires_at = ? '
+            'WHERE key = ? AND owner = ?',
+            (deck_id, now, now + reuse_seconds, key, owner)
+        )
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def release(key, owner):
+        """
+        Give up a lease after a failed generation, so a waiting worker can try.
+
+        Args:
+            key (str): Generation key
+            owner (str): Worker that acquired the lease
+        """
+        conn = get_db()
+        conn.execute(
+            'DELETE FROM generation_leases WHERE key = ? AND owner = ? AND finished_at IS NULL',
+            (key, owner)
+        )
+        conn.commit()
+        conn.close()
@@ -0,0 +1,424 @@
+"""
+Database maintenance: WAL checkpoints, incremental vacuum and statistics.
+
+Left alone, an SQLite file that sees months of deck deletions and grading
+only ever grows: deleted rows leave free pages inside the file, the WAL
+file grows between checkpoints, and the query planner keeps using the
+table statistics from whenever ANALYZE last ran. run_maintenance() fixes
+all three in small steps (after purging decks that were deleted, see
+purge_deleted_decks):
+1. checkpoint: copy the WAL back into the database (PASSIVE first, so it
+   never waits for readers; TRUNCATE only if nobody is using the file)
+2. incremental vacuum: hand up to MAINTENANCE_VACUUM_PAGES free pages at a
+   time back to the file system
+3. statistics: re-run ANALYZE on tables whose row counts moved by more
+   than a quarter since they were last analyzed, then PRAGMA optimize
+
+Every step uses a short lock timeout. When another connection holds the
+lock, the step backs off and retries a few times, then gives up until the
+next run, so maintenance never makes a request wait for it.
+
+database_report() describes a database file: its size, free pages and how
+fragmented its pages are.
+
+For students: SQLite never shrinks a file on its own when rows are deleted;
+the space is kept on a "freelist" for future rows. VACUUM rebuilds the whole
+file (and locks it while doing so); incremental vacuum instead moves a few
+pages at a time to the end of the file and truncates it.
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import time
+
+from src.config import Config
+from .database import connect
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+# Re-analyze a table when its row count changed by more than this fraction
+STALE_STATS_RATIO = 0.25
+
+# Rows ANALYZE samples per index (approximate statistics, but fast on big tables)
+ANALYSIS_LIMIT = 1000
+
+# Attempts per step while the database is locked, and the first wait between them
+BUSY_RETRIES = 3
+BUSY_BACKOFF_SECONDS = 0.2
+
+
+def _is_busy(error):
+    """True if an OperationalError means another connection holds a lock."""
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def _with_backoff(step):
+    """
+    Run step(), retrying with exponential backoff while the database is busy.
+
+    Raises:
+        sqlite3.OperationalError: Still busy after BUSY_RETRIES retries, or
+            any other database error
+    """
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            return step()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == BUSY_RETRIES:
+                raise
+            # Jitter keeps several workers from retrying in lockstep
+            time.sleep(BUSY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _fragmentation(cursor):
+    """
+    Measure page fragmentation with the dbstat virtual table.
+
+    Returns:
+        dict: fragmentation (fraction of table/index pages that don't follow
+            the previous page of the same b-tree on disk) and unused_ratio
+            (fraction of bytes in used pages that hold no data), or None if
+            this SQLite build has no dbstat table
+    """
+    try:
+        # path sorts in b-tree traversal order ('/', '/000/', '/000/001/', ...)
+        cursor.execute('SELECT name, pageno, pgsize, unused FROM dbstat ORDER BY name, path')
+    except sqlite3.OperationalError:
+        return None
+
+    pages = out_of_order = unused = total = 0
+    previous_name, previous_page = None, None
+    for name, pageno, pgsize, page_unused in cursor:
+        if name == previous_name and pageno != previous_page + 1:
+            out_of_order += 1
+        previous_name, previous_page = name, pageno
+        pages += 1
+        unused += page_unused
+        total += pgsize
+    return {
+        'fragmentation': round(out_of_order / pages, 4) if pages else 0.0,
+        'unused_ratio': round(unused / total, 4) if total else 0.0
+    }
+
+
+def database_report(path, detailed=False):
+    """
+    Describe the size and health of a database file.
+
+    Args:
+        path (str): Database file
+        detailed (bool): Also measure fragmentation (reads every page, so
+            it's meant for the CLI and admin endpoint, not every run)
+
+    Returns:
+        dict: file_bytes, wal_bytes, page_size, page_count, freelist_pages,
+            free_ratio, auto_vacuum, purge_pending (deleted decks not
+            purged yet); with detailed, also fragmentation and
+            unused_ratio (None where SQLite can't measure them)
+    """
+    conn = connect(path)
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_count')
+    page_count = cursor.fetchone()[0]
+    cursor.execute('PRAGMA freelist_count')
+    freelist = cursor.fetchone()[0]
+    cursor.execute('PRAGMA auto_vacuum')
+    auto_vacuum = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM decks WHERE deleted_at IS NOT NULL')
+    purge_pending = cursor.fetchone()[0]
+
+    report = {
+        'file_bytes': _file_size(path),
+        'wal_bytes': _file_size(path + '-wal'),
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_pages': freelist,
+        'free_ratio': round(freelist / page_count, 4) if page_count else 0.0,
+        'auto_vacuum': AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        'purge_pending': purge_pending
+    }
+    if detailed:
+        report.update(_fragmentation(cursor) or {'fragmentation': None, 'unused_ratio': None})
+    conn.close()
+    return report
+
+
+def claim_run(path, interval):
+    """
+    Record that maintenance starts now, unless it ran within `interval`.
+
+    The check and the update are one UPDATE statement, so when several
+    worker processes try at once exactly one of them wins.
+
+    Args:
+        path (str): Database file
+        interval (float): Seconds that must have passed since the last run
+
+    Returns:
+        bool: True if the caller should run maintenance now
+    """
+    now = time.time()
+    conn = connect(path, timeout=Config.MAINTENANCE_BUSY_TIMEOUT_MS / 1000)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'UPDATE library_meta SET maintained_at = ? '
+            'WHERE id = 1 AND (maintained_at IS NULL OR maintained_at <= ?)',
+            (now, now - interval)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    except sqlite3.OperationalError as e:
+        if _is_busy(e):
+            return False
+        raise
+    finally:
+        conn.close()
+
+
+def _checkpoint(cursor):
+    """
+    Copy WAL pages into the database, then reset the WAL if nobody is reading.
+
+    Returns:
+        dict: wal_pages (in the WAL before), checkpointed pages, truncated
+    """
+    cursor.execute('PRAGMA wal_checkpoint(PASSIVE)')
+    busy, wal_pages, checkpointed = cursor.fetchone()
+    truncated = False
+    if not busy and wal_pages >= 0 and wal_pages == checkpointed:
+        # Everything is copied; TRUNCATE also shrinks the -wal file to zero,
+        # but needs every reader gone. The short busy timeout means we just
+        # skip it if someone is still there.
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        truncated = cursor.fetchone()[0] == 0
+    return {'wal_pages': wal_pages, 'checkpointed': checkpointed, 'truncated': truncated}
+
+
+def _incremental_vacuum(cursor, max_pages, should_continue):
+    """
+    Release free pages a chunk at a time, stopping early when asked to.
+
+    Returns:
+        int: Pages released
+    """
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        return 0
+
+    released = 0
+    while should_continue():
+        cursor.execute('PRAGMA freelist_count')
+        free = cursor.fetchone()[0]
+        if free == 0:
+            break
+        chunk = min(free, max_pages)
+        _with_backoff(lambda: _vacuum_chunk(cursor, chunk))
+        released += chunk
+        # Leave a gap between chunks for writers waiting on the lock
+        time.sleep(0.01)
+    return released
+
+
+def _vacuum_chunk(cursor, pages):
+    """Release `pages` free pages in one short write transaction."""
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        # The pragma frees one page per step, and Python's sqlite3 only runs
+        # the first step of a statement that returns no rows, so
+        # incremental_vacuum(N) would free a single page. Ask for one at a time.
+        for _ in range(pages):
+            cursor.execute('PRAGMA incremental_vacuum(1)')
+        cursor.execute('COMMIT')
+    except BaseException:
+        cursor.execute('ROLLBACK')
+        raise
+
+
+def _stale_tables(cursor):
+    """
+    Find tables whose planner statistics are missing or out of date.
+
+    Returns:
+        list[str]: Table names to ANALYZE
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )
+    tables = [row[0] for row in cursor.fetchall()]
+
+    analyzed = {}
+    try:
+        # The first number of sqlite_stat1.stat is the table's row count at
+        # the last ANALYZE
+        cursor.execute('SELECT tbl, stat FROM sqlite_stat1')
+        for table, stat in cursor.fetchall():
+            analyzed[table] = int(stat.split()[0])
+    except sqlite3.OperationalError:
+        # No sqlite_stat1 table: ANALYZE has never run
+        pass
+
+    stale = []
+    for table in tables:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        rows = cursor.fetchone()[0]
+        before = analyzed.get(table)
+        if before is None:
+            # Never analyzed; empty tables have nothing to measure yet
+            if rows:
+                stale.append(table)
+        elif abs(rows - before) > STALE_STATS_RATIO * max(before, 1):
+            stale.append(table)
+    return stale
+
+
+def _refresh_statistics(cursor):
+    """
+    ANALYZE stale tables, then let SQLite run its own PRAGMA optimize checks.
+
+    Returns:
+        list[str]: Tables analyzed
+    """
+    stale = _stale_tables(cursor)
+    cursor.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    for table in stale:
+        _with_backoff(lambda: cursor.execute(f'ANALYZE "{table}"'))
+    _with_backoff(lambda: cursor.execute('PRAGMA optimize').fetchall())
+    return stale
+
+
+def purge_deleted_decks(path, should_continue=None):
+    """
+    Remove the cards and rows of soft-deleted decks, a batch at a time.
+
+    Each batch of PURGE_BATCH_SIZE cards is its own short transaction,
+    followed by a pause of PURGE_PAUSE_MS so waiting requests get the
+    write lock in between. All progress is in the database itself (the
+    deck keeps its deleted_at mark until its last card is gone), so a purge
+    cut short by a crash or a busy database simply continues next time.
+
+    Args:
+        path (str): Database file
+        should_continue (callable, optional): Returns False to stop early
+
+    Returns:
+        dict: decks and cards removed
+
+    Raises:
+        sqlite3.OperationalError: The database stayed locked after the
+            retries (whatever was removed so far stays removed)
+    """
+    should_continue = should_continue or (lambda: True)
+    purged = {'decks': 0, 'cards': 0}
+
+    conn = connect(path, timeout=Config.MAINTENANCE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT id FROM decks WHERE deleted_at IS NOT NULL ORDER BY deleted_at')
+        deck_ids = [row[0] for row in cursor.fetchall()]
+
+        for deck_id in deck_ids:
+            while should_continue():
+                # rowid-ordered batches walk the deck's index without re-scanning
+                _with_backoff(lambda: cursor.execute(
+                    'DELETE FROM flashcards WHERE id IN '
+                    '(SELECT id FROM flashcards WHERE deck_id = ? ORDER BY id LIMIT ?)',
+                    (deck_id, Config.PURGE_BATCH_SIZE)
+                ))
+                purged['cards'] += cursor.rowcount
+                if cursor.rowcount < Config.PURGE_BATCH_SIZE:
+                    break
+                time.sleep(Config.PURGE_PAUSE_MS / 1000)
+            else:
+                break
+
+            _with_backoff(lambda: cursor.execute(
+                'DELETE FROM decks WHERE id = ? AND deleted_at IS NOT NULL', (deck_id,)
+            ))
+            purged['decks'] += cursor.rowcount
+    finally:
+        conn.close()
+    return purged
+
+
+def run_maintenance(path, should_continue=None):
+    """
+    Purge deleted decks, checkpoint, vacuum and re-analyze one database file.
+
+    A step that still finds the database locked after its retries is
+    skipped (and listed in the result); the next run tries again.
+
+    Args:
+        path (str): Database file
+        should_continue (callable, optional): Returns False to stop the
+            purge and vacuum early, e.g. when requests start arriving
+
+    Returns:
+        dict: Per-step results, 'skipped' (steps given up on because the
+            database was busy), 'seconds' and the database_report() after
+    """
+    should_continue = should_continue or (lambda: True)
+    start = time.perf_counter()
+    result = {'skipped': []}
+
+    # isolation_level=None: autocommit, so each statement is its own short
+    # transaction and nothing holds a lock between steps
+    conn = connect(path, timeout=Config.MAINTENANCE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    cursor = conn.cursor()
+    steps = (
+        # Purged decks leave free pages behind, so this goes before the vacuum
+        ('purged', lambda: purge_deleted_decks(path, should_continue)),
+        ('checkpoint', lambda: _with_backoff(lambda: _checkpoint(cursor))),
+        ('vacuumed_pages', lambda: _incremental_vacuum(cursor, Config.MAINTENANCE_VACUUM_PAGES, should_continue)),
+        ('analyzed', lambda: _refresh_statistics(cursor)),
+    )
+    try:
+        for name, step in steps:
+            try:
+                result[name] = step()
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                result['skipped'].append(name)
+    finally:
+        conn.close()
+
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    result['report'] = database_report(path)
+    if result['report']['auto_vacuum'] != 'incremental' and result['report']['freelist_pages']:
+        logger.warning(
+            '%s has %d free pages but incremental vacuum is off; run `flask db-maintenance --full-vacuum` once',
+            path, result['report']['freelist_pages']
+        )
+    return result
+
+
+def full_vacuum(path):
+    """
+    Rebuild a database file and switch it to incremental auto-vacuum.
+
+    Locks the whole database while it runs (seconds to minutes for a large
+    file), so run it from the CLI during a maintenance window.
+
+    Args:
+        path (str): Database file
+    """
+    conn = connect(path, isolation_level=None)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    conn.close()
@@ -0,0 +1,337 @@
+"""
+Opt-in SQL query profiler with a slow-query log.
+
+When Config.QUERY_PROFILING is enabled, every statement run through get_db()
+connections is timed and aggregated by its normalized text (literals replaced
+by ?). Statements slower than Config.SLOW_QUERY_MS are logged together with
+the shape of their bound parameters and their EXPLAIN QUERY PLAN output.
+
+For students: "SCAN flashcards" in a query plan means SQLite reads every row
+of the table; "SEARCH flashcards USING INDEX ..." means it jumps straight to
+the matching rows. A statement that starts scanning as the library grows is
+what this log is meant to catch.
+
+Each worker process periodically saves its statistics to
+Config.QUERY_PROFILE_DIR; `flask query-report` and GET /admin/queries merge
+them into a top-N report (count, p50/p99, total time).
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.config import Config
+from .database import on_statement
+
+logger = logging.getLogger(__name__)
+
+# Number of durations kept per statement for percentile estimates
+SAMPLE_SIZE = 512
+
+# Seconds between statistics snapshots written to disk by each process
+SNAPSHOT_INTERVAL = 10.0
+
+# Statements whose query plan is worth capturing
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to a canonical form for aggregation.
+
+    Collapses whitespace, replaces literals with ?, and folds IN-lists of any
+    length into a single (?+) so they aggregate together.
+
+    Args:
+        sql (str): SQL text
+
+    Returns:
+        str: Normalized statement
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?+)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def parameter_shape(parameters):
+    """
+    Describe bound parameters without logging their values.
+
+    Args:
+        parameters: Sequence or mapping passed to execute()
+
+    Returns:
+        list or dict: Type names, with lengths for strings and bytes
+    """
+    def shape(value):
+        if isinstance(value, (str, bytes)):
+            return f'{type(value).__name__}[{len(value)}]'
+        return type(value).__name__
+
+    if isinstance(parameters, dict):
+        return {key: shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [shape(value) for value in parameters]
+    # executemany() passes an iterable of parameter sets
+    return 'many'
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class QueryProfiler:
+    """
+    Aggregates statement timings and logs slow statements.
+
+    Per normalized statement it keeps the count, total and max time, the
+    number of slow executions, a reservoir sample of durations (for p50/p99)
+    and the first captured query plan.
+    """
+
+    def __init__(self, slow_threshold_ms, snapshot_dir=None):
+        """
+        Args:
+            slow_threshold_ms (float): Log statements slower than this
+            snapshot_dir (str, optional): Directory for per-process snapshots
+        """
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._last_snapshot = time.monotonic()
+
+    def observe(self, sql, parameters, elapsed):
+        """Record one statement execution (registered with on_statement)."""
+        statement = normalize_sql(sql)
+        slow = elapsed >= self.slow_threshold
+
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0, 'slow_count': 0,
+                    'samples': [], 'plan': None
+                }
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+            # Reservoir sampling keeps a uniform sample of all durations
+            samples = stats['samples']
+            if len(samples) < SAMPLE_SIZE:
+                samples.append(elapsed)
+            else:
+                slot = random.randrange(stats['count'])
+                if slot < SAMPLE_SIZE:
+                    samples[slot] = elapsed
+
+            needs_plan = slow and stats['plan'] is None
+            if slow:
+                stats['slow_count'] += 1
+
+        if slow:
+            plan = self._explain(sql, parameters) if needs_plan else None
+            if plan is not None:
+                with self._lock:
+                    stats['plan'] = plan
+            logger.warning(
+                'Slow query (%.1f ms): %s params=%s plan=%s',
+                elapsed * 1000, statement, parameter_shape(parameters),
+                plan if plan is not None else stats['plan']
+            )
+
+        if self.snapshot_dir and time.monotonic() - self._last_snapshot >= SNAPSHOT_INTERVAL:
+            self.write_snapshot()
+
+    def _explain(self, sql, parameters):
+        """
+        Capture EXPLAIN QUERY PLAN for a statement.
+
+        Runs through the storage engine (see StorageEngine.explain), on a
+        connection that isn't profiled itself.
+
+        Returns:
+            list[str]: Plan steps, or None if the statement can't be explained
+        """
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        if not isinstance(parameters, (list, tuple, dict)):
+            return None
+
+        from .engines import get_engine
+        try:
+            rows = get_engine().explain(sql, parameters)
+        except sqlite3.Error as e:
+            return [f'unavailable: {e}']
+
+        # Rows are (id, parent, notused, detail)
+        return [row[3] for row in rows]
+
+    def snapshot(self):
+        """
+        Copy the current statistics in a JSON-friendly form.
+
+        Returns:
+            dict: normalized statement -> statistics
+        """
+        with self._lock:
+            return {
+                statement: {**stats, 'samples': list(stats['samples'])}
+                for statement, stats in self._stats.items()
+            }
+
+    def write_snapshot(self):
+        """Save this process's statistics to the snapshot directory."""
+        self._last_snapshot = time.monotonic()
+        if not self.snapshot_dir:
+            return
+
+        data = self.snapshot()
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = self.snapshot_dir / f'queries-{os.getpid()}.json'
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(data))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning('Could not write query profile snapshot: %s', e)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def merge_snapshots(snapshots):
+    """
+    Merge statistics from several processes.
+
+    Args:
+        snapshots (list[dict]): Snapshots from QueryProfiler.snapshot()
+
+    Returns:
+        dict: Combined statement -> statistics
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for statement, stats in snapshot.items():
+            target = merged.get(statement)
+            if target is None:
+                merged[statement] = {**stats, 'samples': list(stats['samples'])}
+                continue
+            target['count'] += stats['count']
+            target['total'] += stats['total']
+            target['max'] = max(target['max'], stats['max'])
+            target['slow_count'] += stats['slow_count']
+            target['samples'].extend(stats['samples'])
+            target['plan'] = target['plan'] or stats['plan']
+    return merged
+
+
+def load_snapshots(snapshot_dir):
+    """
+    Read every per-process snapshot in a directory.
+
+    Args:
+        snapshot_dir (str): Directory written by QueryProfiler.write_snapshot()
+
+    Returns:
+        list[dict]: Snapshots (unreadable files are skipped)
+    """
+    snapshots = []
+    for path in sorted(Path(snapshot_dir).glob('queries-*.json')):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def build_report(stats, top=20, order_by='total'):
+    """
+    Build the top-N statement report.
+
+    Args:
+        stats (dict): Statement statistics (from snapshot or merge_snapshots)
+        top (int): Number of statements to include
+        order_by (str): 'total', 'count', 'p99' or 'max'
+
+    Returns:
+        list[dict]: One row per statement, times in milliseconds
+    """
+    rows = []
+    for statement, entry in stats.items():
+        samples = sorted(entry['samples'])
+        rows.append({
+            'statement': statement,
+            'count': entry['count'],
+            'total_ms': round(entry['total'] * 1000, 3),
+            'mean_ms': round(entry['total'] / entry['count'] * 1000, 3) if entry['count'] else 0.0,
+            'p50_ms': round(_percentile(samples, 0.50) * 1000, 3),
+            'p99_ms': round(_percentile(samples, 0.99) * 1000, 3),
+            'max_ms': round(entry['max'] * 1000, 3),
+            'slow_count': entry['slow_count'],
+            'plan': entry['plan']
+        })
+
+    sort_key = {
+        'total': 'total_ms', 'count': 'count', 'p99': 'p99_ms', 'max': 'max_ms'
+    }.get(order_by, 'total_ms')
+    rows.sort(key=lambda row: row[sort_key], reverse=True)
+    return rows[:top]
+
+
+def collect_report(top=20, order_by='total', include_live=True):
+    """
+    Build a report across every process that saved a snapshot.
+
+    Args:
+        top (int): Number of statements to include
+        order_by (str): See build_report()
+        include_live (bool): Save this process's live statistics first so
+            its latest numbers are included (the CLI turns this off so it
+            doesn't report its own startup queries)
+
+    Returns:
+        list[dict]: See build_report()
+    """
+    live = profiler if include_live else None
+    if live is not None:
+        live.write_snapshot()
+    snapshots = load_snapshots(Config.QUERY_PROFILE_DIR)
+    if live is not None and not live.snapshot_dir:
+        snapshots.append(live.snapshot())
+    return build_report(merge_snapshots(snapshots), top=top, order_by=order_by)
+
+
+# Process-wide profiler; None until enable_profiling() is called
+profiler = None
+
+
+def enable_profiling():
+    """
+    Start profiling every statement run through get_db() connections.
+
+    Returns:
+        QueryProfiler: The process-wide profiler
+    """
+    global profiler
+    if profiler is None:
+        profiler = QueryProfiler(Config.SLOW_QUERY_MS, Config.QUERY_PROFILE_DIR)
+        on_statement(profiler.observe)
+    return profiler
@@ -0,0 +1,220 @@
+"""
+Read-through cache for deck rows and deck card lists.
+
+Deck.get_by_id() runs on nearly every page and Flashcard.get_by_deck()
+reloads a whole deck for each study page view. This cache keeps their
+results in memory:
+- size-bounded: at most MODEL_CACHE_MAX_ENTRIES results, least recently
+  used evicted first
+- time-bounded: entries expire after MODEL_CACHE_TTL seconds
+- invalidated by every model write in this process (via on_write), right
+  after the write commits
+- kept coherent with other worker processes by polling the library version
+  row (library_meta, bumped by triggers on every write) at most once per
+  MODEL_CACHE_POLL_SECONDS. When it has moved, one query re-reads the
+  versions of the cached decks and drops the entries whose deck changed.
+
+For students: A cache in one process can't see writes made by another
+process. Instead of asking the database about every entry on every read,
+we ask one cheap question ("has anything changed?") now and then, and only
+dig deeper when the answer is yes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.config import Config
+from .database import current_tenant, get_db, on_write
+
+# Largest number of deck ids in one revalidation query (SQLite's default
+# limit on bound parameters is 999 in older versions)
+_REVALIDATE_BATCH = 500
+
+# value: the cached result; version: deck version it was loaded at
+_Entry = namedtuple('_Entry', ['value', 'version', 'expires_at'])
+
+
+class ModelCache:
+    """
+    LRU + TTL cache of per-deck model results, keyed by tenant and deck.
+
+    Keys are (tenant, kind, deck_id) where kind names the model method
+    ('deck' or 'cards'); tenant is None for the main database.
+    """
+
+    def __init__(self, max_entries, ttl, poll_interval):
+        """
+        Args:
+            max_entries (int): Most results kept (0 disables the cache)
+            ttl (float): Seconds an entry may be served after loading
+            poll_interval (float): Seconds between library version checks
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+
+        self._entries = OrderedDict()
+        # tenant -> [next poll time, library version last seen]
+        self._polls = {}
+        # Bumped by every invalidation; a load that started before one
+        # must not store its (possibly stale) result
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, kind, deck_id, loader):
+        """
+        Return a cached result, calling loader() on a miss.
+
+        Args:
+            kind (str): Which model method the result belongs to
+            deck_id (int): Deck the result was built from
+            loader (callable): Returns (value, deck version); a value of
+                None (deck not found) is returned but not cached
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        if self.max_entries <= 0:
+            return loader()[0]
+
+        tenant = current_tenant()
+        self._poll(tenant)
+
+        key = (tenant, kind, deck_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            generation = self._generation
+
+        value, version = loader()
+        if value is None:
+            return None
+
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = _Entry(value, version, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate_deck(self, deck_id=None):
+        """
+        Drop the cached results for a deck in the current tenant's database.
+
+        Args:
+            deck_id (int, optional): Deck that changed; None drops every
+                entry of the current tenant
+        """
+        tenant = current_tenant()
+        with self._lock:
+            self._generation += 1
+            if deck_id is None:
+                stale = [key for key in self._entries if key[0] == tenant]
+            else:
+                stale = [(tenant, kind, deck_id) for kind in ('deck', 'cards')]
+            for key in stale:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def _poll(self, tenant):
+        """Check the library version and revalidate if another process wrote."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._polls.get(tenant)
+            if state is not None and now < state[0]:
+                return
+            if state is None:
+                state = self._polls[tenant] = [0.0, None]
+            # Claim this poll so concurrent requests don't all run it
+            state[0] = now + self.poll_interval
+            seen = state[1]
+
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM library_meta WHERE id = 1')
+        row = cursor.fetchone()
+        version = row['version'] if row else 0
+
+        if seen is not None and version != seen:
+            self._revalidate(tenant, cursor)
+        conn.close()
+
+        with self._lock:
+            state[1] = version
+
+    def _revalidate(self, tenant, cursor):
+        """Drop entries whose deck version no longer matches the database."""
+        with self._lock:
+            deck_ids = list({key[2] for key in self._entries if key[0] == tenant})
+            self._generation += 1
+
+        current = {}
+        for start in range(0, len(deck_ids), _REVALIDATE_BATCH):
+            batch = deck_ids[start:start + _REVALIDATE_BATCH]
+            cursor.execute(
+                f"SELECT id, version FROM decks WHERE id IN ({', '.join('?' * len(batch))})", batch
+            )
+            current.update((row['id'], row['version']) for row in cursor.fetchall())
+
+        checked = set(deck_ids)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == tenant and key[2] in checked]:
+                if self._entries[key].version != current.get(key[2]):
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._polls.clear()
+            self._generation += 1
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: hits, misses, hit_ratio (0-1), evictions, invalidations
+                and entries currently held
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries)
+            }
+
+    def _after_fork(self):
+        # Another thread may have held the lock when the process forked
+        self._lock = threading.Lock()
+
+
+# Shared instance used by Deck.get_by_id() and Flashcard.get_by_deck()
+model_cache = ModelCache(
+    max_entries=Config.MODEL_CACHE_MAX_ENTRIES,
+    ttl=Config.MODEL_CACHE_TTL,
+    poll_interval=Config.MODEL_CACHE_POLL_SECONDS
+)
+on_write(model_cache.invalidate_deck)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=model_cache._after_fork)
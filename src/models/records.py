@@ -0,0 +1,229 @@
+"""
+Compact record types for rows returned by the models.
+
+A Python dict stores a hash table per row, so a deck of 100,000 cards
+loaded as dicts costs several hundred bytes of overhead per card. The
+record classes here use __slots__ instead: each object only holds one
+pointer per column. They still behave like the dicts the models used to
+return:
+- card['question'] and card.get('last_studied') work as before
+- {**deck}, dict(deck) and deck.items() see the columns that were loaded
+- templates can use card.question or card['question']
+- JSON serialization (tojson, jsonify, the API) goes through to_dict()
+
+For students: __slots__ tells Python the exact list of attributes an object
+may have, so it can store them in a fixed-size array instead of a dict.
+The price is that you can't add new attributes on the fly - every field
+must be listed in the class.
+"""
+
+# Default for constructor arguments that were not passed
+_UNSET = object()
+
+
+def _make_init(fields):
+    """
+    Build an __init__ that assigns each column directly.
+
+    A generated function with one `self.x = x` line per column runs much
+    faster than a setattr() loop, which adds up over 100,000 cards (the
+    standard library builds namedtuple and dataclass methods the same way).
+    Columns whose argument is left out stay unset.
+    """
+    arguments = ', '.join(f'{name}=_UNSET' for name in fields)
+    body = '\n'.join(f'    if {name} is not _UNSET: self.{name} = {name}' for name in fields)
+    namespace = {'_UNSET': _UNSET}
+    exec(f'def __init__(self, {arguments}):\n{body}\n', namespace)
+    return namespace['__init__']
+
+
+def _make_copy_all(cls):
+    """Build a function copying a record whose columns are all set."""
+    body = '\n'.join(f'    record.{name} = source.{name}' for name in cls.__slots__)
+    namespace = {'cls': cls}
+    exec(f'def copy_all(source):\n    record = cls.__new__(cls)\n{body}\n    return record\n', namespace)
+    return namespace['copy_all']
+
+
+class Record:
+    """
+    Base class: attribute access plus the read side of the dict interface.
+
+    Subclasses list their columns in __slots__. Positional constructor
+    arguments fill the columns in that order; columns that were never set
+    (for example ones left out of a sparse SELECT) are simply absent.
+    """
+
+    __slots__ = ()
+
+    # Set for each subclass by __init_subclass__: the columns as a set,
+    # so key checks don't scan the tuple, and a fast copy for full records
+    _fields = frozenset()
+    _copy_all = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+        cls._copy_all = staticmethod(_make_copy_all(cls))
+        cls.__init__ = _make_init(cls.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Build a record from a sqlite3.Row (or None).
+
+        Returns:
+            Record: New record, or None if row is None
+        """
+        if row is None:
+            return None
+        return cls.from_rows([row])[0]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build records from sqlite3.Row objects that share the same columns.
+
+        When the query returned exactly this record's columns in order (as
+        SELECT * does), the values are passed straight to the constructor.
+
+        Args:
+            rows (list[sqlite3.Row]): Rows from one query
+
+        Returns:
+            list: Records in the same order
+        """
+        if not rows:
+            return []
+        names = tuple(rows[0].keys())
+        if names == cls.__slots__:
+            return [cls(*row) for row in rows]
+
+        known = [(index, name) for index, name in enumerate(names) if name in cls._fields]
+        records = []
+        for row in rows:
+            record = cls.__new__(cls)
+            for index, name in known:
+                setattr(record, name, row[index])
+            records.append(record)
+        return records
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(f'{type(self).__name__} has no field {key!r}')
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._fields and hasattr(self, key)
+
+    def get(self, key, default=None):
+        if key in self._fields:
+            return getattr(self, key, default)
+        return default
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def values(self):
+        return [getattr(self, name) for name in self.keys()]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        """
+        Convert to a plain dict (for JSON and other code that needs one).
+
+        Returns:
+            dict: Column name -> value for every column that was set
+        """
+        return {name: getattr(self, name) for name in self.keys()}
+
+    def copy(self):
+        """Shallow copy (same column values, new record)."""
+        try:
+            return self._copy_all(self)
+        except AttributeError:
+            pass
+        # Some columns were never set
+        record = type(self).__new__(type(self))
+        for name in self.keys():
+            setattr(record, name, getattr(self, name))
+        return record
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.items())
+        return f'{type(self).__name__}({fields})'
+
+
+def json_default(value):
+    """
+    `default=` hook for json.dumps so records serialize like dicts.
+
+    Raises:
+        TypeError: For any other unsupported type (as json.dumps would)
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+# Column order matches the table definitions (and so SELECT *)
+DECK_COLUMNS = ('id', 'name', 'created_at', 'version', 'updated_at', 'deleted_at')
+# Deck columns shown in listings (they only contain live decks, so no deleted_at)
+SUMMARY_DECK_COLUMNS = DECK_COLUMNS[:-1]
+STATS_COLUMNS = ('total_cards', 'total_studied', 'total_correct', 'success_rate', 'last_studied', 'avg_streak')
+
+
+class DeckRecord(Record):
+    """One row of the decks table."""
+
+    __slots__ = DECK_COLUMNS
+
+
+class CardRecord(Record):
+    """One row of the flashcards table."""
+
+    __slots__ = (
+        'id', 'deck_id', 'question', 'answer', 'created_at',
+        'studied_count', 'success_count', 'last_studied', 'streak', 'due_at', 'version'
+    )
+
+
+class DeckStats(Record):
+    """Aggregated study statistics for one deck (Flashcard.get_deck_stats)."""
+
+    __slots__ = STATS_COLUMNS
+
+
+class DeckSummary(Record):
+    """
+    A deck with its statistics, as listed on /decks, /stats and the API.
+
+    The last five fields are filled in by the routes for display.
+    """
+
+    __slots__ = SUMMARY_DECK_COLUMNS + STATS_COLUMNS + (
+        'card_count', 'created_date', 'last_studied_date', 'predicted_recall', 'retention_histogram'
+    )
@@ -3,9 +3,10 @@ Pydantic schema models for AI flashcard generation.
 
 These models define the structured output format for the Anthropic API,
 guaranteeing type-safe responses that match our exact schema requirements.
+The same card model also validates decks imported from JSON files.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
 from typing import List
 
 
@@ -27,5 +28,58 @@ class FlashcardSet(BaseModel):
         description="Topic name for the flashcard deck"
     )
     flashcards: List[FlashcardPair] = Field(
-        description="List of exactly 10 question-answer pairs"
+        description="List of question-answer pairs, as many as the prompt asks for"
     )
+
+
+class ImportedCard(FlashcardPair):
+    """
+    A card from an imported deck file: a FlashcardPair whose question and
+    answer are stripped and must not be empty.
+    """
+
+    model_config = ConfigDict(str_strip_whitespace=True, str_min_length=1)
+
+
+# Validates a whole list of cards in one call into pydantic's compiled core,
+# collecting every error instead of stopping at the first
+_IMPORTED_CARDS = TypeAdapter(List[ImportedCard])
+
+
+def validate_imported_cards(cards, max_errors):
+    """
+    Validate the cards of an imported deck in one pass.
+
+    For students: A user fixing a large deck file wants to see every broken
+    card at once, not one per upload. Pydantic checks the whole list in
+    compiled code and reports each problem with its position.
+
+    Args:
+        cards (list): Card objects parsed from the uploaded JSON
+        max_errors (int): Most problems listed in the error message
+
+    Returns:
+        list[ImportedCard]: Validated cards with stripped text
+
+    Raises:
+        ValueError: Listing the problems found (card numbers start at 1)
+    """
+    try:
+        return _IMPORTED_CARDS.validate_python(cards)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        messages = [_describe_card_error(error) for error in errors[:max_errors]]
+        if len(errors) > max_errors:
+            messages.append(f'and {len(errors) - max_errors} more problems')
+        raise ValueError('; '.join(messages)) from None
+
+
+def _describe_card_error(error):
+    """Turn one pydantic error into the message the import page shows."""
+    position, *field = error['loc']
+    card = f'Card {position + 1}'
+    if not field:
+        return f"{card} must be an object with 'question' and 'answer'"
+    if error['type'] == 'missing':
+        return f"{card} is missing '{field[0]}' field"
+    return f"{card} '{field[0]}' must be a non-empty string"
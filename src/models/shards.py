@@ -0,0 +1,218 @@
+"""
+Per-tenant database shards with a bounded pool of open connections.
+
+When SHARD_DIR is set, each tenant gets its own SQLite file
+(SHARD_DIR/<tenant>.db), so tenants never wait on each other's write lock
+and write throughput grows with the number of tenants instead of being
+capped by one file. The tenant for a request is kept in a context variable
+(see database.set_tenant) and get_db() routes to its file through the
+ShardPool below, which:
+- creates and migrates a shard the first time this process touches it
+- keeps recently used connections open for reuse, up to a limit, closing
+  the least recently used ones beyond it (each connection holds up to three
+  file descriptors: the database, its -wal and its -shm file)
+
+For students: Opening an SQLite file is cheap, but with thousands of tenants
+a process can't keep one connection per tenant open forever - it would run
+out of file descriptors. An LRU ("least recently used") pool keeps the busy
+tenants' connections warm and lets idle ones go.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.config import Config
+from .database import InstrumentedConnection, connect, init_db
+
+# Tenant ids double as file names, so only allow a safe character set
+TENANT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def valid_tenant(tenant):
+    """
+    Check whether a tenant id is safe to use as a shard file name.
+
+    Args:
+        tenant (str): Tenant id from a request header or the CLI
+
+    Returns:
+        bool: True if the id can be used
+    """
+    return bool(tenant) and TENANT_ID.match(tenant) is not None
+
+
+class PooledConnection(InstrumentedConnection):
+    """Connection whose close() hands it back to its pool."""
+
+    pool = None
+    pool_path = None
+    checked_out = False
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        elif self.checked_out:
+            # A second close() must not return it again (someone else may
+            # be using it by then)
+            self.checked_out = False
+            self.pool.release(self)
+
+    def close_for_real(self):
+        self.pool = None
+        super().close()
+
+
+class ShardPool:
+    """
+    LRU pool of open connections to tenant shard files.
+
+    A connection is used by one thread at a time: connect() takes it out of
+    the pool and close() puts it back, so at most max_idle connections sit
+    open while unused.
+    """
+
+    def __init__(self, max_idle):
+        """
+        Args:
+            max_idle (int): Most unused connections kept open (all shards)
+        """
+        self.max_idle = max_idle
+        # Unused connections in least-recently-used order (conn -> path)
+        self._idle = OrderedDict()
+        self._idle_by_path = {}
+        # Shards this process has already created or migrated
+        self._migrated = set()
+        self._migration_locks = {}
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _ensure_migrated(self, path):
+        """Create or upgrade a shard the first time this process uses it."""
+        if path in self._migrated:
+            return
+        with self._lock:
+            lock = self._migration_locks.setdefault(path, threading.Lock())
+        # One lock per shard: a slow migration doesn't hold up other tenants
+        with lock:
+            if path not in self._migrated:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                init_db(path)
+                self._migrated.add(path)
+
+    def connect(self, path):
+        """
+        Get a connection to a shard, reusing an open one when possible.
+
+        Args:
+            path (str): Shard database file
+
+        Returns:
+            PooledConnection: Connection that returns to the pool on close()
+        """
+        self._ensure_migrated(path)
+
+        with self._lock:
+            idle = self._idle_by_path.get(path)
+            if idle:
+                conn = idle.pop()
+                del self._idle[conn]
+                if not idle:
+                    del self._idle_by_path[path]
+                self.reused += 1
+                conn.checked_out = True
+                return conn
+            self.opened += 1
+
+        # Pooled connections move between request threads (never used by
+        # two at once), so sqlite3's same-thread check is turned off
+        conn = connect(path, factory=PooledConnection, check_same_thread=False)
+        conn.pool, conn.pool_path, conn.checked_out = self, path, True
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool (called by its close())."""
+        if conn.in_transaction:
+            # Never hand the next request someone else's half-done transaction
+            conn.rollback()
+
+        evicted = []
+        with self._lock:
+            path = conn.pool_path
+            self._idle[conn] = path
+            self._idle_by_path.setdefault(path, []).append(conn)
+            while len(self._idle) > self.max_idle:
+                old, old_path = self._idle.popitem(last=False)
+                self._idle_by_path[old_path].remove(old)
+                if not self._idle_by_path[old_path]:
+                    del self._idle_by_path[old_path]
+                evicted.append(old)
+            self.evicted += len(evicted)
+
+        # Close outside the lock; closing may wait on a WAL checkpoint
+        for old in evicted:
+            old.close_for_real()
+
+    def close_all(self):
+        """Close every unused connection (in-use ones close when returned)."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._idle_by_path.clear()
+        for conn in idle:
+            conn.close_for_real()
+
+    def forget_after_fork(self):
+        """
+        Drop connections inherited from the parent process without using them.
+
+        For students: SQLite connections must not be shared between
+        processes; a forked worker opens its own instead.
+        """
+        self._idle = OrderedDict()
+        self._idle_by_path = {}
+        self._migration_locks = {}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        Report pool activity.
+
+        Returns:
+            dict: idle connections, shards migrated, connections opened,
+                reused and evicted
+        """
+        with self._lock:
+            return {
+                'idle': len(self._idle),
+                'shards': len(self._migrated),
+                'opened': self.opened,
+                'reused': self.reused,
+                'evicted': self.evicted
+            }
+
+
+def shard_paths():
+    """
+    List the shard files that exist on disk.
+
+    Returns:
+        list: (tenant, path) pairs sorted by tenant
+    """
+    if not Config.SHARD_DIR or not os.path.isdir(Config.SHARD_DIR):
+        return []
+    return sorted(
+        (entry.stem, str(entry)) for entry in Path(Config.SHARD_DIR).glob('*.db')
+        if valid_tenant(entry.stem)
+    )
+
+
+# Shared pool used by get_db() for every tenant in this process
+shard_pool = ShardPool(max_idle=Config.SHARD_MAX_OPEN_CONNECTIONS)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=shard_pool.forget_after_fork)
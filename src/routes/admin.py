@@ -0,0 +1,75 @@
+"""
+Admin routes for operating the application.
+
+For students: These endpoints expose internal diagnostics, so they are
+protected. Requests must carry the Config.ADMIN_TOKEN secret in an
+X-Admin-Token header; if no token is configured, the endpoints don't exist
+(404). Checking for "requests from this machine" instead would not help:
+behind a reverse proxy every request comes from 127.0.0.1.
+"""
+
+import hmac
+
+from flask import Blueprint, abort, jsonify, request
+from src.config import Config
+from src.maintenance import scheduler
+from src.models import query_profiler
+from src.models.database import get_db_path
+from src.models.engines import get_engine
+from src.models.maintenance import database_report
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin.before_request
+def require_admin():
+    """Hide the endpoints unless a token is configured; reject requests without it."""
+    if not Config.ADMIN_TOKEN:
+        abort(404)
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token, Config.ADMIN_TOKEN):
+        abort(403)
+
+
+@admin.route('/queries')
+def queries():
+    """
+    Top-N SQL statements across all worker processes.
+
+    Query arguments:
+        top (int): Number of statements (default 20)
+        order_by (str): total, count, p99 or max (default total)
+
+    Returns:
+        JSON: {"enabled": bool, "statements": [...]}
+    """
+    top = request.args.get('top', 20, type=int)
+    order_by = request.args.get('order_by', 'total')
+
+    return jsonify({
+        'enabled': query_profiler.profiler is not None,
+        'statements': query_profiler.collect_report(top=top, order_by=order_by)
+    })
+
+
+@admin.route('/database')
+def database():
+    """
+    Size and fragmentation of the current database, plus maintenance activity.
+
+    Reads every page of the file to measure fragmentation, so it can take a
+    moment on large databases.
+
+    Returns:
+        JSON: {"database": database_report() (null when the storage
+            engine keeps no files), "maintenance": {runs, busy_skips, last_run}}
+    """
+    last = scheduler.last_result
+    on_disk = bool(get_engine().database_files())
+    return jsonify({
+        'database': database_report(get_db_path(), detailed=True) if on_disk else None,
+        'maintenance': {
+            **scheduler.stats(),
+            'last_run': {key: value for key, value in last.items() if key != 'report'} if last else None
+        }
+    })
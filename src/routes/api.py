@@ -0,0 +1,207 @@
+"""
+Versioned JSON API (/api/v1) for mobile and single-page clients.
+
+This module exposes the same data as the HTML pages without rendering any
+templates:
+- GET  /api/v1/decks                      decks with their statistics
+- GET  /api/v1/decks/<deck_id>/cards      paginated cards with sparse fields
+- POST /api/v1/decks/<deck_id>/sessions   start a study session (due cards only)
+- POST /api/v1/decks/<deck_id>/grade      grade a card in the current session
+
+For students: Responses are serialized without extra whitespace and
+gzip-compressed when the client supports it, so clients download only the
+bytes they need. GET endpoints also support ETags (see conditional.py).
+"""
+
+import gzip
+import json
+
+from flask import Blueprint, Response, g, request, session
+from src.models.deck import Deck
+from src.models.flashcard import Flashcard, CARD_FIELDS
+from src.models.records import json_default
+from src.routes.conditional import conditional_get, deck_validator, library_validator
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# Page size limits for /cards
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Maximum number of cards handed out when a study session starts
+MAX_SESSION_CARDS = 200
+
+# gzip level: 5 is close to the best ratio for JSON at a fraction of the CPU of 9
+GZIP_LEVEL = 5
+
+
+def _accepts_gzip():
+    """Check whether the client accepts gzip-encoded responses."""
+    return 'gzip' in request.accept_encodings
+
+
+def _gzip_variant():
+    """ETag suffix so gzip and identity responses get different strong ETags."""
+    return '-gzip' if _accepts_gzip() else ''
+
+
+def api_response(payload, status=200):
+    """
+    Serialize a payload as compact JSON, gzip-compressed if accepted.
+
+    Args:
+        payload (dict): JSON-serializable response data (records allowed)
+        status (int): HTTP status code
+
+    Returns:
+        Response: application/json response
+    """
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=json_default).encode('utf-8')
+
+    response = Response(status=status, mimetype='application/json')
+    if _accepts_gzip():
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_data(body)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _int_arg(name, default, minimum, maximum):
+    """Read an integer query argument clamped to [minimum, maximum]."""
+    value = request.args.get(name, type=int)
+    if value is None:
+        return default
+    return max(minimum, min(value, maximum))
+
+
+@api.route('/decks')
+@conditional_get(library_validator('api-decks'), vary=_gzip_variant)
+def list_decks():
+    """
+    List every deck with its statistics.
+
+    Returns:
+        JSON: {"decks": [{id, name, created_at, version, total_cards,
+                          total_studied, total_correct, success_rate,
+                          last_studied, avg_streak}, ...]}
+    """
+    decks = Deck.get_all_with_stats()
+    return api_response({'decks': decks})
+
+
+@api.route('/decks/<int:deck_id>/cards')
+@conditional_get(deck_validator('api-cards'), vary=_gzip_variant)
+def list_cards(deck_id):
+    """
+    List a deck's cards one page at a time.
+
+    Query arguments:
+        after (int): Cursor from the previous page's "next" value
+        limit (int): Page size (default 50, max 500)
+        fields (str): Comma-separated subset of card fields (default: all)
+
+    Returns:
+        JSON: {"cards": [...], "next": int or null}
+    """
+    # @conditional_get already looked the deck up; only ask again if it didn't
+    if g.get('page_version') is None and Deck.get_version(deck_id) is None:
+        return api_response({'error': 'Deck not found'}, 404)
+
+    after_id = _int_arg('after', 0, 0, 2 ** 63 - 1)
+    limit = _int_arg('limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+
+    fields = CARD_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(field.strip() for field in request.args['fields'].split(','))
+        unknown = [field for field in fields if field not in CARD_FIELDS]
+        if unknown:
+            return api_response({'error': f"Unknown fields: {', '.join(unknown)}"}, 400)
+
+    # Fetch one extra row to know whether another page exists
+    cards = Flashcard.get_page(deck_id, after_id=after_id, limit=limit + 1, fields=fields)
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        next_cursor = cards[-1]['id']
+
+    # The id is always selected for the cursor; drop it if it wasn't asked for
+    if 'id' not in fields:
+        cards = [{key: value for key, value in card.items() if key != 'id'} for card in cards]
+
+    return api_response({'cards': cards, 'next': next_cursor})
+
+
+@api.route('/decks/<int:deck_id>/sessions', methods=['POST'])
+def start_session(deck_id):
+    """
+    Start a study session containing only the cards that are due.
+
+    JSON body (optional):
+        limit (int): Maximum number of cards (default and max 200)
+
+    Returns:
+        JSON: {"deck": {id, name}, "cards": [{id, question, answer}, ...]}
+    """
+    deck = Deck.get_by_id(deck_id)
+    if not deck:
+        return api_response({'error': 'Deck not found'}, 404)
+
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = max(1, min(int(data.get('limit', MAX_SESSION_CARDS)), MAX_SESSION_CARDS))
+    except (TypeError, ValueError):
+        return api_response({'error': 'limit must be an integer'}, 400)
+
+    due_cards = Flashcard.get_due(deck_id, limit=limit)
+
+    # Same session marker as the HTML study page, so grading is validated
+    # the same way for both clients
+    session['studying_deck_id'] = deck_id
+
+    return api_response({
+        'deck': {'id': deck['id'], 'name': deck['name']},
+        'cards': [
+            {'id': card['id'], 'question': card['question'], 'answer': card['answer']}
+            for card in due_cards
+        ]
+    })
+
+
+@api.route('/decks/<int:deck_id>/grade', methods=['POST'])
+def grade(deck_id):
+    """
+    Grade a card in the current study session.
+
+    JSON body:
+        card_id (int): Card being graded
+        success (bool): Whether the answer was correct
+
+    Returns:
+        JSON: {"card": {id, studied_count, success_count, streak, last_studied}}
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return api_response({'error': 'No data provided'}, 400)
+
+    card_id = data.get('card_id')
+    success = data.get('success')
+    if card_id is None or not isinstance(success, bool):
+        return api_response({'error': 'Missing card_id or success'}, 400)
+
+    if session.get('studying_deck_id') != deck_id:
+        return api_response({'error': 'Invalid session'}, 403)
+
+    card = Flashcard.update_stats(card_id, success, deck_id=deck_id)
+    if not card:
+        return api_response({'error': 'Flashcard not found'}, 404)
+
+    return api_response({
+        'card': {
+            'id': card['id'],
+            'studied_count': card['studied_count'],
+            'success_count': card['success_count'],
+            'streak': card['streak'],
+            'last_studied': card['last_studied']
+        }
+    })
@@ -0,0 +1,156 @@
+"""
+Conditional GET support (ETag / Last-Modified) for read-only pages.
+
+For students: Browsers remember the ETag header of a page and send it back
+in an If-None-Match header on the next visit. If the page hasn't changed,
+we reply "304 Not Modified" with an empty body and the browser reuses its
+copy. The ETags here come from the deck and library version counters, so
+the check costs a single primary-key lookup instead of rendering the page.
+"""
+
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, render_template, request, session
+from src.models.database import current_tenant
+from src.models.deck import Deck
+from src.services.fragment_cache import fragment_cache
+
+# Validators for one page: the ETag plus the version it was derived from
+# (deck_id is None for pages built from the whole library)
+PageVersion = namedtuple('PageVersion', ['etag', 'last_modified', 'deck_id', 'version'])
+
+
+def deck_validator(prefix):
+    """
+    Build a validator that versions a page by a single deck.
+
+    Args:
+        prefix (str): Distinguishes pages built from the same deck
+
+    Returns:
+        callable: deck_id -> PageVersion or None if not found
+    """
+    def validator(deck_id, **kwargs):
+        version = Deck.get_version(deck_id)
+        if version is None:
+            return None
+        number, updated_at = version
+        return PageVersion(f'{prefix}-{deck_id}-v{number}', updated_at, deck_id, number)
+    return validator
+
+
+def library_validator(prefix):
+    """
+    Build a validator that versions a page by the whole library.
+
+    Args:
+        prefix (str): Distinguishes pages built from the library
+
+    Returns:
+        callable: (**view_args) -> PageVersion
+    """
+    def validator(**kwargs):
+        number, updated_at = Deck.get_library_version()
+        return PageVersion(f'{prefix}-v{number}', updated_at, None, number)
+    return validator
+
+
+def _not_modified(etag, last_modified):
+    """Check the request's conditional headers against the current validators."""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return request.if_none_match.contains(etag)
+
+    if request.if_modified_since and last_modified is not None:
+        # HTTP dates only have one-second resolution
+        return int(last_modified) <= request.if_modified_since.timestamp()
+
+    return False
+
+
+def conditional_get(validator, vary=None):
+    """
+    Decorator answering conditional GET requests before the view runs.
+
+    The validator receives the view's URL arguments and returns a
+    PageVersion, or None to let the view handle the request normally (for
+    example to return its own 404 page). The PageVersion is kept in
+    g.page_version so the view can use it with render_cached().
+
+    The query string is folded into the ETag, because different query
+    arguments (pages, field lists) produce different responses.
+
+    Args:
+        validator (callable): Computes the validators for the request
+        vary (callable, optional): Returns a suffix identifying the response
+            representation (for example '-gzip' for compressed responses)
+
+    Returns:
+        callable: Decorator for a view function
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are rendered into the page by base.html,
+            # so the page must be rebuilt even if the data hasn't changed
+            if '_flashes' in session:
+                return view(*args, **kwargs)
+
+            page = validator(**kwargs)
+            if page is None:
+                return view(*args, **kwargs)
+
+            g.page_version = page
+            etag, last_modified = page.etag, page.last_modified
+            if request.query_string:
+                etag += '-q' + format(zlib.crc32(request.query_string), '08x')
+            # Deck ids and versions repeat across tenant databases
+            tenant = current_tenant()
+            if tenant is not None:
+                etag += '-t' + format(zlib.crc32(tenant.encode('utf-8')), '08x')
+            if vary is not None:
+                etag += vary()
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = datetime.fromtimestamp(last_modified, tz=timezone.utc)
+            # Ask browsers to revalidate every time instead of guessing freshness
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def render_cached(template, build_context):
+    """
+    Render a template through the fragment cache.
+
+    Uses the PageVersion stored by @conditional_get as the cache key, so the
+    cached page is reused until the deck (or library) version changes. Falls
+    back to a normal render when there is no version or when flash messages
+    are pending.
+
+    Args:
+        template (str): Template file name
+        build_context (callable): Returns the template variables as a dict
+
+    Returns:
+        Response: Rendered page with an X-Fragment-Cache: hit/miss header
+    """
+    page = g.get('page_version')
+    if page is None or '_flashes' in session:
+        return render_template(template, **build_context())
+
+    body, status = fragment_cache.render(template, page.deck_id, page.version, build_context)
+    response = make_response(body)
+    response.headers['X-Fragment-Cache'] = status
+    return response
@@ -7,16 +7,30 @@ For students: Routes are URL endpoints that your Flask app responds to.
 Each route function (called a "view") handles a specific URL pattern.
 """
 
+import logging
+
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, flash, Response
-from src.services.flashcard_generator import FlashcardGenerator
+from src.config import Config
 from src.models.deck import Deck
 from src.models.flashcard import Flashcard
+from src.routes.conditional import conditional_get, deck_validator, library_validator, render_cached
+from src.logs import log_event
+
+logger = logging.getLogger(__name__)
 
 # Create a Blueprint named 'main'
 # Blueprints organize related routes into modules
 # For students: Think of this as a collection of related URL handlers
 main = Blueprint('main', __name__)
 
+# Session marker for a library-wide review session (in place of a deck id),
+# and the "deck" its pages show
+REVIEW_ALL = 'all'
+REVIEW_ALL_DECK = {'id': REVIEW_ALL, 'name': 'All due cards'}
+
+# Most edits plus deletes accepted in one bulk request (/deck/<id>/cards/bulk)
+MAX_BULK_ITEMS = 500
+
 
 @main.route('/')
 def index():
@@ -49,6 +63,11 @@ def generate():
     if not notes or not topic:
         return "Missing notes or topic", 400
 
+    # Imported here rather than at the top of the file: the Anthropic SDK
+    # (with httpx and pydantic) takes over a second to import, and no other
+    # route needs it, so workers start faster without it
+    from src.services.flashcard_generator import FlashcardGenerator
+
     try:
         # Generate and save flashcards using the AI service
         # For students: This is the FlashcardGenerator from Phase 2
@@ -69,6 +88,7 @@ def generate():
 
 
 @main.route('/preview/<int:deck_id>')
+@conditional_get(deck_validator('preview'))
 def preview(deck_id):
     """
     Preview generated flashcards before study.
@@ -83,14 +103,18 @@ def preview(deck_id):
     if not deck:
         return "Deck not found", 404
 
-    flashcards = Flashcard.get_by_deck(deck_id)
-
     # Render preview template with deck and flashcard data
     # For students: These variables become available in the template as {{ deck }} and {{ flashcards }}
-    return render_template('preview.html', deck=deck, flashcards=flashcards)
+    # render_cached() reuses the last rendered page until this deck changes,
+    # so the flashcards are only loaded when the page has to be re-rendered
+    return render_cached('preview.html', lambda: {
+        'deck': deck,
+        'flashcards': Flashcard.get_by_deck(deck_id)
+    })
 
 
 @main.route('/decks')
+@conditional_get(library_validator('decks'))
 def decks():
     """
     Display all saved decks for user to select which one to study.
@@ -100,43 +124,43 @@ def decks():
     """
     from datetime import datetime
 
-    # Get all decks with their statistics
-    # For students: Deck.get_all_with_stats() returns deck data + aggregated flashcard stats
-    decks = Deck.get_all_with_stats()
+    def build_context():
+        # Get all decks with their statistics
+        # For students: Deck.get_all_with_stats() returns deck data + aggregated flashcard stats
+        decks = Deck.get_all_with_stats()
 
-    # Format dates and add card_count alias for each deck
-    # For students: We format timestamps as readable dates and ensure backward compatibility
-    decks_with_dates = []
-    for deck in decks:
-        # Format the created_at timestamp as a human-readable date
-        created_date = datetime.fromtimestamp(deck['created_at']).strftime('%b %d, %Y')
+        # Format dates and add card_count alias for each deck
+        # For students: We format timestamps as readable dates and ensure backward compatibility.
+        # The DeckSummary records have slots for these display fields, so they are filled in place
+        for deck in decks:
+            # Format the created_at timestamp as a human-readable date
+            deck['created_date'] = datetime.fromtimestamp(deck['created_at']).strftime('%b %d, %Y')
 
-        # Format last_studied timestamp if available
-        if deck.get('last_studied'):
-            last_studied_date = datetime.fromtimestamp(deck['last_studied']).strftime('%b %d, %Y')
-        else:
-            last_studied_date = None
-
-        # Add formatted dates and card_count alias (total_cards from stats)
-        decks_with_dates.append({
-            **deck,
-            'card_count': deck['total_cards'],
-            'created_date': created_date,
-            'last_studied_date': last_studied_date
-        })
+            # Format last_studied timestamp if available
+            if deck.get('last_studied'):
+                deck['last_studied_date'] = datetime.fromtimestamp(deck['last_studied']).strftime('%b %d, %Y')
+            else:
+                deck['last_studied_date'] = None
 
-    # Render decks template with the enhanced deck data
-    # For students: The template receives decks with stats and formatted dates
-    return render_template('decks.html', decks=decks_with_dates)
+            # Add card_count alias (total_cards from stats)
+            deck['card_count'] = deck['total_cards']
+
+        # For students: The template receives decks with stats and formatted dates
+        return {'decks': decks}
+
+    # For students: The page is rendered once per library version and then
+    # served from the fragment cache until any deck or card changes
+    return render_cached('decks.html', build_context)
 
 
 @main.route('/study/<int:deck_id>')
 def study(deck_id):
     """
-    Start study session for a deck - loads all flashcards and initializes session tracking.
+    Start study session for a deck - loads its weakest flashcards and initializes session tracking.
 
     For students: This route handles GET requests to /study/<deck_id>.
-    It loads the deck and all flashcards, then renders the study template.
+    It loads the deck and up to STUDY_SESSION_CARDS of its weakest cards
+    (never studied, most overdue, most often missed), then renders the study template.
     Session tracking allows us to monitor the study session across multiple requests.
     """
     # Load deck from database
@@ -145,37 +169,88 @@ def study(deck_id):
     if not deck:
         return "Deck not found", 404
 
-    # Load all flashcards for this deck
-    # For students: Flashcard.get_by_deck() returns a list of all cards in the deck
-    flashcards = Flashcard.get_by_deck(deck_id)
+    # Load the cards for this session
+    # For students: Flashcard.get_study_queue() returns the top cards from an
+    # index sorted by next review time, so a 10,000-card deck gives a short
+    # session of its weakest cards without sorting the whole deck
+    flashcards = Flashcard.get_study_queue(deck_id, Config.STUDY_SESSION_CARDS)
 
     # Check if deck has any flashcards
     if not flashcards:
         return "This deck has no flashcards", 400
 
+    return _start_study_session(deck_id, deck, flashcards)
+
+
+@main.route('/study/all')
+def review_all():
+    """
+    Start a review session with the due cards of every deck.
+
+    For students: Instead of opening each deck in turn, this session mixes
+    the most overdue cards from the whole library. A per-deck cap
+    (REVIEW_MAX_PER_DECK) keeps one big deck from taking over the session.
+    Grading and the summary work exactly like a single-deck session.
+    """
+    flashcards = Flashcard.get_review_queue(Config.REVIEW_SESSION_CARDS, Config.REVIEW_MAX_PER_DECK)
+    if not flashcards:
+        flash('Nothing is due for review right now', 'info')
+        return redirect(url_for('main.decks'))
+
+    # Show which deck each card comes from
+    deck_names = Deck.get_names(card['deck_id'] for card in flashcards)
+    return _start_study_session(REVIEW_ALL, REVIEW_ALL_DECK, flashcards, deck_names)
+
+
+def _start_study_session(session_id, deck, flashcards, deck_names=None):
+    """
+    Render the study page for a deck or library-wide session.
+
+    Args:
+        session_id (int or str): Deck ID, or REVIEW_ALL
+        deck (dict): Deck shown in the page title (id and name)
+        flashcards (list): Cards for this session, weakest first
+        deck_names (dict, optional): Deck id -> name, shown on each card
+
+    Returns:
+        str: Rendered study.html
+    """
     # Initialize session state for tracking this study session
     # For students: Flask session is a secure cookie that persists across requests
     # We store the deck_id to validate grade requests and track which cards were studied
     # Only initialize cards_studied if starting a NEW session (not resuming existing one)
-    if session.get('studying_deck_id') != deck_id:
-        session['studying_deck_id'] = deck_id
+    if session.get('studying_deck_id') != session_id:
+        session['studying_deck_id'] = session_id
         session['cards_studied'] = []  # Will store results: [{'card_id': 1, 'success': True}, ...]
 
     # Render study template with deck and flashcards data
-    # For students: The template receives three variables:
+    # For students: The template receives these variables:
     # - deck: dict with id and name
-    # - flashcards: list of all cards (id, question, answer)
+    # - flashcards: list of this session's cards, weakest first
     # - total_cards: count for progress indicator
+    # - deck_names: deck of each card (library-wide sessions only)
     return render_template(
         'study.html',
         deck=deck,
         flashcards=flashcards,
-        total_cards=len(flashcards)
+        total_cards=len(flashcards),
+        deck_names={str(deck_id): name for deck_id, name in (deck_names or {}).items()}
     )
 
 
 @main.route('/study/<int:deck_id>/grade', methods=['POST'])
 def grade_card(deck_id):
+    """Grade a flashcard during a deck's study session (see _grade_card)."""
+    return _grade_card(deck_id)
+
+
+@main.route('/study/all/grade', methods=['POST'])
+def review_all_grade():
+    """Grade a flashcard during a library-wide review session (see _grade_card)."""
+    return _grade_card(REVIEW_ALL)
+
+
+def _grade_card(session_id):
     """
     Grade a flashcard during study session and update statistics.
 
@@ -202,7 +277,7 @@ def grade_card(deck_id):
     # Validate session state
     # For students: We check that the deck_id matches the session to prevent
     # someone from grading cards from a different deck than they're studying
-    if session.get('studying_deck_id') != deck_id:
+    if session.get('studying_deck_id') != session_id:
         return jsonify({'error': 'Invalid session'}), 403
 
     # Update flashcard statistics in database
@@ -226,9 +301,9 @@ def grade_card(deck_id):
         # IMPORTANT: Tell Flask the session was modified (needed for mutable objects like lists)
         session.modified = True
 
-        # DEBUG
-        import sys
-        print(f"DEBUG GRADE: Added card {card_id}, success={success}. Total cards studied: {len(session['cards_studied'])}", file=sys.stderr, flush=True)
+        # Debug-level and sampled: this runs for every card graded
+        log_event(logger, 'card_graded', logging.DEBUG, card_id=card_id, success=success,
+                  cards_studied=len(session['cards_studied']))
 
         # Return success response
         return jsonify({'success': True}), 200
@@ -241,6 +316,22 @@ def grade_card(deck_id):
 
 @main.route('/study/<int:deck_id>/summary', methods=['GET', 'POST'])
 def study_summary(deck_id):
+    """Summary of a deck's study session (see _study_summary)."""
+    # Load deck from database
+    deck = Deck.get_by_id(deck_id)
+    if not deck:
+        return "Deck not found", 404
+
+    return _study_summary(deck_id, deck, url_for('main.study', deck_id=deck_id))
+
+
+@main.route('/study/all/summary', methods=['GET', 'POST'])
+def review_all_summary():
+    """Summary of a library-wide review session (see _study_summary)."""
+    return _study_summary(REVIEW_ALL, REVIEW_ALL_DECK, url_for('main.review_all'))
+
+
+def _study_summary(session_id, deck, study_url):
     """
     Display session summary with performance statistics and cards needing practice.
 
@@ -254,12 +345,12 @@ def study_summary(deck_id):
     With spaced repetition, the summary now also shows:
     - Total attempts (may be > card count if cards were re-queued)
     - All cards mastered (session only ends when all "Got it!")
-    """
-    # Load deck from database
-    deck = Deck.get_by_id(deck_id)
-    if not deck:
-        return "Deck not found", 404
 
+    Args:
+        session_id (int or str): Deck ID, or REVIEW_ALL
+        deck (dict): Deck shown on the page (id and name)
+        study_url (str): Where to go when there are no results to show
+    """
     # Handle POST - receiving results from JavaScript
     if request.method == 'POST':
         data = request.get_json()
@@ -267,7 +358,7 @@ def study_summary(deck_id):
             # Store results in session for the subsequent GET request
             # For students: Now includes total_attempts from spaced repetition tracking
             session['summary_results'] = data['results']
-            session['summary_deck_id'] = deck_id
+            session['summary_deck_id'] = session_id
             session['summary_total_attempts'] = data.get('total_attempts', len(data['results']))
             session['summary_cards_mastered'] = data.get('cards_mastered', 0)
             session.modified = True
@@ -280,9 +371,9 @@ def study_summary(deck_id):
     stored_deck_id = session.get('summary_deck_id')
 
     # Validate we have results for this deck
-    if not cards_studied or stored_deck_id != deck_id:
+    if not cards_studied or stored_deck_id != session_id:
         # No results - redirect back to study page
-        return redirect(url_for('main.study', deck_id=deck_id))
+        return redirect(study_url)
 
     # Get spaced repetition metrics from session
     # For students: total_attempts counts how many times cards were shown overall
@@ -388,15 +479,94 @@ def edit_card(card_id):
         return jsonify({'error': str(e)}), 500
 
 
+@main.route('/deck/<int:deck_id>/cards/bulk', methods=['POST'])
+def bulk_cards(deck_id):
+    """
+    Edit and delete many cards of a deck in one request and one transaction.
+
+    For students: Cleaning up a freshly generated deck card by card costs one
+    request, commit and page update per card. Here the client sends all its
+    changes at once and the server saves them together - or, if any card was
+    changed by someone else in the meantime, saves none of them.
+
+    JSON body:
+        edits: [{"id", "question" and/or "answer", "version" (optional)}, ...]
+        deletes: [{"id", "version" (optional)}, ...] (plain ids also work)
+
+    Returns:
+        JSON: {"applied": true/false, "results": [{"id", "status", "version"}, ...]}
+            with status 'updated' or 'deleted'; 409 when nothing was saved,
+            with the cards at fault marked 'conflict' or 'not_found' (the
+            rest 'skipped')
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No data provided'}), 400
+
+    edits = data.get('edits') or []
+    deletes = [{'id': item} if isinstance(item, int) else item for item in data.get('deletes') or []]
+
+    # Validate everything before touching the database
+    error = _bulk_error(edits, deletes)
+    if error:
+        return jsonify({'error': error}), 400
+
+    if not Deck.get_by_id(deck_id):
+        return jsonify({'error': 'Deck not found'}), 404
+
+    applied, results = Flashcard.bulk_change(deck_id, edits=edits, deletes=deletes)
+    log_event(logger, 'cards_bulk_changed', deck_id=deck_id, edits=len(edits), deletes=len(deletes),
+              applied=applied)
+    return jsonify({'applied': applied, 'results': results}), 200 if applied else 409
+
+
+def _bulk_error(edits, deletes):
+    """
+    Check a bulk request's items.
+
+    Returns:
+        str: What is wrong with the request, or None if it is valid
+    """
+    if not isinstance(edits, list) or not isinstance(deletes, list):
+        return 'edits and deletes must be lists'
+    if not edits and not deletes:
+        return 'No edits or deletes provided'
+    if len(edits) + len(deletes) > MAX_BULK_ITEMS:
+        return f'At most {MAX_BULK_ITEMS} edits and deletes per request'
+
+    seen = set()
+    for position, item in enumerate(edits + deletes, start=1):
+        if not isinstance(item, dict):
+            return f'Item {position} must be an object'
+        card_id, version = item.get('id'), item.get('version')
+        # bool is a subclass of int in Python, so rule it out explicitly
+        if not isinstance(card_id, int) or isinstance(card_id, bool):
+            return f'Item {position} needs an integer id'
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            return f'Item {position} has a version that is not an integer'
+        if card_id in seen:
+            return f'Card {card_id} appears more than once'
+        seen.add(card_id)
+
+    for position, edit in enumerate(edits, start=1):
+        texts = [edit.get(field) for field in ('question', 'answer') if edit.get(field) is not None]
+        if not texts:
+            return f'Edit {position} needs a question or an answer'
+        if not all(isinstance(text, str) and text.strip() for text in texts):
+            return f'Edit {position} has an empty question or answer'
+    return None
+
+
 @main.route('/deck/<int:deck_id>/delete', methods=['POST'])
 def delete_deck(deck_id):
     """
     Delete a deck and all its flashcards.
 
     For students: This endpoint handles POST requests to delete a deck.
-    The Deck.delete() method uses CASCADE deletion, so all flashcards
-    in the deck are automatically deleted when the deck is removed.
-    After deletion, the user is redirected back to the decks list.
+    Deck.delete() hides the deck immediately; its flashcards are removed
+    by a background thread a batch at a time, so deleting a huge deck
+    doesn't block other requests. After deletion, the user is redirected
+    back to the decks list.
     """
     # Attempt to delete the deck
     # For students: Deck.delete() returns True if deleted, False if not found
@@ -411,6 +581,7 @@ def delete_deck(deck_id):
 
 
 @main.route('/deck/<int:deck_id>/export')
+@conditional_get(deck_validator('export'))
 def export_deck(deck_id):
     """
     Export a deck as a downloadable JSON file.
@@ -534,6 +705,7 @@ def delete_card(card_id):
 
 
 @main.route('/stats')
+@conditional_get(library_validator('stats'))
 def statistics():
     """
     Display statistics dashboard showing study progress across all decks.
@@ -544,30 +716,45 @@ def statistics():
     """
     from datetime import datetime
 
-    # Get overall statistics across all decks
-    # For students: Deck.get_overall_stats() aggregates data from all flashcards
-    overall = Deck.get_overall_stats()
-
-    # Format the last studied timestamp as human-readable date
-    if overall['last_studied']:
-        overall['last_studied_date'] = datetime.fromtimestamp(
-            overall['last_studied']
-        ).strftime('%b %d, %Y at %I:%M %p')
-    else:
-        overall['last_studied_date'] = 'Never'
-
-    # Get all decks with their individual statistics
-    # For students: Deck.get_all_with_stats() returns deck data + flashcard stats
-    decks = Deck.get_all_with_stats()
-
-    # Format dates for each deck
-    for deck in decks:
-        if deck['last_studied']:
-            deck['last_studied_date'] = datetime.fromtimestamp(
-                deck['last_studied']
-            ).strftime('%b %d, %Y')
-        else:
-            deck['last_studied_date'] = 'Never'
+    def build_context():
+        # Get overall statistics across all decks
+        # For students: Deck.get_overall_stats() aggregates data from all flashcards
+        overall = Deck.get_overall_stats()
 
-    # Render statistics template
-    return render_template('stats.html', overall=overall, decks=decks)
+        # Format the last studied timestamp as human-readable date
+        if overall['last_studied']:
+            overall['last_studied_date'] = datetime.fromtimestamp(
+                overall['last_studied']
+            ).strftime('%b %d, %Y at %I:%M %p')
+        else:
+            overall['last_studied_date'] = 'Never'
+
+        # Get all decks with their individual statistics
+        # For students: Deck.get_all_with_stats() returns deck data + flashcard stats
+        decks = Deck.get_all_with_stats()
+
+        # Retention analytics (forgetting curves, predicted recall) for every card
+        # For students: This is computed with NumPy in one pass and cached until
+        # the flashcard data changes, so repeat visits don't redo the math
+        from src.services.analytics import get_retention_report
+        report = get_retention_report()
+        overall.update(report.overall())
+        retention_by_deck = report.deck_summaries()
+
+        # Format dates for each deck
+        for deck in decks:
+            if deck['last_studied']:
+                deck['last_studied_date'] = datetime.fromtimestamp(
+                    deck['last_studied']
+                ).strftime('%b %d, %Y')
+            else:
+                deck['last_studied_date'] = 'Never'
+
+            retention = retention_by_deck.get(deck['id'], {})
+            deck['predicted_recall'] = retention.get('predicted_recall')
+            deck['retention_histogram'] = retention.get('retention_histogram', [])
+
+        return {'overall': overall, 'decks': decks}
+
+    # Render statistics template (cached until the library version changes)
+    return render_cached('stats.html', build_context)
@@ -0,0 +1,287 @@
+"""
+Retention analytics engine for the statistics dashboard.
+
+This module loads the study columns of every flashcard into NumPy arrays in a
+single query and computes, without any per-card Python loops:
+- per-card difficulty (smoothed failure ratio)
+- per-deck forgetting-curve fits (exponential decay R = exp(-t / S))
+- predicted recall probability for each card right now
+- per-deck retention distributions (histogram, mean, median)
+
+For students: NumPy applies each operation to a whole array at once in
+compiled code, so a million cards take milliseconds instead of the seconds a
+`for card in cards:` loop would need.
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.models.database import NOT_IN_DELETED_DECK, current_tenant, get_db
+from src.models.deck import Deck
+
+# Column order of the single SELECT used to load the analytics arrays
+_COLUMNS = ('id', 'deck_id', 'created_at', 'studied_count', 'success_count', 'last_studied', 'streak')
+
+# Number of equal-width buckets in each deck's predicted recall histogram
+RETENTION_BINS = 10
+
+# Shortest average review interval (seconds) used for curve fitting, so cards
+# graded several times in one sitting don't produce absurd decay rates
+MIN_REVIEW_INTERVAL = 60.0
+
+# Stability (seconds) assumed for decks without enough history to fit a curve
+DEFAULT_STABILITY = 86400.0
+
+# Reports kept in memory, one per tenant (least recently used dropped first)
+# For students: Each report holds arrays for every card of a library, so
+# only the libraries viewed most recently are kept, as the shard pool does
+# with open connections
+MAX_CACHED_REPORTS = 16
+
+_cache_lock = threading.Lock()
+# Tenant (None for the main database) -> (library version, RetentionReport)
+_cached_reports = OrderedDict()
+
+
+def load_review_columns(conn):
+    """
+    Load the study columns of every flashcard into NumPy arrays in one pass.
+
+    Cards of deleted decks that haven't been purged yet are left out.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection
+
+    Returns:
+        dict[str, np.ndarray]: One float64 array per column in _COLUMNS
+            (last_studied is NaN for cards that were never studied)
+    """
+    # COALESCE keeps every value numeric so the rows can be streamed straight
+    # into one flat float array without building a Python list first
+    select_list = ', '.join(
+        'COALESCE(last_studied, -1.0)' if name == 'last_studied' else name
+        for name in _COLUMNS
+    )
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(f'SELECT {select_list} FROM flashcards WHERE {NOT_IN_DELETED_DECK}')
+
+    matrix = np.fromiter(
+        itertools.chain.from_iterable(cursor),
+        dtype=np.float64
+    ).reshape(-1, len(_COLUMNS))
+
+    last_studied = matrix[:, _COLUMNS.index('last_studied')]
+    last_studied[last_studied < 0] = np.nan
+
+    return {name: matrix[:, i] for i, name in enumerate(_COLUMNS)}
+
+
+class RetentionReport:
+    """
+    Vectorized retention analytics computed from the flashcard study columns.
+
+    Attributes (one entry per card, aligned with card_ids):
+        card_ids, deck_ids: Identifiers as int64 arrays
+        difficulty: 1 - smoothed success ratio (0 = easy, 1 = hard)
+        stability: Estimated memory stability in seconds
+        predicted_recall: Probability of recalling the card at `computed_at`
+            (NaN for cards that were never studied)
+    """
+
+    def __init__(self, columns, now=None):
+        self.computed_at = time.time() if now is None else now
+
+        self.card_ids = columns['id'].astype(np.int64)
+        self.deck_ids = columns['deck_id'].astype(np.int64)
+        studied = columns['studied_count']
+        success = columns['success_count']
+        streak = columns['streak']
+        last_studied = columns['last_studied']
+        created_at = columns['created_at']
+
+        # Dense deck index per card so per-deck reductions can use bincount
+        self.deck_order, deck_index = np.unique(self.deck_ids, return_inverse=True)
+        self._deck_index = deck_index
+        deck_count = len(self.deck_order)
+
+        # Laplace-smoothed success ratio: unstudied cards start at 0.5
+        recall_ratio = (success + 1.0) / (studied + 2.0)
+        self.difficulty = 1.0 - recall_ratio
+
+        # Forgetting-curve fit per deck: -ln(p) = t / S, least squares through
+        # the origin over studied cards, where t is the card's mean interval
+        # between reviews and p its smoothed success ratio
+        studied_mask = (studied > 0) & ~np.isnan(last_studied)
+        interval = np.where(
+            studied_mask,
+            np.maximum((np.nan_to_num(last_studied) - created_at) / np.maximum(studied, 1.0), MIN_REVIEW_INTERVAL),
+            0.0
+        )
+        decay = -np.log(recall_ratio)
+        sum_xy = np.bincount(deck_index, weights=interval * decay, minlength=deck_count)
+        sum_xx = np.bincount(deck_index, weights=interval * interval, minlength=deck_count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deck_stability = np.where(sum_xy > 0, sum_xx / sum_xy, DEFAULT_STABILITY)
+        self.deck_stability = deck_stability
+
+        # Each correct answer in a row extends how long the card is remembered
+        self.stability = deck_stability[deck_index] * (1.0 + streak)
+
+        elapsed = np.maximum(self.computed_at - last_studied, 0.0)
+        self.predicted_recall = np.where(
+            studied_mask,
+            np.exp(-elapsed / self.stability),
+            np.nan
+        )
+        self._studied_mask = studied_mask
+        self._deck_summaries = None
+
+    @property
+    def card_count(self):
+        return len(self.card_ids)
+
+    def deck_summaries(self):
+        """
+        Summarize predicted retention per deck.
+
+        Returns:
+            dict[int, dict]: deck_id -> {
+                'predicted_recall': float or None (mean over studied cards, 0-100),
+                'median_recall': float or None (0-100),
+                'difficulty': float (mean card difficulty, 0-100),
+                'stability_days': float (fitted forgetting-curve stability),
+                'retention_histogram': list[int] (RETENTION_BINS bucket counts)
+            }
+        """
+        # The report is immutable once built, so summarize it only once
+        if self._deck_summaries is not None:
+            return self._deck_summaries
+
+        deck_count = len(self.deck_order)
+        if deck_count == 0:
+            return {}
+
+        index = self._deck_index
+        mask = self._studied_mask
+        recall = self.predicted_recall
+
+        cards_per_deck = np.bincount(index, minlength=deck_count)
+        studied_per_deck = np.bincount(index[mask], minlength=deck_count)
+        recall_sum = np.bincount(index[mask], weights=recall[mask], minlength=deck_count)
+        difficulty_sum = np.bincount(index, weights=self.difficulty, minlength=deck_count)
+
+        # Histogram of every deck at once: flatten (deck, bucket) to one index
+        buckets = np.minimum((recall[mask] * RETENTION_BINS).astype(np.int64), RETENTION_BINS - 1)
+        histogram = np.bincount(
+            index[mask] * RETENTION_BINS + buckets,
+            minlength=deck_count * RETENTION_BINS
+        ).reshape(deck_count, RETENTION_BINS)
+
+        # Per-deck median: sort studied cards by (deck, recall), then pick the
+        # middle element of each deck's contiguous run
+        medians = np.full(deck_count, np.nan)
+        if mask.any():
+            studied_index = index[mask]
+            studied_recall = recall[mask]
+            order = np.lexsort((studied_recall, studied_index))
+            sorted_recall = studied_recall[order]
+            starts = np.concatenate(([0], np.cumsum(studied_per_deck)[:-1]))
+            has_data = studied_per_deck > 0
+            lower = starts + (studied_per_deck - 1) // 2
+            upper = starts + studied_per_deck // 2
+            medians[has_data] = (sorted_recall[lower[has_data]] + sorted_recall[upper[has_data]]) / 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_recall = np.round(recall_sum / studied_per_deck * 100, 1)
+            mean_difficulty = np.round(difficulty_sum / cards_per_deck * 100, 1)
+        median_recall = np.round(medians * 100, 1)
+        stability_days = np.round(self.deck_stability / 86400.0, 2)
+
+        # Convert to Python lists once; indexing NumPy scalars in a loop is slow
+        columns = zip(
+            self.deck_order.tolist(),
+            (studied_per_deck > 0).tolist(),
+            mean_recall.tolist(),
+            median_recall.tolist(),
+            mean_difficulty.tolist(),
+            stability_days.tolist(),
+            histogram.tolist()
+        )
+        summaries = {}
+        for deck_id, has_data, recall_pct, median_pct, difficulty, stability, buckets in columns:
+            summaries[deck_id] = {
+                'predicted_recall': recall_pct if has_data else None,
+                'median_recall': median_pct if has_data else None,
+                'difficulty': difficulty,
+                'stability_days': stability,
+                'retention_histogram': buckets
+            }
+        self._deck_summaries = summaries
+        return summaries
+
+    def overall(self):
+        """
+        Summarize predicted retention across the whole collection.
+
+        Returns:
+            dict: {
+                'predicted_recall': float or None (mean over studied cards, 0-100),
+                'cards_at_risk': int (studied cards with predicted recall < 50%),
+                'average_difficulty': float (0-100)
+            }
+        """
+        mask = self._studied_mask
+        if not mask.any():
+            predicted = None
+        else:
+            predicted = round(float(self.predicted_recall[mask].mean()) * 100, 1)
+
+        at_risk = int(np.count_nonzero(self.predicted_recall[mask] < 0.5))
+        difficulty = float(self.difficulty.mean()) * 100 if self.card_count else 0.0
+
+        return {
+            'predicted_recall': predicted,
+            'cards_at_risk': at_risk,
+            'average_difficulty': round(difficulty, 1) if not math.isnan(difficulty) else 0.0
+        }
+
+
+def get_retention_report():
+    """
+    Return the retention report, recomputing it only when the data changed.
+
+    For students: Loading a million rows is the expensive part, so we keep the
+    last report in memory and only rebuild it when the library version (bumped
+    by a trigger on every flashcard write) has moved on. Every tenant's
+    database counts its own versions, so reports are cached per tenant.
+
+    Returns:
+        RetentionReport: Analytics for every flashcard in the current
+            tenant's database
+    """
+    tenant = current_tenant()
+    version, _ = Deck.get_library_version()
+    with _cache_lock:
+        cached = _cached_reports.get(tenant)
+        if cached is not None and cached[0] == version:
+            _cached_reports.move_to_end(tenant)
+            return cached[1]
+
+    conn = get_db()
+    try:
+        report = RetentionReport(load_review_columns(conn))
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        _cached_reports[tenant] = (version, report)
+        _cached_reports.move_to_end(tenant)
+        while len(_cached_reports) > MAX_CACHED_REPORTS:
+            _cached_reports.popitem(last=False)
+    return report
@@ -0,0 +1,187 @@
+"""
+Circuit breaker for calls to the Anthropic API.
+
+When the API is degraded, every generation would otherwise work through
+the whole retry ladder in FlashcardGenerator._retry_with_backoff (about 15
+seconds of sleeps) before failing, holding a worker thread the entire
+time. The breaker watches the outcome of recent API calls and, once too
+many of them fail, stops calling for a while:
+- closed: calls go through; each outcome is added to a rolling window of
+  the last LLM_BREAKER_WINDOW_SECONDS
+- open: once the window holds at least LLM_BREAKER_MIN_CALLS calls and
+  their error rate reaches LLM_BREAKER_ERROR_RATE, calls fail at once with
+  a friendly message for LLM_BREAKER_OPEN_SECONDS
+- half-open: after that pause one trial call is let through; if it works
+  the circuit closes again, if it fails it opens for another pause
+
+Only failures that say something about the API's health count (overload,
+server errors, rate limits, timeouts and connection errors); a bad request
+or a wrong API key doesn't open the circuit. The breaker is shared by all
+threads (and the event loop) of a worker process, and its state is
+exported on /metrics as llm_circuit.
+
+For students: This is the same idea as the fuse box in a house: rather
+than letting every request hammer a service that is already struggling,
+we trip after repeated failures, give the service room to recover, and
+check carefully before sending traffic again.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from src.config import Config
+from src.logs import log_event
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+# Numeric value of each state for the llm_circuit gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(ValueError):
+    """Raised instead of calling the API while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling window of call outcomes."""
+
+    def __init__(self, window_seconds, min_calls, error_rate, open_seconds):
+        """
+        Args:
+            window_seconds (float): Age of the oldest outcome counted
+            min_calls (int): Calls needed in the window before it can open
+            error_rate (float): Share of failed calls (0-1) that opens it
+            open_seconds (float): Pause before a trial call is let through
+        """
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self.state = CLOSED
+        # (monotonic time, failed) per finished call, oldest first
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self.opens = 0
+        self.rejected = 0
+
+    def _prune(self, now):
+        """Forget outcomes older than the window (call with the lock held)."""
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _set_state(self, state, now):
+        """Switch state and log the change (call with the lock held)."""
+        self.state = state
+        if state == OPEN:
+            self._opened_at = now
+            self.opens += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+        log_event(logger, 'llm_circuit', logging.WARNING if state == OPEN else logging.INFO,
+                  state=state, open_seconds=self.open_seconds)
+
+    def before_call(self):
+        """
+        Ask permission for an API call.
+
+        Every call allowed here must be followed by record().
+
+        Returns:
+            bool: True if this is the half-open state's trial call
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with
+                the trial call already running
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._set_state(HALF_OPEN, now)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+        raise CircuitOpenError(
+            "The AI service is having problems right now. Please try again in a minute."
+        )
+
+    def record(self, failed, trial=False):
+        """
+        Report how an allowed call went.
+
+        Args:
+            failed (bool or None): True if the API failed, False if it
+                answered, None if the outcome says nothing about its
+                health (for example a rejected API key)
+            trial (bool): What before_call() returned for this call
+        """
+        now = time.monotonic()
+        with self._lock:
+            if trial:
+                self._trial_running = False
+                if failed is not None and self.state == HALF_OPEN:
+                    self._set_state(OPEN if failed else CLOSED, now)
+                return
+            if failed is None or self.state != CLOSED:
+                # Calls that started before the circuit opened don't count
+                return
+
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            self._prune(now)
+            calls = len(self._outcomes)
+            if failed and calls >= self.min_calls and self._failures >= self.error_rate * calls:
+                self._set_state(OPEN, now)
+
+    def stats(self):
+        """
+        Returns:
+            dict: state (0 closed, 1 half-open, 2 open), opens, rejected,
+                and window_calls and window_error_rate of the rolling window
+        """
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                'state': STATE_VALUES[self.state],
+                'opens': self.opens,
+                'rejected': self.rejected,
+                'window_calls': calls,
+                'window_error_rate': round(self._failures / calls, 3) if calls else 0.0,
+            }
+
+    def _after_fork(self):
+        # A new worker judges the API by its own calls
+        self._lock = threading.Lock()
+        self._reset_state()
+
+
+# Shared breaker for this process's Anthropic calls
+llm_breaker = CircuitBreaker(
+    window_seconds=Config.LLM_BREAKER_WINDOW_SECONDS,
+    min_calls=Config.LLM_BREAKER_MIN_CALLS,
+    error_rate=Config.LLM_BREAKER_ERROR_RATE,
+    open_seconds=Config.LLM_BREAKER_OPEN_SECONDS
+)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=llm_breaker._after_fork)
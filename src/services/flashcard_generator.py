@@ -2,16 +2,246 @@
 FlashcardGenerator service using Anthropic's structured outputs.
 
 This service uses Claude's structured outputs feature to reliably generate
-10 Q&A flashcard pairs from study notes with guaranteed schema compliance.
+Q&A flashcard pairs (Config.GENERATE_CARD_COUNT, 10 by default) from study
+notes with guaranteed schema compliance. The notes are cleaned up and
+trimmed to a token budget first (see src/services/notes.py).
 """
 
+import asyncio
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import socket
+import threading
 import time
 import random
-from anthropic import Anthropic, APIError, RateLimitError, InternalServerError
+from anthropic import (
+    Anthropic, AsyncAnthropic, APIConnectionError, APIError, RateLimitError, InternalServerError,
+    OverloadedError
+)
 from src.config import Config
+from src.logs import log_event
+from src.metrics import GENERATIONS_COALESCED, LLM_LATENCY, LLM_RETRIES
+from src.models.database import current_tenant
 from src.models.schemas import FlashcardSet
 from src.models.deck import Deck
 from src.models.flashcard import Flashcard
+from src.models.generation_lease import GenerationLease
+from src.services.circuit_breaker import llm_breaker
+from src.services.notes import prepare_notes
+from src.services.single_flight import generations
+
+logger = logging.getLogger(__name__)
+
+# Output tokens allowed per requested card, plus a fixed allowance for the
+# topic and the JSON around the cards (10 cards -> 1,900 tokens)
+# For students: max_tokens is a ceiling, not a target. Too low and a long
+# answer is cut off mid-JSON, which fails validation and costs a retry;
+# scaling it with the card count keeps small requests small and lets large
+# ones finish.
+OUTPUT_TOKENS_PER_CARD = 170
+OUTPUT_TOKENS_BASE = 200
+
+# Seconds between checks while another worker process runs an identical generation
+LEASE_POLL_SECONDS = 0.25
+
+# One Anthropic client per process, created on first use
+# For students: The client keeps its HTTP connections to the API open, so
+# reusing it saves a new connection (and TLS handshake) on every generation
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get this process's Anthropic client.
+
+    Returns:
+        Anthropic: Shared client configured from Config
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # base_url=None means the real API; load tests point it at a fake server
+            _client = Anthropic(
+                api_key=Config.ANTHROPIC_API_KEY,
+                base_url=Config.ANTHROPIC_BASE_URL or None
+            )
+        return _client
+
+
+# Async client for the ASGI server (src/asgi.py), also one per process
+_async_client = None
+
+
+def get_async_client():
+    """
+    Get this process's async Anthropic client.
+
+    Returns:
+        AsyncAnthropic: Shared async client configured from Config
+    """
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncAnthropic(
+                api_key=Config.ANTHROPIC_API_KEY,
+                base_url=Config.ANTHROPIC_BASE_URL or None
+            )
+        return _async_client
+
+
+def _reset_client_after_fork():
+    """Drop the clients inherited from the parent process.
+
+    A forked worker must not share the parent's open sockets, so each worker
+    builds its own clients on first use.
+    """
+    global _client, _async_client, _client_lock
+    _client = None
+    _async_client = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+def build_prompt(notes: str, topic: str, card_count: int = 10) -> str:
+    """
+    Build the generation prompt.
+
+    The prompt emphasizes active recall and educational quality:
+    - Questions test understanding, not memorization
+    - Avoid yes/no questions - prefer "explain", "describe", "why"
+    - Focus on key concepts from the notes
+    - Detailed answers that reinforce learning
+    """
+    return f"""You are an expert educator creating flashcards for active recall study.
+
+Topic: {topic}
+
+Study Notes:
+{notes}
+
+Generate exactly {card_count} flashcards that:
+1. Test understanding, not memorization
+2. Use questions requiring explanation (avoid yes/no questions)
+3. Focus on key concepts from the notes
+4. Include detailed answers that reinforce learning
+5. Progress from fundamental to more complex concepts
+
+Each flashcard should help the student recall and understand the material."""
+
+
+def max_output_tokens(card_count):
+    """
+    Output token ceiling for a generation of card_count cards.
+
+    Args:
+        card_count (int): Cards requested in the prompt
+
+    Returns:
+        int: Value for the API's max_tokens
+    """
+    return OUTPUT_TOKENS_BASE + OUTPUT_TOKENS_PER_CARD * card_count
+
+
+def _prepare_request(notes, topic, card_count):
+    """
+    Clean up the notes and build the arguments for beta.messages.parse(),
+    shared by the sync and async generators.
+
+    Raises:
+        ValueError: If nothing is left of the notes after clean-up
+    """
+    prepared = prepare_notes(notes, Config.GENERATE_NOTES_TOKEN_BUDGET)
+    if not prepared['text']:
+        raise ValueError("The study notes are empty. Please paste some notes to generate flashcards from.")
+    log_event(logger, 'notes_prepared', tokens_in=prepared['tokens_in'], tokens_out=prepared['tokens_out'],
+              duplicates=prepared['duplicates'], trimmed=prepared['trimmed'])
+    return _request_arguments(build_prompt(prepared['text'], topic, card_count), card_count)
+
+
+def _request_arguments(prompt, card_count):
+    """Arguments for beta.messages.parse(), shared by the sync and async clients."""
+    return {
+        'model': "claude-sonnet-4-5-20250929",
+        'max_tokens': max_output_tokens(card_count),
+        'messages': [{"role": "user", "content": prompt}],
+        'output_format': FlashcardSet,
+    }
+
+
+def _outcome(error):
+    """Label a failed API call for the LLM latency metric."""
+    if isinstance(error, RateLimitError):
+        return 'rate_limited'
+    if isinstance(error, (InternalServerError, OverloadedError)):
+        return 'overloaded'
+    return 'error'
+
+
+def _upstream_failed(error):
+    """
+    Decide whether a failed API call counts against the circuit breaker.
+
+    Returns:
+        bool or None: True if the error says the API is struggling, None if
+            it says nothing about the API's health (a bad request or key)
+    """
+    if isinstance(error, (RateLimitError, InternalServerError, OverloadedError, APIConnectionError)):
+        return True
+    return None
+
+
+def generation_key(notes, topic, card_count):
+    """
+    Key identical generation requests share (see src/services/single_flight.py).
+
+    Spacing is ignored everywhere and case in the topic, so the same notes
+    pasted from different browsers still match.
+
+    Args:
+        notes (str): Study notes as submitted
+        topic (str): Topic as submitted
+        card_count (int): Cards requested
+
+    Returns:
+        str: Hex digest of the normalized input
+    """
+    normalized = '\0'.join((str(card_count), ' '.join(topic.casefold().split()), ' '.join(notes.split())))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _lease_owner():
+    """Name this worker process in the generation_leases table."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _shared_result(deck_id, topic):
+    """Build generate_and_save()'s result for a deck another worker generated."""
+    GENERATIONS_COALESCED.inc('database')
+    deck = Deck.get_by_id(deck_id)
+    return {
+        'deck_id': deck_id,
+        'topic': deck['name'] if deck is not None else topic,
+        'flashcard_count': len(Flashcard.get_by_deck(deck_id))
+    }
+
+
+def _generated(deck_id, flashcard_set, start, generated):
+    """Log a finished generation and build generate_and_save()'s result."""
+    log_event(logger, 'deck_generated', deck_id=deck_id, cards=len(flashcard_set.flashcards),
+              llm_ms=round((generated - start) * 1000, 1),
+              save_ms=round((time.perf_counter() - generated) * 1000, 1))
+    return {
+        'deck_id': deck_id,
+        'topic': flashcard_set.topic,
+        'flashcard_count': len(flashcard_set.flashcards)
+    }
 
 
 class FlashcardGenerator:
@@ -23,8 +253,8 @@ class FlashcardGenerator:
     """
 
     def __init__(self):
-        """Initialize Anthropic client with API key from config."""
-        self.client = Anthropic(api_key=Config.ANTHROPIC_API_KEY)
+        """Use this process's shared Anthropic client (see get_client)."""
+        self.client = get_client()
 
     def _retry_with_backoff(self, func, max_retries=3):
         """
@@ -39,94 +269,114 @@ class FlashcardGenerator:
 
         Raises:
             ValueError: User-friendly error message for different failure types
+                (CircuitOpenError while the API is failing too often to call)
+
+        For students: Every attempt first asks the circuit breaker (see
+        src/services/circuit_breaker.py), so once the API is known to be
+        down a request stops waiting through its retries and fails at once.
         """
         for attempt in range(max_retries + 1):
+            trial = llm_breaker.before_call()
+            start = time.perf_counter()
             try:
-                return func()
-            except RateLimitError as e:
-                if attempt == max_retries:
-                    raise ValueError(
-                        "Rate limit exceeded. Please try again in a few minutes."
-                    ) from e
-
-                # Honor retry-after header if present
-                retry_after = getattr(e, 'retry_after', None)
-                if retry_after:
-                    delay = float(retry_after)
-                else:
-                    # Exponential backoff: 1s, 2s, 4s, 8s with jitter
-                    delay = (2 ** attempt) + random.uniform(0, 1)
-
-                print(f"Rate limited. Retrying in {delay:.1f}s... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(delay)
-
-            except InternalServerError as e:
-                # 529 overloaded - retry with backoff
-                if attempt == max_retries:
-                    raise ValueError(
-                        "API temporarily unavailable. Please try again later."
-                    ) from e
-
-                delay = (2 ** attempt) + random.uniform(0, 1)
-                print(f"API overloaded. Retrying in {delay:.1f}s... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(delay)
-
+                result = func()
             except APIError as e:
-                # 400/401 and other errors - don't retry
-                if e.status_code == 401:
-                    raise ValueError(
-                        "Invalid API key. Check your ANTHROPIC_API_KEY in .env file."
-                    ) from e
-                elif e.status_code == 400:
-                    raise ValueError(
-                        f"Invalid request: {e.message}"
-                    ) from e
-                else:
-                    raise ValueError(
-                        f"API error: {e.message}"
-                    ) from e
-
-    def generate_flashcards(self, notes: str, topic: str) -> FlashcardSet:
-        """
-        Generate 10 flashcards from study notes using Claude with retry logic.
+                LLM_LATENCY.observe(time.perf_counter() - start, _outcome(e))
+                llm_breaker.record(_upstream_failed(e), trial)
+                time.sleep(self._retry_delay(e, attempt, max_retries))
+            except BaseException:
+                llm_breaker.record(None, trial)
+                raise
+            else:
+                LLM_LATENCY.observe(time.perf_counter() - start, 'ok')
+                llm_breaker.record(False, trial)
+                return result
+
+    def _retry_delay(self, error, attempt, max_retries):
+        """
+        Decide how long to wait before retrying a failed API call.
+
+        Shared by the sync and async retry loops so both follow the same rules.
 
         Args:
-            notes: Study notes to generate flashcards from
-            topic: Topic name for the flashcard deck
+            error: APIError raised by the call
+            attempt: Zero-based number of the attempt that failed
+            max_retries: Maximum number of retry attempts
 
         Returns:
-            FlashcardSet: Validated set of 10 flashcard pairs
+            float: Seconds to wait before the next attempt
 
-        The prompt emphasizes active recall and educational quality:
-        - Questions test understanding, not memorization
-        - Avoid yes/no questions - prefer "explain", "describe", "why"
-        - Focus on key concepts from the notes
-        - Detailed answers that reinforce learning
+        Raises:
+            ValueError: If the error can't be retried or retries ran out
         """
-        prompt = f"""You are an expert educator creating flashcards for active recall study.
+        if isinstance(error, RateLimitError):
+            if attempt == max_retries:
+                raise ValueError(
+                    "Rate limit exceeded. Please try again in a few minutes."
+                ) from error
+
+            # Honor retry-after header if present
+            retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                # Exponential backoff: 1s, 2s, 4s, 8s with jitter
+                delay = (2 ** attempt) + random.uniform(0, 1)
 
-Topic: {topic}
+            log_event(logger, 'llm_retry', logging.WARNING, reason='rate_limited',
+                      delay_s=round(delay, 2), attempt=attempt + 1, max_retries=max_retries)
+            LLM_RETRIES.inc('rate_limited')
+            return delay
+
+        if isinstance(error, (InternalServerError, OverloadedError)):
+            # 529 overloaded - retry with backoff
+            if attempt == max_retries:
+                raise ValueError(
+                    "API temporarily unavailable. Please try again later."
+                ) from error
+
+            delay = (2 ** attempt) + random.uniform(0, 1)
+            log_event(logger, 'llm_retry', logging.WARNING, reason='overloaded',
+                      delay_s=round(delay, 2), attempt=attempt + 1, max_retries=max_retries)
+            LLM_RETRIES.inc('overloaded')
+            return delay
+
+        # 400/401 and other errors - don't retry
+        status_code = getattr(error, 'status_code', None)
+        if status_code == 401:
+            raise ValueError(
+                "Invalid API key. Check your ANTHROPIC_API_KEY in .env file."
+            ) from error
+        elif status_code == 400:
+            raise ValueError(
+                f"Invalid request: {error.message}"
+            ) from error
+        else:
+            raise ValueError(
+                f"API error: {error.message}"
+            ) from error
+
+    def generate_flashcards(self, notes: str, topic: str, card_count: int = None) -> FlashcardSet:
+        """
+        Generate flashcards from study notes using Claude with retry logic.
 
-Study Notes:
-{notes}
+        Args:
+            notes: Study notes to generate flashcards from
+            topic: Topic name for the flashcard deck
+            card_count: Cards to ask for (default: Config.GENERATE_CARD_COUNT)
 
-Generate exactly 10 flashcards that:
-1. Test understanding, not memorization
-2. Use questions requiring explanation (avoid yes/no questions)
-3. Focus on key concepts from the notes
-4. Include detailed answers that reinforce learning
-5. Progress from fundamental to more complex concepts
+        Returns:
+            FlashcardSet: Validated set of flashcard pairs
 
-Each flashcard should help the student recall and understand the material."""
+        Raises:
+            ValueError: If the notes are empty or the API call failed
+
+        See build_prompt() for what the prompt asks for.
+        """
+        arguments = _prepare_request(notes, topic, card_count or Config.GENERATE_CARD_COUNT)
 
         def api_call():
-            response = self.client.beta.messages.parse(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}],
-                output_format=FlashcardSet,
-            )
-            return response
+            return self.client.beta.messages.parse(**arguments)
 
         # Use retry wrapper for resilience
         response = self._retry_with_backoff(api_call)
@@ -164,6 +414,10 @@ Each flashcard should help the student recall and understand the material."""
         """
         Generate flashcards and save to database in one call.
 
+        Identical requests that arrive while a generation is running (in
+        this process or another worker) wait for it and get the same deck
+        instead of starting their own (see src/services/single_flight.py).
+
         Args:
             notes: Study notes to generate flashcards from
             topic: Topic name for the flashcard deck
@@ -171,14 +425,157 @@ Each flashcard should help the student recall and understand the material."""
         Returns:
             dict with deck_id, topic, and flashcard_count
         """
+        key = generation_key(notes, topic, Config.GENERATE_CARD_COUNT)
+        return generations.do((current_tenant(), key), lambda: self._generate_with_lease(key, notes, topic))
+
+    def _generate_with_lease(self, key, notes, topic):
+        """
+        Take the database lease on a generation and run it, or wait for the
+        worker process that holds it and return its deck.
+        """
+        owner = _lease_owner()
+        while True:
+            status, deck_id = GenerationLease.acquire(key, owner, Config.GENERATE_LEASE_SECONDS)
+            if status == 'done':
+                return _shared_result(deck_id, topic)
+            if status == 'acquired':
+                break
+            time.sleep(LEASE_POLL_SECONDS)
+
+        try:
+            result = self._generate_and_save(notes, topic)
+        except BaseException:
+            GenerationLease.release(key, owner)
+            raise
+        GenerationLease.finish(key, owner, result['deck_id'], Config.GENERATE_REUSE_SECONDS)
+        return result
+
+    def _generate_and_save(self, notes, topic):
+        """Generate and save one deck (no coalescing)."""
         # Generate flashcards using AI
+        start = time.perf_counter()
         flashcard_set = self.generate_flashcards(notes, topic)
+        generated = time.perf_counter()
 
         # Save to database
         deck_id = self.save_to_database(flashcard_set)
 
-        return {
-            'deck_id': deck_id,
-            'topic': flashcard_set.topic,
-            'flashcard_count': len(flashcard_set.flashcards)
-        }
+        return _generated(deck_id, flashcard_set, start, generated)
+
+
+class AsyncFlashcardGenerator(FlashcardGenerator):
+    """
+    FlashcardGenerator for the ASGI server (src/asgi.py).
+
+    For students: While an async generation waits for the API (or sleeps
+    before a retry), the event loop serves other requests, so one process
+    can have hundreds of generations in flight instead of one per thread.
+    Database writes are still blocking sqlite3 calls, so they run on a
+    thread pool handed in by the caller.
+    """
+
+    def __init__(self):
+        """Use this process's shared async Anthropic client."""
+        self.client = get_async_client()
+
+    async def _retry_with_backoff_async(self, func, max_retries=3):
+        """
+        Async version of _retry_with_backoff(); waits with asyncio.sleep().
+
+        Args:
+            func: Coroutine function that performs the API call
+            max_retries: Maximum number of retry attempts (default: 3)
+
+        Returns:
+            Result from func() if successful
+
+        Raises:
+            ValueError: User-friendly error message for different failure types
+        """
+        for attempt in range(max_retries + 1):
+            trial = llm_breaker.before_call()
+            start = time.perf_counter()
+            try:
+                result = await func()
+            except APIError as e:
+                LLM_LATENCY.observe(time.perf_counter() - start, _outcome(e))
+                llm_breaker.record(_upstream_failed(e), trial)
+                await asyncio.sleep(self._retry_delay(e, attempt, max_retries))
+            except BaseException:
+                # Includes cancellation: frees the trial slot if this was the trial call
+                llm_breaker.record(None, trial)
+                raise
+            else:
+                LLM_LATENCY.observe(time.perf_counter() - start, 'ok')
+                llm_breaker.record(False, trial)
+                return result
+
+    async def generate_flashcards(self, notes: str, topic: str, card_count: int = None) -> FlashcardSet:
+        """
+        Generate flashcards without blocking the event loop.
+
+        Args:
+            notes: Study notes to generate flashcards from
+            topic: Topic name for the flashcard deck
+            card_count: Cards to ask for (default: Config.GENERATE_CARD_COUNT)
+
+        Returns:
+            FlashcardSet: Validated set of flashcard pairs
+        """
+        arguments = _prepare_request(notes, topic, card_count or Config.GENERATE_CARD_COUNT)
+
+        async def api_call():
+            return await self.client.beta.messages.parse(**arguments)
+
+        response = await self._retry_with_backoff_async(api_call)
+        return response.content[0].parsed_output
+
+    async def generate_and_save(self, notes: str, topic: str, executor=None) -> dict:
+        """
+        Generate flashcards and save them, with the save on a worker thread.
+
+        Args:
+            notes: Study notes to generate flashcards from
+            topic: Topic name for the flashcard deck
+            executor: Thread pool for database work (None = asyncio's default)
+
+        Returns:
+            dict with deck_id, topic, and flashcard_count
+        """
+        key = generation_key(notes, topic, Config.GENERATE_CARD_COUNT)
+        return await generations.do_async(
+            (current_tenant(), key), lambda: self._generate_with_lease_async(key, notes, topic, executor)
+        )
+
+    async def _generate_with_lease_async(self, key, notes, topic, executor):
+        """Async version of _generate_with_lease(); database calls run on the executor."""
+        loop = asyncio.get_running_loop()
+
+        def in_executor(func, *args):
+            # Run in a copy of this task's context so it uses the request's
+            # tenant database (executor threads don't inherit it)
+            call = functools.partial(contextvars.copy_context().run, func, *args)
+            return loop.run_in_executor(executor, call)
+
+        owner = _lease_owner()
+        while True:
+            status, deck_id = await in_executor(
+                GenerationLease.acquire, key, owner, Config.GENERATE_LEASE_SECONDS
+            )
+            if status == 'done':
+                return await in_executor(_shared_result, deck_id, topic)
+            if status == 'acquired':
+                break
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+
+        try:
+            start = time.perf_counter()
+            flashcard_set = await self.generate_flashcards(notes, topic)
+            generated = time.perf_counter()
+            deck_id = await in_executor(self.save_to_database, flashcard_set)
+        except BaseException:
+            await in_executor(GenerationLease.release, key, owner)
+            raise
+        await in_executor(GenerationLease.finish, key, owner, deck_id, Config.GENERATE_REUSE_SECONDS)
+
+        return _generated(deck_id, flashcard_set, start, generated)
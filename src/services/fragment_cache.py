@@ -0,0 +1,250 @@
+"""
+Rendered page fragment cache with write invalidation.
+
+Rendering big templates (a preview page with hundreds of cards, the decks and
+stats dashboards) can cost more than the queries behind them. This module
+keeps rendered HTML keyed by (template, deck id, deck version), plus the
+tenant when each tenant has its own database:
+- in-process, in an LRU cache with a byte budget
+- optionally on disk, so worker processes on one machine share renders
+
+For students: Because the deck version is part of the key, a cached page can
+never be served after its deck changes - the next request simply asks for a
+new key. The model write hooks additionally evict old entries right away so
+they don't waste memory.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import render_template
+from src.config import Config
+from src.models.database import current_tenant, on_write
+
+# Placeholder used in keys and file names for library-wide pages
+LIBRARY = 'library'
+
+
+def _scope(deck_id):
+    """
+    Cache scope for a deck (or the whole library) in the current database.
+
+    Deck ids and versions repeat across tenant databases, so with
+    per-tenant databases the tenant becomes part of the scope.
+    """
+    scope = LIBRARY if deck_id is None else deck_id
+    tenant = current_tenant()
+    return scope if tenant is None else f'{tenant}~{scope}'
+
+
+class FragmentCache:
+    """
+    LRU cache of rendered templates with a byte budget.
+
+    Keys are (template, scope, version) tuples. The scope is the deck id,
+    or LIBRARY for pages built from every deck (like /decks and /stats),
+    prefixed with the tenant when per-tenant databases are in use.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None):
+        """
+        Args:
+            max_bytes (int): Memory budget for cached renders
+            disk_dir (str, optional): Directory for the shared on-disk store
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()
+        # deck id -> keys cached for it, so invalidation doesn't scan everything
+        self._keys_by_deck = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key):
+        """File name that keeps the deck id visible for invalidation."""
+        template, scope, version = key
+        digest = hashlib.sha1(template.encode('utf-8')).hexdigest()[:12]
+        return self.disk_dir / f'{digest}.{scope}.v{version}.html'
+
+    def get(self, key):
+        """
+        Look up a rendered page.
+
+        Args:
+            key (tuple): (template, deck_id, version)
+
+        Returns:
+            bytes: Rendered page or None if not cached
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+
+        if self.disk_dir:
+            try:
+                body = self._disk_path(key).read_bytes()
+            except OSError:
+                body = None
+            if body is not None:
+                self._store(key, body)
+                with self._lock:
+                    self.disk_hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, body):
+        """
+        Store a rendered page in memory (and on disk if enabled).
+
+        Args:
+            key (tuple): (template, deck_id, version)
+            body (bytes): Rendered page
+        """
+        self._store(key, body)
+
+        if self.disk_dir:
+            # Write to a temporary file first so other workers never read a
+            # half-written page
+            path = self._disk_path(key)
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            try:
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, path)
+            except OSError:
+                return
+
+            # Older versions of this page can never be requested again. They
+            # are removed here (on a render) rather than on every write, so
+            # grading never has to scan the directory.
+            prefix = path.name.split('.v')[0]
+            for old_path in self.disk_dir.glob(f'{prefix}.v*.html'):
+                if old_path != path:
+                    try:
+                        old_path.unlink()
+                    except OSError:
+                        pass
+
+    def _store(self, key, body):
+        """Insert into the in-memory LRU and evict down to the byte budget."""
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+
+            self._entries[key] = body
+            self._keys_by_deck.setdefault(key[1], set()).add(key)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._forget(evicted_key)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _forget(self, key):
+        """Remove a key from the per-deck index (caller holds the lock)."""
+        keys = self._keys_by_deck.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_deck[key[1]]
+
+    def invalidate_deck(self, deck_id=None):
+        """
+        Drop every cached page built from a deck, plus library-wide pages.
+
+        Any deck change also changes the library pages, so those are always
+        dropped. Passing deck_id=None drops library-wide pages only. Files in
+        the on-disk store are versioned and pruned when a newer render is
+        written, so only the in-memory entries are touched here.
+
+        Args:
+            deck_id (int, optional): Deck whose pages are stale
+        """
+        with self._lock:
+            for stale_id in (_scope(None), _scope(deck_id)):
+                for key in self._keys_by_deck.pop(stale_id, ()):
+                    self._bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        """Drop every in-memory entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_deck.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: hits, disk_hits, misses, hit_ratio (0-1), evictions,
+                entries and bytes currently held in memory
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+    def render(self, template, deck_id, version, build_context):
+        """
+        Return a rendered template, rendering it only on a cache miss.
+
+        For students: build_context is a function rather than a dict so the
+        database queries behind the page are skipped entirely on a hit.
+
+        Args:
+            template (str): Template file name (e.g. 'preview.html')
+            deck_id (int or None): Deck the page is built from (None = library)
+            version (int): Deck version, or library version for library pages
+            build_context (callable): Returns the template variables as a dict
+
+        Returns:
+            tuple: (body bytes, 'hit' or 'miss')
+        """
+        key = (template, _scope(deck_id), version)
+
+        body = self.get(key)
+        if body is not None:
+            return body, 'hit'
+
+        body = render_template(template, **build_context()).encode('utf-8')
+        self.set(key, body)
+        return body, 'miss'
+
+
+# Shared instance used by the routes, evicted by every model write
+fragment_cache = FragmentCache(
+    max_bytes=Config.FRAGMENT_CACHE_MAX_BYTES,
+    disk_dir=Config.FRAGMENT_CACHE_DIR or None
+)
+on_write(fragment_cache.invalidate_deck)
@@ -0,0 +1,118 @@
+"""
+Prepare pasted study notes for the generation prompt.
+
+Notes copied from slides, web pages or PDFs carry a lot that costs input
+tokens without helping the model: runs of spaces and blank lines, headers
+and footers repeated on every page, the same paragraph pasted twice.
+prepare_notes() cleans that up and keeps the result within a token budget
+(Config.GENERATE_NOTES_TOKEN_BUDGET), so very long notes don't make the
+request fail or slow down:
+1. Normalize whitespace: one space between words, one blank line between
+   paragraphs
+2. Drop paragraphs that repeat an earlier one (ignoring case and spacing)
+3. Keep paragraphs in order until the budget is used, cutting the last one
+   at a sentence or word boundary
+
+For students: The API bills and waits on tokens, not characters. Counting
+them exactly needs the model's tokenizer (a download and a network call),
+but English text averages about four characters per token, which is close
+enough to decide how much of the notes to send.
+"""
+
+import re
+
+# Average characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Paragraphs are separated by blank lines (spaces on the blank line allowed)
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+# Any whitespace except a line break (tabs, non-breaking spaces, ...)
+_SPACES = re.compile(r'[^\S\n]+')
+# Where a cut paragraph may end: after a sentence, or failing that a word
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]?\s')
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens the model will count for some text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Approximate token count (rounded up)
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _normalize_paragraph(paragraph):
+    """Collapse spacing inside a paragraph, keeping its line breaks."""
+    lines = (_SPACES.sub(' ', line).strip() for line in paragraph.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _cut(paragraph, max_chars):
+    """Shorten a paragraph to max_chars, ending at a sentence or word if possible."""
+    head = paragraph[:max_chars + 1]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if sentence_ends and sentence_ends[-1] > max_chars // 2:
+        return head[:sentence_ends[-1]].rstrip()
+    space = head.rfind(' ', 0, max_chars + 1)
+    if space > max_chars // 2:
+        return head[:space]
+    return paragraph[:max_chars]
+
+
+def prepare_notes(notes, token_budget):
+    """
+    Clean up study notes and trim them to a token budget.
+
+    Args:
+        notes (str): Notes as pasted by the user
+        token_budget (int): Most tokens to keep (0 or less keeps everything)
+
+    Returns:
+        dict: text (the prepared notes), tokens_in and tokens_out
+            (estimates), duplicates (paragraphs dropped as repeats) and
+            trimmed (True if the budget cut the notes short)
+    """
+    paragraphs = []
+    seen = set()
+    duplicates = 0
+    for raw in _PARAGRAPH_BREAK.split(notes.replace('\r\n', '\n').replace('\r', '\n')):
+        paragraph = _normalize_paragraph(raw)
+        if not paragraph:
+            continue
+        key = ' '.join(paragraph.casefold().split())
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        paragraphs.append(paragraph)
+
+    trimmed = False
+    if token_budget > 0:
+        max_chars = token_budget * CHARS_PER_TOKEN
+        kept, used = [], 0
+        for paragraph in paragraphs:
+            # The blank line before every paragraph but the first counts too
+            separator = 2 if kept else 0
+            if used + separator + len(paragraph) > max_chars:
+                trimmed = True
+                room = max_chars - used - separator
+                # Skip a stub too short to be worth a question
+                if room >= 200 or not kept:
+                    kept.append(_cut(paragraph, room))
+                break
+            kept.append(paragraph)
+            used += separator + len(paragraph)
+        paragraphs = kept
+
+    text = '\n\n'.join(paragraphs)
+    return {
+        'text': text,
+        'tokens_in': estimate_tokens(notes),
+        'tokens_out': estimate_tokens(text),
+        'duplicates': duplicates,
+        'trimmed': trimmed,
+    }
@@ -0,0 +1,143 @@
+"""
+Single-flight: identical concurrent calls share one execution.
+
+When a teacher shares a link, dozens of students may submit the same notes
+and topic to /generate within seconds. Without coalescing each request
+calls the API and saves its own copy of the deck. With it:
+- within a worker process, the first request for a key runs the
+  generation and the others (threads, or tasks on the ASGI event loop)
+  wait for it and receive the same result - or the same error
+- across worker processes, the running generation holds a lease row in the
+  database (see src/models/generation_lease.py); other workers wait for
+  the deck it records
+
+so upstream calls grow with the number of distinct inputs, not of users.
+
+For students: The name comes from Go's singleflight package. Only calls
+that overlap are merged; the next request after a generation has finished
+(and its result is no longer reused, see GENERATE_REUSE_SECONDS) starts a
+new one.
+"""
+
+import asyncio
+import os
+import threading
+
+from src.metrics import GENERATIONS_COALESCED
+
+
+class _Call:
+    """A call in progress and, once it is finished, its result or error."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Key -> _Call, for threads
+        self._calls = {}
+        # Key -> asyncio.Future, for tasks on the event loop
+        self._futures = {}
+
+    def do(self, key, func):
+        """
+        Run func(), or wait for the identical call already running.
+
+        Args:
+            key (hashable): Identifies identical calls
+            func (callable): Runs the call (only in the first caller's thread)
+
+        Returns:
+            Whatever func() returned, in every waiting thread
+
+        Raises:
+            Exception: Whatever func() raised, in every waiting thread
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            GENERATIONS_COALESCED.inc('process')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, func):
+        """
+        Async version of do() for the event loop (src/asgi.py).
+
+        Args:
+            key (hashable): Identifies identical calls
+            func (callable): Coroutine function that runs the call
+
+        Returns:
+            Whatever func() returned, in every waiting task
+
+        Raises:
+            Exception: Whatever func() raised, in every waiting task
+        """
+        while key in self._futures:
+            future = self._futures[key]
+            GENERATIONS_COALESCED.inc('process')
+            try:
+                # shield(): a waiter that is cancelled (its client went away)
+                # must not cancel the generation the others are waiting for
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The first request was cancelled before it finished; the
+                # waiters start over and one of them runs the call
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved so asyncio doesn't warn when nobody waited
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[key]
+
+    def _after_fork(self):
+        # Calls in flight belong to the parent process
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+
+
+# Shared by all /generate requests of this process
+generations = SingleFlight()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=generations._after_fork)
@@ -0,0 +1,45 @@
+"""
+Pick each request's tenant database (see src/models/shards.py).
+
+When Config.SHARD_DIR is set, a request carrying the tenant header
+(Config.SHARD_TENANT_HEADER, X-Tenant-ID by default) is served from that
+tenant's own database file. Requests without the header use the main
+database, so a single-user setup works exactly as before.
+
+For students: The app has no user accounts of its own. The tenant id is
+expected to come from a login proxy in front of it, which must remove any
+tenant header sent by the browser itself.
+"""
+
+from flask import g, jsonify, request
+from src.config import Config
+from src.models.database import reset_tenant, set_tenant
+from src.models.shards import valid_tenant
+
+
+def init_tenancy(app):
+    """
+    Route each request to its tenant's database.
+
+    Register this before init_logging() so log lines include the tenant.
+
+    Args:
+        app (Flask): Application to extend
+    """
+    @app.before_request
+    def _bind_tenant():
+        if not Config.SHARD_DIR:
+            return None
+        tenant = request.headers.get(Config.SHARD_TENANT_HEADER)
+        if not tenant:
+            return None
+        if not valid_tenant(tenant):
+            return jsonify({'error': 'Invalid tenant id'}), 400
+        g.tenant_token = set_tenant(tenant)
+        return None
+
+    @app.teardown_request
+    def _unbind_tenant(exc):
+        token = g.pop('tenant_token', None)
+        if token is not None:
+            reset_tenant(token)
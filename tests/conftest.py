@@ -0,0 +1,50 @@
+"""
+Shared fixtures: every test runs on the in-memory storage engine.
+
+The memory engine (src/models/engines.py) migrates a template database
+once; reset() copies it back over the test's database before each test, so
+tests start empty, don't depend on each other and never touch
+flashcards.db.
+
+For students: An "autouse" fixture runs around every test without the
+test asking for it. Run the suite with `python -m pytest -q`.
+"""
+
+import pytest
+
+from src.config import Config
+from src.models.engines import set_engine
+
+
+@pytest.fixture(scope='session')
+def engine():
+    """The memory engine, selected once for the whole run."""
+    Config.STORAGE_ENGINE = 'memory'
+    return set_engine('memory')
+
+
+@pytest.fixture(autouse=True)
+def empty_database(engine):
+    """Start every test with empty databases."""
+    engine.reset()
+    yield engine
+
+
+@pytest.fixture(scope='session')
+def app(engine, tmp_path_factory):
+    """The Flask application, created once (its hooks and listeners are process-wide)."""
+    # Request log lines go to a file instead of the test output
+    Config.LOG_FILE = str(tmp_path_factory.mktemp('logs') / 'app.log')
+    # No background maintenance between tests
+    Config.MAINTENANCE_INTERVAL = 0
+
+    from src.app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """A test client with its own cookies."""
+    return app.test_client()
@@ -0,0 +1,216 @@
+"""
+Model and route behavior on the in-memory storage engine.
+
+Covers the write paths that must leave the database consistent: all-or-
+nothing bulk edits, soft-deleted decks and their resumable purge,
+generation leases and conditional GETs.
+"""
+
+import sqlite3
+
+from src.config import Config
+from src.models.database import get_db, use_tenant
+from src.models.deck import Deck
+from src.models.flashcard import Flashcard
+from src.models.generation_lease import GenerationLease
+from src.models.maintenance import purge_deleted_decks
+
+
+def _deck_with_cards(name, count):
+    deck = Deck.create(name)
+    cards = [Flashcard.create(deck.id, f'Question {i}', f'Answer {i}') for i in range(count)]
+    return deck, cards
+
+
+def _copy_to_file(path):
+    """Write the in-memory database to a file (the purger works on files)."""
+    conn = get_db()
+    target = sqlite3.connect(path)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+        conn.close()
+
+
+def test_reset_empties_every_database(engine):
+    Deck.create('Main')
+    with use_tenant('school-a'):
+        Deck.create('Tenant')
+
+    engine.reset()
+
+    assert Deck.get_all() == []
+    with use_tenant('school-a'):
+        assert Deck.get_all() == []
+
+
+def test_bulk_change_applies_every_item():
+    deck, (first, second, third) = _deck_with_cards('Biology', 3)
+
+    applied, results = Flashcard.bulk_change(
+        deck.id,
+        edits=[{'id': first.id, 'question': 'Edited', 'version': first.version}],
+        deletes=[{'id': second.id, 'version': second.version}]
+    )
+
+    assert applied
+    assert results == [
+        {'id': first.id, 'status': 'updated', 'version': first.version + 1},
+        {'id': second.id, 'status': 'deleted'},
+    ]
+    assert Flashcard.get_by_id(first.id).question == 'Edited'
+    assert Flashcard.get_by_id(second.id) is None
+    assert Flashcard.get_by_id(third.id) is not None
+
+
+def test_bulk_change_conflict_rolls_back_the_whole_batch():
+    deck, (first, second, third) = _deck_with_cards('Biology', 3)
+    # Someone else edits the second card after the client loaded it
+    Flashcard.bulk_change(deck.id, edits=[{'id': second.id, 'answer': 'Theirs'}])
+
+    applied, results = Flashcard.bulk_change(
+        deck.id,
+        edits=[
+            {'id': first.id, 'question': 'Mine', 'version': first.version},
+            {'id': second.id, 'question': 'Mine', 'version': second.version},
+        ],
+        deletes=[{'id': third.id}, {'id': 999999}]
+    )
+
+    assert not applied
+    assert [result['status'] for result in results] == ['skipped', 'conflict', 'skipped', 'not_found']
+    assert results[1]['version'] == second.version + 1
+    # Nothing was saved, not even the items without a conflict
+    assert Flashcard.get_by_id(first.id).question == first.question
+    assert Flashcard.get_by_id(second.id).question == second.question
+    assert Flashcard.get_by_id(third.id) is not None
+
+
+def test_bulk_change_rejects_cards_of_other_decks():
+    deck, _ = _deck_with_cards('Biology', 1)
+    _, (other,) = _deck_with_cards('Chemistry', 1)
+
+    applied, results = Flashcard.bulk_change(deck.id, deletes=[{'id': other.id}])
+
+    assert not applied
+    assert results == [{'id': other.id, 'status': 'not_found'}]
+    assert Flashcard.get_by_id(other.id) is not None
+
+
+def test_deleted_deck_is_hidden_and_its_name_reusable():
+    deck, (card,) = _deck_with_cards('Biology', 1)
+
+    assert Deck.delete(deck.id)
+    assert not Deck.delete(deck.id)
+
+    assert Deck.get_by_id(deck.id) is None
+    assert Deck.get_all() == []
+    assert Flashcard.get_review_queue(10, 10) == []
+    assert Flashcard.update_stats(card.id, True) is None
+    assert Deck.create('Biology').id != deck.id
+
+
+def test_purge_resumes_where_it_stopped(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'PURGE_BATCH_SIZE', 2)
+    monkeypatch.setattr(Config, 'PURGE_PAUSE_MS', 0)
+    deleted, _ = _deck_with_cards('Deleted', 5)
+    kept, kept_cards = _deck_with_cards('Kept', 2)
+    Deck.delete(deleted.id)
+
+    path = str(tmp_path / 'library.db')
+    _copy_to_file(path)
+
+    # Stop after the first batch, as a restart or a busy database would
+    calls = []
+    purged = purge_deleted_decks(path, should_continue=lambda: calls.append(1) or len(calls) == 1)
+    assert purged == {'decks': 0, 'cards': 2}
+
+    conn = sqlite3.connect(path)
+    remaining = conn.execute('SELECT COUNT(*) FROM flashcards WHERE deck_id = ?', (deleted.id,)).fetchone()[0]
+    marked = conn.execute('SELECT deleted_at FROM decks WHERE id = ?', (deleted.id,)).fetchone()[0]
+    conn.close()
+    assert remaining == 3
+    # Still marked, so the next run picks it up
+    assert marked is not None
+
+    assert purge_deleted_decks(path) == {'decks': 1, 'cards': 3}
+    assert purge_deleted_decks(path) == {'decks': 0, 'cards': 0}
+
+    engine.load(path)
+    assert [deck.id for deck in Deck.get_all()] == [kept.id]
+    assert [card.id for card in Flashcard.get_by_deck(kept.id)] == [card.id for card in kept_cards]
+
+
+def test_generation_lease_busy_then_done():
+    deck = Deck.create('Generated')
+
+    assert GenerationLease.acquire('key', 'worker-1', 60) == ('acquired', None)
+    assert GenerationLease.acquire('key', 'worker-2', 60) == ('busy', None)
+
+    GenerationLease.finish('key', 'worker-1', deck.id, reuse_seconds=60)
+    assert GenerationLease.acquire('key', 'worker-2', 60) == ('done', deck.id)
+    # Other keys are independent
+    assert GenerationLease.acquire('other', 'worker-2', 60) == ('acquired', None)
+
+
+def test_generation_lease_can_be_taken_over():
+    # An expired lease (its worker crashed) is free again
+    GenerationLease.acquire('expired', 'worker-1', 0)
+    assert GenerationLease.acquire('expired', 'worker-2', 60) == ('acquired', None)
+
+    # So is one given up after a failed generation
+    GenerationLease.acquire('failed', 'worker-1', 60)
+    GenerationLease.release('failed', 'worker-1')
+    assert GenerationLease.acquire('failed', 'worker-2', 60) == ('acquired', None)
+
+    # And one whose deck was deleted in the meantime
+    deck = Deck.create('Generated')
+    GenerationLease.acquire('deleted', 'worker-1', 60)
+    GenerationLease.finish('deleted', 'worker-1', deck.id, reuse_seconds=60)
+    Deck.delete(deck.id)
+    assert GenerationLease.acquire('deleted', 'worker-2', 60) == ('acquired', None)
+
+
+def test_finished_lease_is_only_reused_for_a_while():
+    deck = Deck.create('Generated')
+    GenerationLease.acquire('key', 'worker-1', 60)
+    GenerationLease.finish('key', 'worker-1', deck.id, reuse_seconds=0)
+
+    assert GenerationLease.acquire('key', 'worker-2', 60) == ('acquired', None)
+
+
+def test_conditional_get_returns_304_until_the_library_changes(client):
+    Deck.create('Biology')
+
+    first = client.get('/api/v1/decks')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    unchanged = client.get('/api/v1/decks', headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers['ETag'] == etag
+    assert unchanged.data == b''
+
+    Deck.create('Chemistry')
+    changed = client.get('/api/v1/decks', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_varies_with_query_and_encoding(client):
+    deck, _ = _deck_with_cards('Biology', 3)
+    url = f'/api/v1/decks/{deck.id}/cards'
+
+    plain = client.get(url).headers['ETag']
+    paged = client.get(url + '?limit=1').headers['ETag']
+    gzipped = client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    assert len({plain, paged, gzipped}) == 3
+    # A validator for one representation doesn't match another
+    response = client.get(url + '?limit=1', headers={'If-None-Match': plain})
+    assert response.status_code == 200
+    response = client.get(url, headers={'If-None-Match': plain, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    response = client.get(url, headers={'If-None-Match': gzipped, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
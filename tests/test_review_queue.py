@@ -0,0 +1,179 @@
+"""
+Flashcard.get_review_queue against a brute-force reference.
+
+The queue only reads the decks at the front of deck_heads and then a few
+cards per deck, so every case here compares it with the obvious answer:
+all due cards of live decks sorted by (due_at, id), taking at most
+per_deck from any one deck.
+"""
+
+import random
+import time
+
+import pytest
+
+from src.models import database
+from src.models.database import get_db
+from src.models.deck import Deck
+from src.models.flashcard import Flashcard
+
+NOW = 1_000_000.0
+
+
+def _library(rng, decks, max_cards, due_times):
+    """Create decks of random size whose cards get due_at from due_times."""
+    deck_ids = []
+    conn = get_db()
+    for number in range(decks):
+        deck = Deck.create(f'Deck {number}')
+        deck_ids.append(deck.id)
+        for _ in range(rng.randint(0, max_cards)):
+            card = Flashcard.create(deck.id, 'Question', 'Answer')
+            # Written like any other card update, so the triggers keep deck_heads current
+            conn.execute('UPDATE flashcards SET due_at = ? WHERE id = ?', (rng.choice(due_times), card.id))
+    conn.commit()
+    conn.close()
+    return deck_ids
+
+
+def _brute_force(limit, per_deck, now=NOW):
+    conn = get_db()
+    rows = conn.execute(
+        '''SELECT f.id, f.deck_id FROM flashcards f JOIN decks d ON d.id = f.deck_id
+           WHERE d.deleted_at IS NULL AND f.due_at <= ?
+           ORDER BY f.due_at ASC, f.id ASC''',
+        (now,)
+    ).fetchall()
+    conn.close()
+
+    queue, taken = [], {}
+    for card_id, deck_id in rows:
+        if len(queue) == limit:
+            break
+        if taken.get(deck_id, 0) < per_deck:
+            taken[deck_id] = taken.get(deck_id, 0) + 1
+            queue.append(card_id)
+    return queue
+
+
+def _assert_heads_current():
+    """deck_heads holds exactly the first card of every live deck."""
+    conn = get_db()
+    heads = conn.execute('SELECT deck_id, next_due_at, next_due_id FROM deck_heads').fetchall()
+    first_cards = conn.execute(
+        '''SELECT d.id, f.due_at, f.id FROM decks d
+           JOIN flashcards f ON f.id = (
+               SELECT id FROM flashcards WHERE deck_id = d.id ORDER BY due_at ASC, id ASC LIMIT 1
+           )
+           WHERE d.deleted_at IS NULL'''
+    ).fetchall()
+    conn.close()
+    assert sorted(map(tuple, heads)) == sorted(map(tuple, first_cards))
+
+
+def _queue(limit, per_deck, now=NOW):
+    return [card.id for card in Flashcard.get_review_queue(limit, per_deck, now=now)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('limit, per_deck', [(1, 1), (5, 2), (20, 3), (50, 50), (200, 10)])
+def test_matches_brute_force(seed, limit, per_deck):
+    rng = random.Random(seed)
+    # Few distinct times, so many cards tie on due_at (0 = never studied)
+    _library(rng, decks=12, max_cards=15, due_times=[0, 0, NOW - 500, NOW - 100, NOW, NOW + 100])
+
+    _assert_heads_current()
+    assert _queue(limit, per_deck) == _brute_force(limit, per_deck)
+
+
+def test_per_deck_cap_lets_other_decks_in():
+    big = Deck.create('Big')
+    small = Deck.create('Small')
+    for _ in range(30):
+        Flashcard.create(big.id, 'Question', 'Answer')
+    small_card = Flashcard.create(small.id, 'Question', 'Answer')
+
+    queue = Flashcard.get_review_queue(10, 4, now=NOW)
+
+    assert [card.deck_id for card in queue].count(big.id) == 4
+    assert small_card.id in [card.id for card in queue]
+    assert [card.id for card in queue] == _brute_force(10, 4)
+
+
+def test_more_due_decks_than_the_session_holds():
+    rng = random.Random(7)
+    _library(rng, decks=60, max_cards=3, due_times=[0, NOW - 10])
+
+    assert _queue(25, 1) == _brute_force(25, 1)
+    assert len(set(card.deck_id for card in Flashcard.get_review_queue(25, 1, now=NOW))) == 25
+
+
+def test_skips_deleted_decks_and_follows_edits():
+    rng = random.Random(3)
+    deck_ids = _library(rng, decks=8, max_cards=10, due_times=[0, NOW - 50, NOW + 50])
+    Deck.delete(deck_ids[0])
+    Deck.delete(deck_ids[5])
+
+    # Grade and delete some cards, including whole decks' worth
+    queue = Flashcard.get_review_queue(200, 200, now=NOW)
+    for card in queue[::3]:
+        Flashcard.update_stats(card.id, True)
+    for card in queue[1::5]:
+        Flashcard.delete(card.id)
+
+    _assert_heads_current()
+    now = time.time()
+    assert _queue(200, 200, now) == _brute_force(200, 200, now)
+    assert _queue(10, 2, now) == _brute_force(10, 2, now)
+
+
+def test_nothing_due():
+    deck = Deck.create('Later')
+    card = Flashcard.create(deck.id, 'Question', 'Answer')
+    conn = get_db()
+    conn.execute('UPDATE flashcards SET due_at = ? WHERE id = ?', (NOW + 1, card.id))
+    conn.commit()
+    conn.close()
+
+    assert _queue(10, 10) == []
+
+
+def _between_reads(monkeypatch, action):
+    """Run action() once, right after the deck_heads query and before any deck is read."""
+    done = []
+
+    def observer(sql, parameters, elapsed):
+        if not done and 'FROM deck_heads' in sql:
+            done.append(True)
+            action()
+
+    monkeypatch.setattr(database, '_statement_observers', database._statement_observers + [observer])
+    return done
+
+
+def test_card_graded_between_the_reads(monkeypatch):
+    rng = random.Random(11)
+    _library(rng, decks=5, max_cards=6, due_times=[0, NOW - 30])
+    now = time.time()
+    first = Flashcard.get_review_queue(1, 1, now=now)[0]
+
+    done = _between_reads(monkeypatch, lambda: Flashcard.update_stats(first.id, True))
+    queue = _queue(50, 3, now)
+
+    assert done
+    assert Flashcard.get_by_id(first.id).due_at > now
+    assert first.id not in queue
+    assert queue == _brute_force(50, 3, now)
+
+
+def test_deck_deleted_between_the_reads(monkeypatch):
+    rng = random.Random(12)
+    _library(rng, decks=5, max_cards=6, due_times=[0, NOW - 30])
+    first = Flashcard.get_review_queue(1, 1, now=NOW)[0]
+
+    done = _between_reads(monkeypatch, lambda: Deck.delete(first.deck_id))
+    queue = Flashcard.get_review_queue(50, 3, now=NOW)
+
+    assert done
+    assert first.deck_id not in [card.deck_id for card in queue]
+    assert [card.id for card in queue] == _brute_force(50, 3)